@@ -0,0 +1,187 @@
+"""
+Load benchmark: Excel vs Parquet vs Arrow IPC nutrition exports
+
+For each catalog size, writes the same synthetic scraper export (see
+bench_planner.synthetic_rows) as .xlsx, .parquet and .arrow, then loads
+each one in fresh processes and reports the median wall time and peak RSS:
+
+    planner   MealPlanner(excel_file=...).load_data() (planner columns only)
+    loader    read_nutrition_file(path), every column (what load_to_db.py reads)
+
+RSS is reported as the process peak and as the growth over the peak right
+after imports, so the interpreter/pandas baseline does not hide the load.
+Excel is skipped above --max-excel-rows (slow to write and capped at ~1M rows).
+
+Usage:
+    python3 bench_columnar.py
+    python3 bench_columnar.py --sizes 10000 100000 --repeats 5 --output columnar.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench_planner import synthetic_rows
+from columnar import NUTRITION_COLUMNS, write_nutrition_file
+
+FORMATS = {'excel': '.xlsx', 'parquet': '.parquet', 'arrow': '.arrow'}
+MODES = ['planner', 'loader']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    # VmHWM belongs to this address space; ru_maxrss on Linux also carries the
+    # peak of the process that exec'd us (here: the parent that wrote the exports)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def measure(path, mode):
+    """Load path once in this process; returns {ms, rows, rss_mb, rss_growth_mb}"""
+    import pandas  # noqa: F401  (import cost is not part of the load)
+    from columnar import read_nutrition_file
+    from meal_planner import MealPlanner
+
+    if not path.endswith('.xlsx'):
+        import pyarrow  # noqa: F401
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == 'planner':
+        planner = MealPlanner(excel_file=path)
+        planner.load_data()
+        rows = len(planner.data)
+    else:
+        rows = len(read_nutrition_file(path))
+    elapsed = (time.perf_counter() - started) * 1000
+
+    peak = peak_rss_mb()
+    return {'ms': elapsed, 'rows': rows, 'rss_mb': peak, 'rss_growth_mb': peak - baseline}
+
+
+def write_exports(data_dir, n_rows, formats, seed=0):
+    """
+    Write the synthetic export of n_rows in each format (reused if present)
+
+    Returns:
+        {format: path}
+    """
+    import pandas as pd
+
+    paths = {fmt: os.path.join(data_dir, f'export_{n_rows}_{seed}{FORMATS[fmt]}') for fmt in formats}
+    missing = [fmt for fmt, path in paths.items() if not os.path.exists(path)]
+    if not missing:
+        return paths
+
+    df = pd.DataFrame(list(synthetic_rows(n_rows, np.random.default_rng(seed))), columns=NUTRITION_COLUMNS)
+    for fmt in missing:
+        started = time.perf_counter()
+        if fmt == 'excel':
+            df.to_excel(paths[fmt] + '.tmp.xlsx', sheet_name='Complete Data', index=False)
+            os.replace(paths[fmt] + '.tmp.xlsx', paths[fmt])
+        else:
+            write_nutrition_file(df, paths[fmt])
+        print(f'  wrote {paths[fmt]} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    return paths
+
+
+def bench_file(path, mode, repeats):
+    """Median time/RSS over repeats fresh processes (None if the load fails)"""
+    runs = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, __file__, '--measure', path, '--mode', mode],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr.strip().splitlines()[-1], file=sys.stderr)
+            return None
+        runs.append(json.loads(result.stdout))
+    return {
+        'ms': round(float(np.median([r['ms'] for r in runs])), 1),
+        'rss_mb': round(float(np.median([r['rss_mb'] for r in runs])), 1),
+        'rss_growth_mb': round(float(np.median([r['rss_growth_mb'] for r in runs])), 1),
+        'rows': runs[0]['rows'],
+    }
+
+
+def available_formats():
+    """Formats whose reader/writer is installed (Parquet/Arrow need pyarrow, Excel openpyxl)"""
+    formats = []
+    for fmt, module in [('excel', 'openpyxl'), ('parquet', 'pyarrow'), ('arrow', 'pyarrow')]:
+        try:
+            __import__(module)
+        except ImportError:
+            print(f'  skipping {fmt}: {module} not installed', file=sys.stderr)
+            continue
+        formats.append(fmt)
+    return formats
+
+
+def print_report(results):
+    print(f"{'rows':>9} {'format':>8} {'MB':>7} {'mode':>8} {'ms':>9} {'peak MB':>8} {'growth MB':>10}")
+    for size in results['sizes']:
+        for fmt, entry in size['formats'].items():
+            for mode in MODES:
+                stats = entry[mode]
+                if stats is None:
+                    print(f"{size['rows']:>9} {fmt:>8} {entry['file_mb']:>7.2f} {mode:>8}    failed")
+                    continue
+                print(f"{size['rows']:>9} {fmt:>8} {entry['file_mb']:>7.2f} {mode:>8} "
+                      f"{stats['ms']:>9.1f} {stats['rss_mb']:>8.1f} {stats['rss_growth_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--max-excel-rows', type=int, default=200000)
+    parser.add_argument('--data-dir', type=str,
+                        help='Where exports are written and reused (default: a temp dir)')
+    parser.add_argument('--output', type=str, help='Write results as JSON')
+    parser.add_argument('--measure', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', type=str, default='planner', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.mode)))
+        sys.exit(0)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='bench_columnar_')
+    os.makedirs(data_dir, exist_ok=True)
+    formats = available_formats()
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeats': args.repeats,
+        'sizes': [],
+    }
+    for n_rows in args.sizes:
+        size_formats = [fmt for fmt in formats if fmt != 'excel' or n_rows <= args.max_excel_rows]
+        paths = write_exports(data_dir, n_rows, size_formats)
+        entry = {'rows': n_rows, 'formats': {}}
+        for fmt, path in paths.items():
+            entry['formats'][fmt] = {
+                'file_mb': round(os.path.getsize(path) / 1e6, 2),
+                **{mode: bench_file(path, mode, args.repeats) for mode in MODES},
+            }
+        results['sizes'].append(entry)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,327 @@
+"""
+Planner benchmark: per-phase latency percentiles and plan quality on
+synthetic catalogs
+
+For each catalog size, builds (or reuses) a synthetic nutrition_data
+database with realistic hall/meal/category mixes, then times every phase
+of a meal request over many random requests:
+
+    load_data, query_available_items (SQL pushdown), filter_available_items
+    (in-memory catalog), categorize_items, build_item_pool, search,
+    optimize_servings, evaluate_meal
+
+and reports p50/p95/p99 per phase plus plan quality (calorie error,
+macro distance, score). Results are written as JSON so runs can be
+compared (--baseline prints the p50 ratio against an earlier run).
+
+Usage:
+    python3 bench_planner.py
+    python3 bench_planner.py --sizes 1000 10000 --requests 50 --output bench.json
+    python3 bench_planner.py --baseline bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from meal_planner import MealPlanner
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(current_dir), 'scrapers'))
+from load_to_db import create_nutrition_table, build_dimensions, hall_aliases  # noqa: E402
+
+
+# Synthetic catalog shape: hall name -> share of rows
+HALLS = {
+    'Illinois Street Dining Center (ISR)': 0.30,
+    'Ikenberry Dining Center (Ike)': 0.30,
+    'Pennsylvania Avenue Dining Hall (PAR)': 0.25,
+    'Lincoln Avenue Dining Hall (Allen)': 0.15,
+}
+MEALS = {'Breakfast': 0.30, 'Lunch': 0.35, 'Dinner': 0.35}
+
+# Items per hall/meal/date menu; sets how many dates a catalog spans
+MENU_SIZE = 150
+
+# Category -> (share of rows, mean calories, (protein, fat, carb) calorie shares, dish names)
+CATEGORIES = {
+    'Entrees': (0.22, 420, (0.30, 0.35, 0.35),
+                ['Grilled Chicken', 'Beef Tacos', 'Pork Loin', 'Baked Salmon', 'Tofu Stir Fry',
+                 'Black Bean Burger', 'Turkey Sandwich', 'Cheese Pizza']),
+    'Grains & Starches': (0.14, 220, (0.10, 0.15, 0.75),
+                          ['White Rice', 'Penne Pasta', 'Mashed Potatoes', 'Quinoa', 'Dinner Roll',
+                           'Flour Tortilla']),
+    'Vegetables': (0.14, 80, (0.15, 0.30, 0.55),
+                   ['Steamed Broccoli', 'Roasted Carrots', 'Sauteed Spinach', 'Green Beans',
+                    'Garden Salad']),
+    'Breakfast': (0.12, 260, (0.20, 0.40, 0.40),
+                  ['Scrambled Eggs', 'Pancakes', 'Belgian Waffle', 'Sausage Link', 'Bagel', 'Oatmeal']),
+    'Salad Bar': (0.10, 60, (0.15, 0.45, 0.40),
+                  ['Romaine Lettuce', 'Cherry Tomatoes', 'Chickpeas', 'Cucumber', 'Ranch Dressing']),
+    'Soups': (0.08, 180, (0.20, 0.35, 0.45),
+              ['Chicken Noodle Soup', 'Tomato Basil Soup', 'Lentil Soup', 'Beef Chili']),
+    'Desserts': (0.10, 300, (0.05, 0.40, 0.55),
+                 ['Chocolate Chip Cookie', 'Brownie', 'Fruit Cup', 'Apple Pie']),
+    'Beverages': (0.05, 120, (0.15, 0.20, 0.65),
+                  ['Milk', 'Orange Juice', 'Chocolate Milk']),
+    None: (0.05, 250, (0.20, 0.35, 0.45),
+           ['Chef Special', 'Daily Feature', 'Grab and Go Wrap']),
+}
+
+# Share of rows the planner skips (no calories or missing macros)
+UNUSABLE_SHARE = 0.03
+
+PHASES = ['load_data', 'query_available_items', 'filter_available_items', 'categorize_items',
+          'build_item_pool', 'search', 'optimize_servings', 'evaluate_meal']
+
+# OR REPLACE: random names can repeat an item on a menu, which the natural
+# key index (load_to_db.MENU_ITEM_KEY) allows once, keeping the last values
+INSERT_SQL = '''
+    INSERT OR REPLACE INTO nutrition_data (
+        dining_hall, service, date, meal_type, category, name, serving_size,
+        calories, total_fat, saturated_fat, trans_fat, cholesterol, sodium, potassium,
+        total_carbohydrate, dietary_fiber, sugars, protein
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def synthetic_rows(n_rows, rng, start=date(2025, 8, 25)):
+    """
+    Yield n_rows nutrition_data tuples (in INSERT_SQL column order)
+
+    Returns:
+        Generator of tuples; dates span enough days for MENU_SIZE items per menu
+    """
+    n_days = max(1, -(-n_rows // (MENU_SIZE * len(HALLS) * len(MEALS))))
+    labels = [(start + timedelta(days=d)).strftime('%A, %B %d, %Y') for d in range(n_days)]
+
+    halls = list(HALLS)
+    hall = rng.choice(len(halls), size=n_rows, p=list(HALLS.values()))
+    meal = rng.choice(len(MEALS), size=n_rows, p=list(MEALS.values()))
+    day = rng.integers(n_days, size=n_rows)
+
+    categories = list(CATEGORIES)
+    shares = np.array([spec[0] for spec in CATEGORIES.values()])
+    category = rng.choice(len(categories), size=n_rows, p=shares / shares.sum())
+
+    # Calories around the category mean, macros split around its shares
+    mean_cals = np.array([spec[1] for spec in CATEGORIES.values()])[category]
+    calories = np.round(mean_cals * rng.lognormal(0, 0.35, n_rows))
+    macro_shares = np.array([spec[2] for spec in CATEGORIES.values()])[category]
+    split = rng.gamma(macro_shares * 20) + 1e-9
+    split /= split.sum(axis=1, keepdims=True)
+    grams = np.round(calories[:, None] * split / np.array([4, 9, 4]), 1)
+    fiber = np.round(rng.exponential(2.0, n_rows), 1)
+    variant = rng.integers(1000, size=n_rows)
+
+    unusable = rng.random(n_rows) < UNUSABLE_SHARE
+    calories[unusable & (rng.random(n_rows) < 0.5)] = 0
+
+    meals = list(MEALS)
+    for i in range(n_rows):
+        spec = CATEGORIES[categories[category[i]]]
+        dishes = spec[3]
+        name = f'{dishes[variant[i] % len(dishes)]} {variant[i]}'
+        protein = None if unusable[i] and calories[i] > 0 else float(grams[i, 0])
+        yield (
+            halls[hall[i]], 'Main', labels[day[i]], meals[meal[i]], categories[category[i]], name,
+            '1 serving', float(calories[i]), float(grams[i, 1]), 0.0, 0.0, 0.0, 0.0, 0.0,
+            float(grams[i, 2]), float(fiber[i]), 0.0, protein,
+        )
+
+
+def build_catalog(db_file, n_rows, seed=0):
+    """Write a synthetic catalog of n_rows to db_file (schema and lookups as load_to_db builds them)"""
+    if os.path.exists(db_file):
+        os.remove(db_file)
+
+    conn = sqlite3.connect(db_file)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_nutrition_table(conn)
+        conn.executemany(INSERT_SQL, synthetic_rows(n_rows, np.random.default_rng(seed)))
+        build_dimensions(conn)
+        conn.commit()
+    conn.close()
+
+
+def catalog_path(data_dir, n_rows, seed):
+    """Synthetic catalog for a size, built on first use and reused after that"""
+    db_file = os.path.join(data_dir, f'synthetic_{n_rows}_{seed}.db')
+    if not os.path.exists(db_file):
+        started = time.perf_counter()
+        build_catalog(db_file + '.tmp', n_rows, seed)
+        os.replace(db_file + '.tmp', db_file)
+        print(f'  built {db_file} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    return db_file
+
+
+def percentiles(values):
+    """p50/p95/p99/mean of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    values = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3),
+            'mean': round(float(values.mean()), 3), 'n': len(values)}
+
+
+def sample_requests(db_file, n_requests, goals, rng):
+    """Random (hall code, meal, date key, goal, target calories) drawn from menus that exist"""
+    conn = sqlite3.connect(db_file)
+    menus = conn.execute('''
+        SELECT DISTINCT h.name, d.meal_type, d.date_key
+        FROM nutrition_data d JOIN dining_halls h ON h.hall_id = d.hall_id
+    ''').fetchall()
+    conn.close()
+
+    requests = []
+    for i in rng.integers(len(menus), size=n_requests):
+        hall, meal, date_key = menus[i]
+        code, _ = hall_aliases(hall)
+        requests.append((code or hall, meal, date_key, goals[rng.integers(len(goals))],
+                         int(rng.integers(4, 13)) * 50))
+    return requests
+
+
+def macro_distance(cals, protein, fat, carbs, goal_config):
+    """Euclidean distance of a meal's macro calorie shares from the goal's (as within_tolerance)"""
+    if cals <= 0:
+        return None
+    return float(np.sqrt(
+        (protein * 4 / cals - goal_config['p'])**2 +
+        (fat * 9 / cals - goal_config['f'])**2 +
+        (carbs * 4 / cals - goal_config['c'])**2
+    ))
+
+
+def bench_size(db_file, n_requests, candidates, load_repeats, seed):
+    """
+    Time every phase over n_requests random requests against one catalog
+
+    Returns:
+        {'phases': {phase: percentiles (ms)}, 'quality': {metric: percentiles}}
+    """
+    rng = np.random.default_rng(seed)
+    timings = {phase: [] for phase in PHASES}
+    quality = {'calorie_error_pct': [], 'macro_distance': [], 'score': []}
+
+    def timed(phase, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[phase].append((time.perf_counter() - started) * 1000)
+        return result
+
+    # SQL pushdown: no catalog held in memory
+    pushdown = MealPlanner(db_file=db_file, seed=seed)
+    catalog = MealPlanner(db_file=db_file, seed=seed)
+    for _ in range(load_repeats):
+        timed('load_data', catalog.load_data)
+
+    for hall, meal, date_key, goal, target in sample_requests(db_file, n_requests, list(catalog.GOALS), rng):
+        goal_config = catalog.GOALS[goal]
+        timed('query_available_items', pushdown.filter_available_items, hall, meal, date_key)
+        items_df = timed('filter_available_items', catalog.filter_available_items, hall, meal, date_key)
+        if items_df.empty:
+            continue
+
+        timed('categorize_items', catalog.categorize_items, items_df)
+        pool = timed('build_item_pool', catalog.build_item_pool, items_df)
+        (indices, _, _), _, _ = timed('search', catalog.search_pool, pool, target, goal_config,
+                                      candidates=candidates)
+
+        # The legacy dict path, from the chosen items at one serving each
+        items = pool.to_items(indices, np.ones(len(indices)), pool.nutrients[indices])
+        items = timed('optimize_servings', catalog.optimize_servings, items, target)
+        score = timed('evaluate_meal', catalog.evaluate_meal, items, target, goal_config)
+
+        totals = np.sum([[item['calories'], item['protein'], item['total_fat'], item['total_carbohydrate']]
+                         for item in items], axis=0)
+        quality['calorie_error_pct'].append(abs(totals[0] - target) / target * 100)
+        distance = macro_distance(totals[0], totals[1], totals[2], totals[3], goal_config)
+        if distance is not None:
+            quality['macro_distance'].append(distance)
+        quality['score'].append(float(score))
+
+    return {
+        'phases': {phase: percentiles(values) for phase, values in timings.items()},
+        'quality': {metric: percentiles(values) for metric, values in quality.items()},
+    }
+
+
+def print_report(results, baseline=None):
+    """Table of p50/p95/p99 per phase (and the p50 ratio to a baseline run, if given)"""
+    base = {row['rows']: row for row in baseline['results']} if baseline else {}
+    for row in results:
+        print(f"\n{row['rows']:,} rows ({row['usable_rows']:,} usable)")
+        header = f"{'phase':>24} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"
+        print(header + (f" {'vs base':>8}" if base else ''))
+        for phase, stats in row['phases'].items():
+            if stats is None:
+                continue
+            line = f"{phase:>24} {stats['p50']:>10.3f} {stats['p95']:>10.3f} {stats['p99']:>10.3f}"
+            old = base.get(row['rows'], {}).get('phases', {}).get(phase)
+            if old and old['p50']:
+                line += f" {stats['p50'] / old['p50']:>7.2f}x"
+            print(line)
+        for metric, stats in row['quality'].items():
+            if stats is not None:
+                print(f"{metric:>24} {stats['p50']:>10.3f} {stats['p95']:>10.3f} {stats['p99']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Random meal requests timed per catalog size')
+    parser.add_argument('--candidates', type=int, default=10000)
+    parser.add_argument('--load-repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', type=str, default=os.path.join(tempfile.gettempdir(), 'planner_bench'),
+                        help='Where synthetic catalogs are built and reused')
+    parser.add_argument('--output', type=str, default='bench_planner.json')
+    parser.add_argument('--baseline', type=str, help='Earlier --output file to compare against')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = []
+    for n_rows in args.sizes:
+        print(f'{n_rows:,} rows...', file=sys.stderr)
+        db_file = catalog_path(args.data_dir, n_rows, args.seed)
+        conn = sqlite3.connect(db_file)
+        usable = conn.execute(
+            'SELECT COUNT(*) FROM nutrition_data WHERE calories > 0 AND protein IS NOT NULL'
+        ).fetchone()[0]
+        conn.close()
+
+        row = bench_size(db_file, args.requests, args.candidates, args.load_repeats, args.seed)
+        results.append({'rows': n_rows, 'usable_rows': usable, **row})
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {'sizes': args.sizes, 'requests': args.requests, 'candidates': args.candidates,
+                   'load_repeats': args.load_repeats, 'seed': args.seed},
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'pandas': pd.__version__, 'machine': platform.machine(),
+                        'cpus': os.cpu_count()},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(results, baseline)
+    print(f'\nWrote {args.output}', file=sys.stderr)
@@ -0,0 +1,93 @@
+"""
+Refinement strategy benchmark: speed and quality of each refine.STRATEGIES
+entry on the same starting meals
+
+For every hall/meal/goal combination (several seeds each), runs the batch
+engine once and then each strategy on its best meal, reporting the mean
+final score, mean gain over the starting meal and mean time.
+
+Usage:
+    python3 bench_refine.py --db ../data/nutrition_data.db
+    python3 bench_refine.py --db ... --candidates 300 --iterations 500 2000 --json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from meal_planner import MealPlanner
+from refine import STRATEGIES, refine_meal
+
+
+def run(planner, halls, meals, goals, candidates, iterations, repeats):
+    """
+    Returns:
+        List of {strategy, iterations, mean_score, mean_gain, ms} rows
+        (plus a 'none' row for the unrefined search)
+    """
+    starts = []
+    for hall in halls:
+        for meal in meals:
+            pool = planner.get_item_pool(hall, meal)
+            if pool is None:
+                continue
+            for goal in goals:
+                goal_config = planner.GOALS[goal]
+                for seed in range(repeats):
+                    planner.rng = np.random.default_rng(seed)
+                    best_meal, score, _ = planner.search_pool(pool, 600, goal_config, candidates=candidates)
+                    starts.append((pool, goal_config, seed, best_meal, score))
+
+    base = [score for *_, score in starts]
+    rows = [{'strategy': 'none', 'iterations': 0, 'mean_score': round(float(np.mean(base)), 2),
+             'mean_gain': 0.0, 'ms': 0.0}]
+
+    for strategy in STRATEGIES:
+        for n in iterations:
+            scores, elapsed = [], []
+            for pool, goal_config, seed, best_meal, _ in starts:
+                planner.rng = np.random.default_rng(seed)
+                started = time.perf_counter()
+                _, score, _ = refine_meal(planner, pool, best_meal, 600, goal_config,
+                                          strategy=strategy, iterations=n)
+                elapsed.append(time.perf_counter() - started)
+                scores.append(score)
+
+            rows.append({
+                'strategy': strategy,
+                'iterations': n,
+                'mean_score': round(float(np.mean(scores)), 2),
+                'mean_gain': round(float(np.mean(np.array(scores) - base)), 2),
+                'ms': round(float(np.mean(elapsed)) * 1000, 2),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_db = os.path.join(os.path.dirname(current_dir), 'data', 'nutrition_data.db')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', type=str, default=default_db)
+    parser.add_argument('--halls', nargs='+', default=['ISR', 'PAR', 'Ikenberry'])
+    parser.add_argument('--meals', nargs='+', default=['Breakfast', 'Lunch', 'Dinner'])
+    parser.add_argument('--goals', nargs='+')
+    parser.add_argument('--candidates', type=int, default=1000)
+    parser.add_argument('--iterations', nargs='+', type=int, default=[500, 2000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    planner = MealPlanner(db_file=args.db)
+    rows = run(planner, args.halls, args.meals, args.goals or list(planner.GOALS),
+               args.candidates, args.iterations, args.repeats)
+
+    if args.json:
+        print(json.dumps(rows))
+    else:
+        print(f"{'strategy':>12} {'iterations':>10} {'mean_score':>10} {'mean_gain':>9} {'ms':>8}")
+        for row in rows:
+            print(f"{row['strategy']:>12} {row['iterations']:>10} {row['mean_score']:>10.2f} "
+                  f"{row['mean_gain']:>9.2f} {row['ms']:>8.2f}")
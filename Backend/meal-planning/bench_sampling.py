@@ -0,0 +1,90 @@
+"""
+Samples-to-quality benchmark: uniform vs goal-weighted candidate sampling
+
+For each candidate budget, runs the batch engine over every hall/meal/goal
+combination (several seeds each) and reports the mean best plan score, so
+the two curves show how many candidates each sampler needs to reach a
+given plan quality.
+
+Usage:
+    python3 bench_sampling.py --db ../data/nutrition_data.db
+    python3 bench_sampling.py --db ... --temperatures 5 10 20 --json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from meal_planner import MealPlanner
+
+
+def run(planner, halls, meals, goals, budgets, samplers, repeats):
+    """
+    Returns:
+        Dict of sampler label -> list of {candidates, mean_score, p10_score, ms}
+    """
+    curves = {}
+    for label, sampling, temperature in samplers:
+        curve = []
+        for n in budgets:
+            scores, elapsed = [], []
+            for hall in halls:
+                for meal in meals:
+                    pool = planner.get_item_pool(hall, meal)
+                    if pool is None:
+                        continue
+                    for goal in goals:
+                        goal_config = planner.GOALS[goal]
+                        for seed in range(repeats):
+                            planner.rng = np.random.default_rng(seed)
+                            started = time.perf_counter()
+                            _, score, _ = planner.search_pool(
+                                pool, 600, goal_config, candidates=n,
+                                sampling=sampling, temperature=temperature
+                            )
+                            elapsed.append(time.perf_counter() - started)
+                            scores.append(score)
+
+            curve.append({
+                'candidates': n,
+                'mean_score': round(float(np.mean(scores)), 2),
+                'p10_score': round(float(np.percentile(scores, 10)), 2),
+                'ms': round(float(np.mean(elapsed)) * 1000, 2),
+            })
+        curves[label] = curve
+    return curves
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_db = os.path.join(os.path.dirname(current_dir), 'data', 'nutrition_data.db')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', type=str, default=default_db)
+    parser.add_argument('--halls', nargs='+', default=['ISR', 'PAR', 'Ikenberry'])
+    parser.add_argument('--meals', nargs='+', default=['Breakfast', 'Lunch', 'Dinner'])
+    parser.add_argument('--goals', nargs='+')
+    parser.add_argument('--budgets', nargs='+', type=int, default=[30, 100, 300, 1000, 3000, 10000])
+    parser.add_argument('--temperatures', nargs='+', type=float, default=[10.0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    planner = MealPlanner(db_file=args.db)
+    goals = args.goals or list(planner.GOALS)
+    samplers = [('uniform', 'uniform', None)] + [
+        (f'weighted (T={t:g})', 'weighted', t) for t in args.temperatures
+    ]
+
+    curves = run(planner, args.halls, args.meals, goals, args.budgets, samplers, args.repeats)
+
+    if args.json:
+        print(json.dumps(curves))
+    else:
+        labels = list(curves)
+        print('candidates  ' + '  '.join(f'{label:>18}' for label in labels))
+        for i, n in enumerate(args.budgets):
+            row = '  '.join(f"{curves[label][i]['mean_score']:>18.2f}" for label in labels)
+            print(f'{n:>10}  {row}')
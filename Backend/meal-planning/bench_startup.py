@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark for the planner CLI
+
+Runs each command below in a fresh Python process several times and
+reports the wall time, so the cost of interpreter start, imports and a
+whole one-plan CLI call can be tracked:
+
+    python         interpreter start alone
+    numpy          import numpy
+    pandas         import pandas (only needed for Excel / in-memory catalogs)
+    meal_planner   import meal_planner
+    cli            python3 meal_planner.py --db ... --json (one plan)
+
+Usage:
+    python3 bench_startup.py --db ../data/nutrition_data.db
+    python3 bench_startup.py --db ... --hall PAR --meal Dinner --repeats 20 --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def time_command(command, repeats, cwd):
+    """
+    Returns:
+        {min, p50, max} wall milliseconds over repeats runs (None if the command fails)
+    """
+    elapsed = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            return None
+    return {
+        'min': round(min(elapsed), 1),
+        'p50': round(float(np.median(elapsed)), 1),
+        'max': round(max(elapsed), 1),
+    }
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_db = os.path.join(os.path.dirname(current_dir), 'data', 'nutrition_data.db')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', type=str, default=default_db)
+    parser.add_argument('--hall', type=str, default='ISR')
+    parser.add_argument('--meal', type=str, default='Lunch')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    python = sys.executable
+    commands = {
+        'python': [python, '-c', 'pass'],
+        'numpy': [python, '-c', 'import numpy'],
+        'pandas': [python, '-c', 'import pandas'],
+        'meal_planner': [python, '-c', 'import meal_planner'],
+        'cli': [python, 'meal_planner.py', '--db', args.db, '--hall', args.hall,
+                '--meal', args.meal, '--json'],
+    }
+
+    results = {name: time_command(command, args.repeats, current_dir) for name, command in commands.items()}
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"{'command':>14} {'min ms':>8} {'p50 ms':>8} {'max ms':>8}")
+        for name, stats in results.items():
+            if stats is None:
+                print(f'{name:>14}   failed')
+            else:
+                print(f"{name:>14} {stats['min']:>8.1f} {stats['p50']:>8.1f} {stats['max']:>8.1f}")
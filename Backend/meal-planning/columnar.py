@@ -0,0 +1,93 @@
+"""
+Columnar interchange files for scraped nutrition data
+Parquet (.parquet) and Arrow IPC (.arrow / .feather) versions of the
+scraper's Excel export: typed float columns, dictionary-encoded hall,
+service, date, meal and category strings, and reads that only decode the
+columns asked for. Used by the scraper export, load_to_db.py and
+MealPlanner(excel_file=...); Excel files still work everywhere.
+
+Parquet/Arrow need pyarrow (pip install pyarrow).
+"""
+import os
+
+
+# Columns of the scraper export, in order
+NUTRITION_COLUMNS = [
+    'dining_hall', 'service', 'date', 'meal_type', 'category', 'name', 'serving_size',
+    'calories', 'total_fat', 'saturated_fat', 'trans_fat', 'cholesterol',
+    'sodium', 'potassium', 'total_carbohydrate', 'dietary_fiber', 'sugars', 'protein'
+]
+
+# Few distinct values, so stored dictionary-encoded
+DICTIONARY_COLUMNS = ['dining_hall', 'service', 'date', 'meal_type', 'category']
+
+NUMERIC_COLUMNS = NUTRITION_COLUMNS[7:]
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrow', '.feather')
+EXCEL_SUFFIXES = ('.xlsx', '.xls')
+DATA_FILE_SUFFIXES = PARQUET_SUFFIXES + ARROW_SUFFIXES + EXCEL_SUFFIXES
+
+
+def file_format(path):
+    """'parquet', 'arrow' or 'excel' by file extension"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in PARQUET_SUFFIXES:
+        return 'parquet'
+    if suffix in ARROW_SUFFIXES:
+        return 'arrow'
+    if suffix in EXCEL_SUFFIXES:
+        return 'excel'
+    raise ValueError(f'Unsupported data file (expected {", ".join(DATA_FILE_SUFFIXES)}): {path}')
+
+
+def typed_frame(df):
+    """
+    Copy of a nutrition frame with the columnar schema: float64 nutrients
+    (unparseable values as NaN) and categorical hall/service/date/meal/category
+    """
+    import pandas as pd
+
+    df = df.copy()
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    for column in DICTIONARY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def write_nutrition_file(df, path):
+    """
+    Write a nutrition frame as Parquet or Arrow IPC (by extension)
+
+    Raises:
+        ImportError: pyarrow is not installed
+    """
+    df = typed_frame(df).reset_index(drop=True)
+    fmt = file_format(path)
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False, compression='zstd')
+    elif fmt == 'arrow':
+        df.to_feather(path, compression='zstd')
+    else:
+        raise ValueError(f'write_nutrition_file writes Parquet or Arrow, not Excel: {path}')
+    return path
+
+
+def read_nutrition_file(path, columns=None):
+    """
+    Read an Excel, Parquet or Arrow nutrition file into a DataFrame
+
+    Args:
+        columns: Only read these columns (skipped entirely on disk for Parquet/Arrow)
+    """
+    import pandas as pd
+
+    fmt = file_format(path)
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    if fmt == 'arrow':
+        return pd.read_feather(path, columns=columns)
+    return pd.read_excel(path, usecols=columns)
@@ -0,0 +1,360 @@
+"""
+Exact meal optimizer (branch-and-bound)
+Searches every combination of items and half-serving portions for the plan
+with the best evaluate_meal score, pruning branches that provably can't
+beat the best plan found so far. Starts from the batch engine's best plan,
+always continues from the open branch with the highest bound, and dives
+from it to a complete plan so better plans keep turning up.
+"""
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from item_pool import CAL, PROTEIN, FAT, CARBS
+from search import batch_search
+
+
+# Portion sizes the optimizer may pick (in servings)
+DISCRETE_LEVELS = (0.5, 1.0, 1.5, 2.0)
+CONTINUOUS_LEVELS = (0.5, 1.0, 1.5, 2.0, 2.5, 3.0)
+
+# Fixed directions used to bound the macro distance: for any unit vector u,
+# dist(goal, hull(points)) >= min over points of u . (point - goal)
+_DIRECTIONS = np.array(
+    [d for d in itertools.product((-1, 0, 1), repeat=3) if any(d)], dtype=np.float64
+)
+_DIRECTIONS /= np.linalg.norm(_DIRECTIONS, axis=1)[:, None]
+
+# The calories a branch can still add are split into this many ranges when
+# bounding it, so a branch can't claim the best calorie and the best macro
+# score at amounts of food that contradict each other. Only branches the
+# cheaper one-range bound can't prune are bounded this finely
+BOUND_STEPS = 8
+
+# Batch candidates scored for the starting plan (the batch engine's default),
+# and the largest share of the time limit that search may use
+SEED_CANDIDATES = 10000
+SEED_TIME_SHARE = 0.5
+
+
+class BranchAndBound:
+    def __init__(self, planner, pool, target_calories, goal_config, max_items=5, time_limit=1.0,
+                 target_score=None, seed_candidates=SEED_CANDIDATES, weights=None):
+        """
+        Args:
+            planner: MealPlanner (provides rng and score_totals)
+            pool: ItemPool for the meal
+            max_items: Most distinct items in a plan
+            time_limit: Seconds before returning the best plan found so far,
+                        counted from construction (building the atoms and the
+                        starting batch search count against it)
+            target_score: Stop as soon as a plan scores at least this much
+            seed_candidates: Batch candidates scored for the starting plan (0 = none)
+            weights: Sampling weights for that batch search (see sample_candidates)
+        """
+        self.started = time.perf_counter()
+        self.planner = planner
+        self.pool = pool
+        self.target = float(target_calories)
+        self.goal_config = goal_config
+        self.goal = np.array([goal_config['p'], goal_config['f'], goal_config['c']])
+        self.max_items = max_items
+        self.time_limit = time_limit
+        self.target_score = target_score
+        self.seed_candidates = seed_candidates
+        self.weights = weights
+
+        self._build_atoms()
+
+    def _build_atoms(self):
+        """Expand every item into one 'atom' per allowed portion size"""
+        pool = self.pool
+        nutrients = pool.nutrients
+        cals = nutrients[:, CAL]
+
+        # Macro energy ratios of each item (same definition as evaluate_meal)
+        safe = np.where(cals > 0, cals, 1)
+        ratios = np.stack([
+            nutrients[:, PROTEIN] * 4 / safe,
+            nutrients[:, FAT] * 9 / safe,
+            nutrients[:, CARBS] * 4 / safe,
+        ], axis=1)
+
+        # Try the items that are closest to the goal on their own first so a
+        # good incumbent shows up early and prunes more of the tree
+        usable = np.flatnonzero(cals > 0)
+        order = usable[np.argsort(np.linalg.norm(ratios[usable] - self.goal, axis=1))]
+        self.order = order
+
+        atom_pos, atom_level = [], []
+        for pos, idx in enumerate(order):
+            levels = DISCRETE_LEVELS if pool.discrete[idx] else CONTINUOUS_LEVELS
+            atom_pos.extend([pos] * len(levels))
+            atom_level.extend(levels)
+
+        self.atom_pos = np.array(atom_pos, dtype=np.int64)
+        self.atom_level = np.array(atom_level, dtype=np.float64)
+        items = order[self.atom_pos]
+        self.atom_totals = nutrients[items][:, [CAL, PROTEIN, FAT, CARBS]] * self.atom_level[:, None]
+        self.atom_cat = pool.category_codes[items]
+        self.atom_name = pool.name_codes[items]
+
+        # First atom of each item position (plus a sentinel at the end)
+        self.atom_start = np.searchsorted(self.atom_pos, np.arange(len(order) + 1))
+
+        # Suffix summaries over item positions, used for the bounds
+        n = len(order)
+        projections = (ratios[order] - self.goal) @ _DIRECTIONS.T
+        min_energy = cals[order] * np.array(
+            [min(DISCRETE_LEVELS) if pool.discrete[i] else min(CONTINUOUS_LEVELS) for i in order]
+        )
+        max_energy = cals[order] * np.array(
+            [max(DISCRETE_LEVELS) if pool.discrete[i] else max(CONTINUOUS_LEVELS) for i in order]
+        )
+
+        # Running minima from the end, so the atoms count toward the time limit as little as possible
+        self.suffix_projection = np.full((n + 1, len(_DIRECTIONS)), np.inf)
+        self.suffix_energy = np.full(n + 1, np.inf)
+        if n:
+            self.suffix_projection[:n] = np.minimum.accumulate(projections[::-1], axis=0)[::-1]
+            self.suffix_energy[:n] = np.minimum.accumulate(min_energy[::-1])[::-1]
+
+        # suffix_top_energy[pos, k]: most calories k more items from positions >= pos can add
+        top_rows = [[0.0] * (self.max_items + 1)]
+        suffix_categories = [0]
+        seen = set()
+        largest = []
+        for energy, category in zip(max_energy[::-1].tolist(), pool.category_codes[order[::-1]].tolist()):
+            largest = sorted(largest + [energy], reverse=True)[:self.max_items]
+            top = list(itertools.accumulate(largest))
+            top_rows.append([0.0] + top + [top[-1]] * (self.max_items - len(top)))
+            seen.add(category)
+            suffix_categories.append(len(seen))
+        self.suffix_top_energy = np.array(top_rows[::-1])
+        self.suffix_categories = np.array(suffix_categories[::-1], dtype=np.int64)
+
+    def _cal_score(self, energy):
+        return np.maximum(0, 100 - np.abs(energy - self.target) / self.target * 200)
+
+    def _bounds(self, totals, n_cats, next_pos, slots_left, steps=BOUND_STEPS):
+        """
+        Upper bound on the score of any plan that extends each given partial plan
+        with one to slots_left items from positions >= next_pos (-inf if there
+        are none left)
+
+        Args:
+            steps: Ranges the added calories are split into (more is tighter and slower)
+        """
+        energy = totals[:, 0]
+        extendable = next_pos < len(self.order)
+        pos = np.where(extendable, next_pos, 0)
+
+        # The added calories lie between one smallest portion and the
+        # slots_left largest ones; bound each of the ranges of them
+        low = self.suffix_energy[pos]
+        high = self.suffix_top_energy[pos, slots_left]
+        added = low[:, None] + (high - low)[:, None] * np.linspace(0, 1, steps + 1)
+        reachable = energy[:, None] + added
+
+        # Best calorie score within each range: closest reachable total to the target
+        cal_ub = self._cal_score(np.clip(self.target, reachable[:, :-1], reachable[:, 1:]))
+
+        # Along each direction the final macro ratio is the energy-weighted
+        # mean of the partial plan's projection and the added items' (each at
+        # least suffix_projection), which is monotonic in the added calories,
+        # so it is smallest at one end of each range
+        safe = np.where(energy > 0, energy, 1)
+        ratio = np.stack([totals[:, 1] * 4 / safe, totals[:, 2] * 9 / safe, totals[:, 3] * 4 / safe], axis=1)
+        own = (ratio - self.goal) @ _DIRECTIONS.T
+        projection = ((energy[:, None, None] * own[:, None, :] +
+                       added[:, :, None] * self.suffix_projection[pos][:, None, :]) / reachable[:, :, None])
+        projection = np.minimum(projection[:, :-1], projection[:, 1:])
+        dist_lb = np.maximum(0, projection.max(axis=2))
+        macro_ub = np.maximum(0, 100 - dist_lb * 200)
+
+        div_ub = n_cats + np.minimum(slots_left, self.suffix_categories[pos])
+
+        bounds = (cal_ub * 0.4 + macro_ub * 0.5).max(axis=1) + div_ub * 10 * 0.1
+        return np.where(extendable, bounds, -np.inf)
+
+    def solve(self):
+        """
+        Returns:
+            (indices, servings, scaled, score, stats) for the best plan found
+            (the starting batch plan if nothing beat it); stats reports why
+            it stopped, whether the plan is proven optimal and the upper
+            bound on the best possible score
+
+        Raises:
+            ValueError: The pool has no items with calories
+        """
+        if len(self.order) == 0:
+            raise ValueError('No items with calories to plan with')
+
+        self.stop_reason = None
+        self.nodes = 0
+        self.evaluated = 0
+        self.best_score = -float('inf')
+        self.best_atoms = None
+        self.open_bound = -float('inf')
+
+        # A good plan up front lets the bounds prune from the first expansion
+        seed = None
+        if self.seed_candidates:
+            seed = batch_search(self.planner, self.pool, self.target, self.goal_config,
+                                n_candidates=self.seed_candidates, max_items=self.max_items,
+                                deadline=self.started + self.time_limit * SEED_TIME_SHARE,
+                                weights=self.weights)
+            self.evaluated += seed[-1]['candidates_evaluated']
+            self.best_score = seed[3]
+            if self.target_score is not None and self.best_score >= self.target_score:
+                self.stop_reason = 'target_score'
+
+        self._search()
+
+        result = None
+        if self.best_atoms is not None:
+            atoms = self.best_atoms
+            indices = [int(self.order[self.atom_pos[a]]) for a in atoms]
+            servings = self.atom_level[atoms]
+            scaled = np.round(self.pool.nutrients[indices] * servings[:, None], 1)
+            score = self.planner.evaluate_pool_meal(self.pool, indices, scaled, self.target, self.goal_config)
+            result = (indices, servings, scaled, score)
+        if seed is not None and (result is None or seed[3] >= result[3]):
+            result = seed[:4]
+
+        best_score = max(result[3], self.best_score)
+        upper_bound = max(best_score, self.open_bound)
+        stats = {
+            'engine': 'exact',
+            'candidates_evaluated': self.evaluated,
+            'stop_reason': self.stop_reason or 'optimal',
+            'elapsed_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'optimal': self.stop_reason is None,
+            'upper_bound': round(float(upper_bound), 3),
+            'gap': round(float(upper_bound - best_score), 3),
+            'nodes': self.nodes,
+            'seed_score': None if seed is None else round(float(seed[3]), 2),
+        }
+        return result + (stats,)
+
+    def _search(self):
+        """
+        Best-first branch-and-bound: take the open branch with the highest
+        bound and dive from it, always into its highest-bound child, until
+        the dive reaches max_items or is pruned; the rest of each expanded
+        node's children stay open. Stops when no open branch can beat the
+        best plan, or on the time limit / target score.
+        """
+        # Open branches: (-bound, tiebreak, children, k) for the best child k
+        # not yet taken of an expanded node (its children sorted by bound)
+        heap = []
+        tiebreak = itertools.count()
+        node = ((), np.zeros(4), frozenset(), frozenset(), 0)
+        bound = float(self._bounds(np.zeros((1, 4)), np.zeros(1, dtype=np.int64),
+                                   np.zeros(1, dtype=np.int64), self.max_items)[0])
+
+        while self.stop_reason is None:
+            # Stop on the budget once there is a plan to return (the root is
+            # always expanded when there is no starting plan)
+            if self.best_score > -float('inf') and time.perf_counter() - self.started > self.time_limit:
+                self.stop_reason = 'budget'
+                break
+
+            if node is None:
+                node, bound = self._next_open(heap, tiebreak)
+                if node is None:
+                    return
+
+            children = self._expand(*node)
+            node = None
+            if children is not None and len(children[4]):
+                node, bound = self._child(children, 0)
+                if len(children[4]) > 1:
+                    heapq.heappush(heap, (-children[5][1], next(tiebreak), children, 1))
+
+        # Whatever is still open bounds what the search could have found (the
+        # root's bound if it was never expanded, so the stats stay finite)
+        if node is not None:
+            self.open_bound = max(self.open_bound, bound)
+        if heap:
+            self.open_bound = max(self.open_bound, -heap[0][0])
+
+    def _next_open(self, heap, tiebreak):
+        """Pop the open branch with the highest bound that can still beat the best plan"""
+        while heap:
+            _, _, children, k = heapq.heappop(heap)
+            if children[5][k] <= self.best_score + 1e-9:
+                continue  # and so can the rest of its siblings
+            if k + 1 < len(children[4]):
+                heapq.heappush(heap, (-children[5][k + 1], next(tiebreak), children, k + 1))
+            return self._child(children, k)
+        return None, None
+
+    def _child(self, children, k):
+        """Partial plan and bound of the k-th child kept by _expand"""
+        atoms, totals, cats, names, child, bounds = children
+        a = int(child[k])
+        node = (atoms + (a,), totals + self.atom_totals[a], cats | {int(self.atom_cat[a])},
+                names | {int(self.atom_name[a])}, int(self.atom_pos[a]) + 1)
+        return node, float(bounds[k])
+
+    def _expand(self, atoms, totals, cats, names, start_pos):
+        """
+        Score every one-atom extension of a partial plan as a complete plan
+
+        Returns:
+            (atoms, totals, cats, names, child_atoms, bounds) for the children
+            worth expanding further, highest bound first (None at max_items)
+        """
+        self.nodes += 1
+
+        first = self.atom_start[start_pos]
+        child = np.arange(first, len(self.atom_pos))
+        if names:
+            child = child[~np.isin(self.atom_name[child], list(names))]
+        if len(child) == 0:
+            return None
+
+        child_totals = totals + self.atom_totals[child]
+        new_cat = ~np.isin(self.atom_cat[child], list(cats)) if cats else np.ones(len(child), dtype=bool)
+        child_cats = len(cats) + new_cat
+
+        # Every extension is itself a complete plan
+        scores = self.planner.score_totals(
+            child_totals[:, 0], child_totals[:, 1], child_totals[:, 2], child_totals[:, 3],
+            child_cats, self.target, self.goal_config
+        )
+        self.evaluated += len(child)
+        best = int(np.argmax(scores))
+        if scores[best] > self.best_score:
+            self.best_score = float(scores[best])
+            self.best_atoms = list(atoms) + [int(child[best])]
+
+            if self.target_score is not None and self.best_score >= self.target_score:
+                self.stop_reason = 'target_score'
+
+        slots_left = self.max_items - len(atoms) - 1
+        if slots_left <= 0:
+            return None
+
+        # Cheap bound for every child, the tighter one for those it can't prune
+        next_pos = self.atom_pos[child] + 1
+        bounds = self._bounds(child_totals, child_cats, next_pos, slots_left, steps=1)
+        open_ = np.flatnonzero(bounds > self.best_score + 1e-9)
+        bounds[open_] = self._bounds(child_totals[open_], child_cats[open_], next_pos[open_], slots_left)
+
+        # Most promising first: highest bound, then best score as a plan on its own
+        keep = np.flatnonzero(bounds > self.best_score + 1e-9)
+        keep = keep[np.lexsort((-scores[keep], -bounds[keep]))]
+        return atoms, totals, cats, names, child[keep], bounds[keep]
+
+
+def exact_search(planner, pool, target_calories, goal_config, max_items=5, time_limit=1.0,
+                 target_score=None, seed_candidates=SEED_CANDIDATES, weights=None):
+    """Run BranchAndBound and return (indices, servings, scaled, score, stats)"""
+    return BranchAndBound(planner, pool, target_calories, goal_config, max_items=max_items,
+                          time_limit=time_limit, target_score=target_score,
+                          seed_candidates=seed_candidates, weights=weights).solve()
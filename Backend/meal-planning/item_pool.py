@@ -0,0 +1,157 @@
+"""
+Array-backed view of the items available for one meal
+Keeps nutrients, food groups and flags in NumPy arrays so the search can
+work with integer indices instead of pandas rows and dicts
+"""
+import numpy as np
+
+
+# Column order of ItemPool.nutrients
+NUTRIENTS = ['calories', 'protein', 'total_fat', 'total_carbohydrate', 'dietary_fiber']
+CAL, PROTEIN, FAT, CARBS, FIBER = range(len(NUTRIENTS))
+
+
+def encode(values):
+    """Map each distinct value to a small integer code (in order of first appearance)"""
+    lookup = {}
+    return np.array([lookup.setdefault(v, len(lookup)) for v in values], dtype=np.int64)
+
+
+class ItemPool:
+    def __init__(self, names, categories, nutrients, groups, discrete, rows=None):
+        """
+        Args:
+            names: Item names, one per row
+            categories: Menu category per row (None if missing)
+            nutrients: float array (n_items x len(NUTRIENTS)), missing values as 0
+            groups: Dict of food group -> bool mask over the rows
+            discrete: bool mask of items served in whole/half units
+            rows: Position of each item in the loaded catalog (None if unknown)
+        """
+        self.names = list(names)
+        self.categories = list(categories)
+        self.nutrients = np.asarray(nutrients, dtype=np.float64)
+        self.discrete = np.asarray(discrete, dtype=bool)
+        self.rows = None if rows is None else np.asarray(rows, dtype=np.int64)
+
+        # Integer codes so duplicate and diversity checks are plain int compares
+        self.name_codes = encode([str(name) for name in self.names])
+        self.category_codes = encode([str(category) for category in self.categories])
+
+        # Row indices per food group, plus 'other' = everything
+        self.group_index = {
+            group: np.flatnonzero(mask) for group, mask in groups.items()
+        }
+        self.group_index['other'] = np.arange(len(self.names))
+
+        # Goal-aware per-item scores (items x goals), filled in by MealPlanner.build_item_pool;
+        # score_columns maps a goal's (p, f, c) split to its column
+        self.item_scores = None
+        self.score_columns = {}
+
+    @classmethod
+    def from_arrays(cls, nutrients, discrete, name_codes, category_codes, groups):
+        """
+        Pool over precomputed arrays, without names or categories
+        (enough for the search; used by workers reading the shared catalog)
+        """
+        pool = cls.__new__(cls)
+        pool.names = pool.categories = pool.rows = None
+        pool.nutrients = np.asarray(nutrients, dtype=np.float64)
+        pool.discrete = np.asarray(discrete, dtype=bool)
+        pool.name_codes = np.asarray(name_codes, dtype=np.int64)
+        pool.category_codes = np.asarray(category_codes, dtype=np.int64)
+        pool.group_index = {
+            group: np.flatnonzero(mask) for group, mask in groups.items()
+        }
+        pool.group_index['other'] = np.arange(len(pool.nutrients))
+        pool.item_scores = None
+        pool.score_columns = {}
+        return pool
+
+    @classmethod
+    def from_frame(cls, df, groups, rows=None):
+        """
+        Build a pool from a filtered nutrition frame
+
+        Args:
+            df: Frame with name, category and the NUTRIENTS columns
+            groups: Food group names; df must have an is_<group> column for each
+                    and an is_discrete column
+            rows: Catalog position of each row of df (None if unknown)
+        """
+        import pandas as pd
+
+        nutrients = df[NUTRIENTS].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        categories = [c if isinstance(c, str) else None for c in df['category']]
+
+        return cls(
+            names=df['name'].tolist(),
+            categories=categories,
+            nutrients=nutrients,
+            groups={group: df[f'is_{group}'].to_numpy(dtype=bool) for group in groups},
+            discrete=df['is_discrete'].to_numpy(dtype=bool),
+            rows=rows,
+        )
+
+    def __len__(self):
+        return len(self.nutrients)
+
+    def group_masks(self):
+        """Dict of food group -> bool mask over the rows (without 'other')"""
+        masks = {}
+        for group, members in self.group_index.items():
+            if group == 'other':
+                continue
+            masks[group] = np.zeros(len(self), dtype=bool)
+            masks[group][members] = True
+        return masks
+
+    def subset(self, rows):
+        """New pool with only the given rows (in that order)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        pool = ItemPool(
+            names=[self.names[i] for i in rows],
+            categories=[self.categories[i] for i in rows],
+            nutrients=self.nutrients[rows],
+            groups={group: mask[rows] for group, mask in self.group_masks().items()},
+            discrete=self.discrete[rows],
+            rows=None if self.rows is None else self.rows[rows],
+        )
+        if self.item_scores is not None:
+            pool.item_scores = self.item_scores[rows]
+            pool.score_columns = dict(self.score_columns)
+        return pool
+
+    def without_names(self, names):
+        """
+        Pool minus any item whose name is in names (self if nothing is removed)
+
+        Returns:
+            ItemPool, or None if every item would be removed
+        """
+        if not names:
+            return self
+
+        keep = [i for i, name in enumerate(self.names) if name not in names]
+        if len(keep) == len(self):
+            return self
+        if not keep:
+            return None
+        return self.subset(keep)
+
+    def to_items(self, indices, servings, scaled):
+        """Build output dicts for the chosen rows (only done for the winning meal)"""
+        items = []
+        for i, idx in enumerate(indices):
+            items.append({
+                'name': self.names[idx],
+                'category': self.categories[idx],
+                'servings': float(servings[i]),
+                'calories': float(scaled[i, CAL]),
+                'protein': float(scaled[i, PROTEIN]),
+                'total_fat': float(scaled[i, FAT]),
+                'total_carbohydrate': float(scaled[i, CARBS]),
+                'dietary_fiber': float(scaled[i, FIBER]),
+            })
+        return items
@@ -1,27 +1,150 @@
 """
 Meal Planning Algorithm
 Generates optimized meal plans based on calorie targets and nutritional goals
+
+pandas is only imported when a DataFrame is actually needed (Excel input,
+an in-memory catalog, filter_available_items); plans for a SQLite database
+are built straight from query rows, which keeps a cold CLI start fast.
 """
+import time
+
+# Taken before the heavy imports so --profile can report what they cost
+_IMPORT_STARTED = time.perf_counter()
+
+import os
+import re
+import json
+import hashlib
 import sqlite3
-import pandas as pd
-import random
+import copy
+import cProfile
 import numpy as np
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from collections import defaultdict
 
+from item_pool import ItemPool, NUTRIENTS, CAL, PROTEIN, FAT, CARBS, FIBER
+from search import (batch_search, within_tolerance, shared_sample_search, scale_nutrients,
+                    DiversePlans, jaccard_distance)
+from exact import exact_search
+from plan_cache import LRUCache, MISSING
+from refine import refine_meal
+from columnar import read_nutrition_file
+
+IMPORT_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
+
+
+# Food groups used to build meals. Each group matches on the menu category
+# (regex) and, for items with an unhelpful category, on keywords in the name.
+FOOD_GROUPS = {
+    'protein': {
+        'category': 'entree|protein|chicken|beef|fish|pork|turkey|tofu|egg',
+        'name': ['chicken', 'beef', 'pork', 'fish', 'salmon',
+                 'turkey', 'egg', 'tofu', 'bean', 'lentil'],
+    },
+    'carbs': {
+        'category': 'grain|rice|pasta|bread|potato|starch|cereal',
+        'name': ['rice', 'pasta', 'bread', 'potato', 'noodle',
+                 'tortilla', 'quinoa', 'oat'],
+    },
+    'vegetables': {
+        'category': 'vegetable|veggie|salad|greens',
+        'name': ['broccoli', 'carrot', 'spinach', 'lettuce',
+                 'tomato', 'pepper', 'green', 'salad', 'veggie'],
+    },
+}
+
+# Items served in whole or half units (0.5, 1.0, ...) instead of scaled freely
+DISCRETE_KEYWORDS = [
+    'bun', 'bread', 'roll', 'slice', 'cookie', 'egg', 'patty',
+    'burger', 'sandwich', 'apple', 'banana', 'orange', 'pear',
+    'muffin', 'bagel', 'toast', 'wrap', 'taco', 'burrito', 'pizza',
+    'donut', 'pancake', 'waffle', 'sausage'
+]
+
+# Per-item flag columns added by add_item_flags
+ITEM_FLAGS = [f'is_{group}' for group in FOOD_GROUPS] + ['is_discrete']
+
+
+def item_rules_digest():
+    """Fingerprint of the rules behind ITEM_FLAGS (snapshots built with other rules are stale)"""
+    rules = json.dumps([FOOD_GROUPS, DISCRETE_KEYWORDS, NUTRIENTS], sort_keys=True)
+    return hashlib.sha1(rules.encode('utf-8')).hexdigest()[:16]
+
+
+# Share of the daily calories given to each meal when planning a whole day
+MEAL_SPLIT = {
+    'Breakfast': 0.25,
+    'Lunch': 0.35,
+    'Dinner': 0.40,
+}
+
+# Columns the planner reads from nutrition_data
+PLANNER_COLUMNS = ['dining_hall', 'date', 'meal_type', 'category', 'name'] + NUTRIENTS
+
+# Resolved hall/date columns written by load_to_db.build_dimensions (newer databases only)
+DIMENSION_COLUMNS = ['hall_id', 'date_key']
+
+# Rows with usable nutrition data (same rules as filter_available_items)
+AVAILABLE_SQL = 'calories > 0 AND protein IS NOT NULL AND total_fat IS NOT NULL'
+
+# Softmax temperature (in score_item points) for weighted sampling: lower
+# concentrates the draws on the best-scoring items, higher approaches uniform
+SAMPLING_TEMPERATURE = 10.0
+
+# Width of the calorie buckets whose bulk requests share one candidate sample
+BULK_BUCKET_KCAL = 50
+
 
 class MealPlanner:
-    def __init__(self, db_file='nutrition_data.db', excel_file=None):
+    def __init__(self, db_file='nutrition_data.db', excel_file=None, pool_cache_size=32,
+                 seed=None, plan_cache_size=1024, workers=None, snapshot_file=None):
         """
         Initialize meal planner
 
         Args:
             db_file: Path to SQLite database (optional)
-            excel_file: Path to Excel file to use instead of database
+            excel_file: Path to an Excel, Parquet or Arrow export (see columnar.py)
+                        to use instead of database
+            pool_cache_size: Number of prepared (hall, meal, date) pools to keep
+            seed: RNG seed; when set, every request is reproducible and
+                  identical requests are served from the plan cache
+            plan_cache_size: Number of finished plans to memoize
+            workers: Run batch searches on this many processes sharing the
+                     catalog arrays (None or 1 = search in this process)
+            snapshot_file: Compiled catalog snapshot (see snapshot.py) to serve
+                           pools from; ignored while it is missing or older
+                           than the database
         """
         self.db_file = db_file
         self.excel_file = excel_file
         self.data = None
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        # Finished plans for seeded requests, valid until the meal period ends
+        self.plan_cache = LRUCache(max_size=plan_cache_size)
+
+        # Prepared ItemPools keyed by (hall, meal_type, date), dropped when the data changes
+        self.pool_cache = LRUCache(max_size=pool_cache_size)
+        self.loaded_version = None
+        self.lookups = MISSING
+        self._version_conn = None
+        self._version_ino = None
+
+        # Memory-mapped snapshot, (re)opened by get_snapshot
+        self.snapshot_file = snapshot_file
+        self.snapshot = None
+        self._snapshot_id = None
+
+        # Process pool for multi-core search, started on first use
+        self.parallel = None
+        if workers and workers > 1:
+            from parallel import ParallelSearch
+            self.parallel = ParallelSearch(workers)
+
+        # Timing breakdown of the request being profiled (see run_profiled)
+        self.profile = None
         
         # Define nutritional goals (Protein/Fat/Carb splits)
         self.GOALS = {
@@ -32,16 +155,361 @@ class MealPlanner:
         }
 
     def load_data(self):
-        """Load nutrition data from Excel or database"""
+        """Load nutrition data from an Excel/Parquet/Arrow file or database"""
+        # Taken before reading so a write during the load triggers another reload
+        self.loaded_version = self.data_version()
+        self.pool_cache.clear()
+        self.lookups = MISSING
+
+        import pandas as pd
+
         if self.excel_file:
-            # print(f"Loading data from Excel: {self.excel_file}")
-            self.data = pd.read_excel(self.excel_file)
+            # print(f"Loading data from file: {self.excel_file}")
+            # Only the planner's columns; Parquet/Arrow skip the rest on disk
+            self.data = read_nutrition_file(self.excel_file, columns=PLANNER_COLUMNS)
         else:
             # print(f"Loading data from database: {self.db_file}")
             conn = sqlite3.connect(self.db_file)
-            self.data = pd.read_sql_query("SELECT * FROM nutrition_data", conn)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(nutrition_data)")}
+            columns = PLANNER_COLUMNS + [c for c in DIMENSION_COLUMNS if c in existing]
+            self.data = pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM nutrition_data WHERE {AVAILABLE_SQL}", conn
+            )
+            conn.close()
+
+        # Categorize every item once here so requests only need a mask lookup
+        self.add_item_flags(self.data)
+
+    def data_version(self):
+        """
+        Cheap fingerprint of the data source that changes whenever it is
+        modified or replaced (file identity/mtime/size, plus SQLite's
+        PRAGMA data_version for commits that don't touch the main file yet).
+        load_to_db.py publishes a full reload as a new file (new inode) and
+        commits an incremental load in place; either drops the cached pools
+        and plans.
+        """
+        path = self.excel_file or self.db_file
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        version = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self.excel_file:
+            return version
+
+        # data_version only moves for commits made by *other* connections,
+        # so keep one connection open just for asking (reopen if the file was replaced)
+        if self._version_conn is None or self._version_ino != st.st_ino:
+            if self._version_conn is not None:
+                self._version_conn.close()
+            self._version_conn = sqlite3.connect(path, check_same_thread=False)
+            self._version_ino = st.st_ino
+
+        return version + (self._version_conn.execute('PRAGMA data_version').fetchone()[0],)
+
+    def needs_catalog(self):
+        """
+        Whether the whole catalog is kept in memory (Excel sources and parallel
+        search); otherwise each pool is queried from SQLite on its own
+        """
+        return bool(self.excel_file) or self.parallel is not None
+
+    def refresh_data(self):
+        """
+        Reload the data if it has never been loaded or the source changed
+        (when pools are queried from SQLite this just drops the cached pools)
+        """
+        with self.phase('data_version'):
+            version = self.data_version()
+        if version == self.loaded_version and (self.data is not None or not self.needs_catalog()):
+            return False
+
+        if self.profile is not None:
+            self.profile['data_reloaded'] = True
+        if self.needs_catalog() or self.data is not None:
+            with self.phase('load_data'):
+                self.load_data()
+        else:
+            self.loaded_version = version
+            self.pool_cache.clear()
+            self.lookups = MISSING
+        return True
+
+    def get_item_pool(self, dining_hall, meal_type, date=None):
+        """
+        Prepared ItemPool for a (hall, meal, date), built once and then served
+        from the LRU cache until the data changes
+
+        Returns:
+            ItemPool, or None if nothing is available
+        """
+        self.refresh_data()
+
+        # Different spellings of the same hall/date share one pool
+        hall_key = self.resolve_hall(dining_hall)
+        date_key = self.resolve_date(date) if date else None
+        key = (
+            dining_hall.lower() if hall_key is None else hall_key,
+            meal_type,
+            date if date_key is None else date_key,
+        )
+        pool = self.pool_cache.get(key, MISSING)
+        if self.profile is not None:
+            self.profile['pool_cache'] = 'miss' if pool is MISSING else 'hit'
+        if pool is not MISSING:
+            return pool
+
+        snapshot = self.get_snapshot() if self.data is None and not self.needs_catalog() else None
+        if snapshot is not None and hall_key is not None and (not date or date_key is not None):
+            # Compiled snapshot: the pool is a slice of the mapped arrays
+            with self.phase('snapshot'):
+                pool = snapshot.pool(hall_key, meal_type, date_key)
+                pool = self.add_item_scores(pool) if pool is not None else None
+        elif self.data is None and not self.needs_catalog():
+            # Fast path: rows go straight from SQLite into the pool's arrays
+            with self.phase('query'):
+                rows = self.query_rows(dining_hall, meal_type, date)
+            with self.phase('build_pool'):
+                pool = self.build_item_pool_from_rows(rows) if rows else None
+        else:
+            with self.phase('filter'):
+                available_items = self.filter_available_items(dining_hall, meal_type, date)
+            with self.phase('build_pool'):
+                pool = self.build_item_pool(available_items) if len(available_items) else None
+        self.pool_cache.put(key, pool)
+        return pool
+
+    def get_parallel(self):
+        """
+        ParallelSearch with the current catalog published to its workers
+        (republished after a reload), or None when searching in-process
+        """
+        if self.parallel is None:
+            return None
+
+        self.refresh_data()
+        if self.parallel.executor is None or self.parallel.version != self.loaded_version:
+            with self.phase('publish'):
+                self.parallel.publish(self.build_item_pool(self.data), self.loaded_version)
+        return self.parallel
+
+    def get_snapshot(self):
+        """
+        The compiled snapshot if one is configured and up to date with the
+        database (reopened after it is recompiled), else None
+        """
+        if not self.snapshot_file or self.excel_file:
+            return None
+
+        try:
+            st = os.stat(self.snapshot_file)
+        except OSError:
+            st = None
+        snapshot_id = (st.st_ino, st.st_mtime_ns, st.st_size) if st else None
+
+        if snapshot_id != self._snapshot_id:
+            if self.snapshot is not None:
+                self.snapshot.close()
+            self.snapshot = None
+            self._snapshot_id = snapshot_id
+            if st is not None:
+                from snapshot import Snapshot
+                try:
+                    self.snapshot = Snapshot(self.snapshot_file)
+                except (ValueError, OSError):
+                    self.snapshot = None
+
+        if self.snapshot is None or not self.snapshot.is_current(self.db_file, item_rules_digest()):
+            return None
+        return self.snapshot
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Add the time spent in a block to the profile's phases_ms (a no-op
+        unless a request is being profiled). Time spent in a nested phase
+        only counts toward that phase, so the phases add up to the total.
+        """
+        profile = self.profile
+        if profile is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        profile['nested'].append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            inner = profile['nested'].pop()
+            if profile['nested']:
+                profile['nested'][-1] += elapsed
+            phases = profile['phases_ms']
+            phases[name] = phases.get(name, 0.0) + (elapsed - inner) * 1000
+
+    def run_profiled(self, fn, profile_file=None):
+        """
+        Run fn() (a planning call returning a result dict) with profiling on
+        and attach the breakdown to the result under 'profile'
+
+        Args:
+            profile_file: Also run cProfile and dump its stats here (for pstats/snakeviz)
+
+        Returns:
+            fn's result with 'profile': total_ms, imports_ms (once per process),
+            phases_ms, other_ms, pool/plan cache hit or miss, whether the data
+            was reloaded, and the pool size and candidates searched when known
+        """
+        self.profile = {'phases_ms': {}, 'nested': [], 'pool_cache': None, 'data_reloaded': False}
+        profiler = cProfile.Profile() if profile_file else None
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            result = fn()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(profile_file)
+            profile, self.profile = self.profile, None
+
+        total_ms = (time.perf_counter() - started) * 1000
+        profile.pop('nested')
+        profile['total_ms'] = round(total_ms, 2)
+        profile['imports_ms'] = round(IMPORT_MS, 2)
+        profile['other_ms'] = round(total_ms - sum(profile['phases_ms'].values()), 2)
+        profile['phases_ms'] = {name: round(ms, 2) for name, ms in profile['phases_ms'].items()}
+
+        search = result.get('search') or {}
+        profile['plan_cache'] = search.get('cache')
+        profile['candidates_evaluated'] = search.get('candidates_evaluated')
+        profile['cache_stats'] = {'pools': self.pool_cache.stats(), 'plans': self.plan_cache.stats()}
+        if profile_file:
+            profile['cprofile'] = profile_file
+
+        result['profile'] = profile
+        return result
+
+    def get_lookups(self):
+        """
+        Lookup maps from the loader's dimension tables, read once per data version
+
+        Returns:
+            Dict with 'halls' (lowercase alias -> hall_id) and 'dates'
+            (lowercase label -> ISO date_key), or None if the source has no
+            dimension tables (Excel, or a database loaded before they existed)
+        """
+        if self.lookups is not MISSING:
+            return self.lookups
+
+        self.lookups = None
+        if self.excel_file:
+            return None
+
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            self.lookups = snapshot.lookups
+            return self.lookups
+
+        with self.phase('lookups'):
+            self._read_lookups()
+        return self.lookups
+
+    def _read_lookups(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            halls = dict(conn.execute("SELECT alias, hall_id FROM dining_hall_aliases"))
+            dates = {label.lower(): date_key for label, date_key in
+                     conn.execute("SELECT label, date_key FROM menu_dates") if date_key}
+            self.lookups = {'halls': halls, 'dates': dates, 'date_keys': set(dates.values())}
+        except sqlite3.OperationalError:
+            pass
+        finally:
             conn.close()
 
+    def resolve_hall(self, dining_hall):
+        """
+        hall_id for what a user typed: an alias ('ISR', 'Ikenberry Dining Center')
+        or a partial name that matches exactly one hall
+
+        Returns:
+            int hall_id, or None (no lookup tables, or not exactly one hall)
+        """
+        lookups = self.get_lookups()
+        if lookups is None:
+            return None
+
+        text = dining_hall.strip().lower()
+        if text in lookups['halls']:
+            return lookups['halls'][text]
+
+        matches = {hall_id for alias, hall_id in lookups['halls'].items() if text in alias}
+        return matches.pop() if len(matches) == 1 else None
+
+    def resolve_date(self, date):
+        """
+        ISO date_key for an ISO date, a scraped label ('Monday, November 17, 2025')
+        or a partial label that matches exactly one date ('November 17')
+
+        Returns:
+            'YYYY-MM-DD', or None (no lookup tables, or not exactly one date)
+        """
+        lookups = self.get_lookups()
+        if lookups is None:
+            return None
+
+        text = date.strip().lower()
+        if text in lookups['date_keys']:
+            return text
+        if text in lookups['dates']:
+            return lookups['dates'][text]
+
+        matches = {date_key for label, date_key in lookups['dates'].items() if text in label}
+        return matches.pop() if len(matches) == 1 else None
+
+    def add_item_flags(self, df):
+        """
+        Add the ITEM_FLAGS boolean columns (in place): is_<group> for each
+        entry in FOOD_GROUPS and is_discrete (see is_discrete_item)
+        """
+        category = df['category'].astype(str).where(df['category'].notna(), '')
+        name_lower = df['name'].astype(str).str.lower()
+
+        for group, rules in FOOD_GROUPS.items():
+            by_category = category.str.contains(rules['category'], case=False, regex=True)
+            by_name = name_lower.str.contains('|'.join(rules['name']), regex=True)
+            df[f'is_{group}'] = (by_category | by_name).to_numpy()
+
+        df['is_discrete'] = name_lower.str.contains('|'.join(DISCRETE_KEYWORDS), regex=True).to_numpy()
+
+        return df
+
+    def item_flags(self, names, categories):
+        """
+        add_item_flags for plain lists of names and categories (no pandas)
+
+        Returns:
+            Dict of ITEM_FLAGS column -> bool array
+        """
+        names_lower = [str(name).lower() for name in names]
+        categories = [category if isinstance(category, str) else '' for category in categories]
+
+        flags = {}
+        for group, rules in FOOD_GROUPS.items():
+            by_category = re.compile(rules['category'], re.IGNORECASE).search
+            by_name = re.compile('|'.join(rules['name'])).search
+            flags[f'is_{group}'] = np.array([
+                by_category(category) is not None or by_name(name) is not None
+                for category, name in zip(categories, names_lower)
+            ], dtype=bool)
+
+        is_discrete = re.compile('|'.join(DISCRETE_KEYWORDS)).search
+        flags['is_discrete'] = np.array([is_discrete(name) is not None for name in names_lower], dtype=bool)
+
+        return flags
+
     def get_current_meal_type(self):
         """Automatically determine meal type based on current time"""
         current_hour = datetime.now().hour
@@ -57,20 +525,103 @@ class MealPlanner:
                 return "Breakfast"
             return "Lunch"
 
+    def get_meal_period_end(self, now=None):
+        """When the meal period from get_current_meal_type ends (as a datetime)"""
+        now = now or datetime.now()
+        today = now.replace(minute=0, second=0, microsecond=0)
+
+        if 6 <= now.hour < 10:
+            return today.replace(hour=10)
+        elif 10 <= now.hour < 15:
+            return today.replace(hour=15)
+        elif 15 <= now.hour < 21:
+            return today.replace(hour=21)
+        elif now.hour >= 21:
+            # Late night counts as the next morning's breakfast
+            return today.replace(hour=10) + timedelta(days=1)
+        return today.replace(hour=10)
+
+    def query_rows(self, dining_hall, meal_type, date=None):
+        """
+        filter_available_items done in SQLite: only the planner's columns and
+        only the matching rows are read
+
+        When the hall and date resolve to a hall_id/date_key this is an
+        equality lookup on idx_hall_meal_date. Otherwise an exact date uses
+        idx_date_meal and anything else falls back to substring matches like
+        the pandas path.
+
+        Returns:
+            List of row tuples in PLANNER_COLUMNS order
+        """
+        def like(value):
+            escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            return f'%{escaped}%'
+
+        select = f"SELECT {', '.join(PLANNER_COLUMNS)} FROM nutrition_data"
+
+        hall_id = self.resolve_hall(dining_hall)
+        date_key = self.resolve_date(date) if date else None
+        if hall_id is not None and (not date or date_key is not None):
+            where = f"hall_id = ? AND meal_type = ? AND {AVAILABLE_SQL}"
+            params = [hall_id, meal_type]
+            if date:
+                where += " AND date_key = ?"
+                params.append(date_key)
+
+            conn = sqlite3.connect(self.db_file)
+            try:
+                return conn.execute(f"{select} WHERE {where}", params).fetchall()
+            finally:
+                conn.close()
+
+        where = f"meal_type = ? AND dining_hall LIKE ? ESCAPE '\\' AND {AVAILABLE_SQL}"
+        params = [meal_type, like(dining_hall)]
+
+        conn = sqlite3.connect(self.db_file)
+        try:
+            if not date:
+                return conn.execute(f"{select} WHERE {where}", params).fetchall()
+
+            rows = conn.execute(f"{select} WHERE date = ? AND {where}", [date] + params).fetchall()
+            if not rows:
+                rows = conn.execute(f"{select} WHERE date LIKE ? ESCAPE '\\' AND {where}",
+                                    [like(date)] + params).fetchall()
+            return rows
+        finally:
+            conn.close()
+
+    def query_available_items(self, dining_hall, meal_type, date=None):
+        """query_rows as a DataFrame (same rows and columns as filter_available_items)"""
+        import pandas as pd
+
+        rows = self.query_rows(dining_hall, meal_type, date)
+        return pd.DataFrame.from_records(rows, columns=PLANNER_COLUMNS, coerce_float=True)
+
     def filter_available_items(self, dining_hall, meal_type, date=None):
         """Filter items available for specific dining hall and meal"""
         if self.data is None:
+            if not self.needs_catalog():
+                return self.query_available_items(dining_hall, meal_type, date)
             self.load_data()
 
-        # Filter by dining hall (partial match)
-        filtered = self.data[self.data['dining_hall'].str.contains(dining_hall, case=False, na=False)]
+        # Filter by dining hall (resolved hall_id, else partial match)
+        hall_id = self.resolve_hall(dining_hall) if 'hall_id' in self.data else None
+        if hall_id is not None:
+            filtered = self.data[self.data['hall_id'] == hall_id]
+        else:
+            filtered = self.data[self.data['dining_hall'].str.contains(dining_hall, case=False, na=False)]
 
         # Filter by meal type
         filtered = filtered[filtered['meal_type'] == meal_type]
 
-        # Filter by date if provided
+        # Filter by date if provided (resolved date_key, else partial match)
         if date:
-            filtered = filtered[filtered['date'].str.contains(date, case=False, na=False)]
+            date_key = self.resolve_date(date) if 'date_key' in self.data else None
+            if date_key is not None:
+                filtered = filtered[filtered['date_key'] == date_key]
+            else:
+                filtered = filtered[filtered['date'].str.contains(date, case=False, na=False)]
 
         # Remove items with missing critical nutrition data
         filtered = filtered[
@@ -84,40 +635,15 @@ class MealPlanner:
 
     def categorize_items(self, items_df):
         """Categorize items into food groups"""
+        # Frames built outside load_data may not have the flags yet
+        if any(flag not in items_df.columns for flag in ITEM_FLAGS):
+            items_df = self.add_item_flags(items_df.copy())
+
         categories = {
-            'protein': items_df[items_df['category'].str.contains(
-                'entree|protein|chicken|beef|fish|pork|turkey|tofu|egg',
-                case=False, na=False
-            )],
-            'carbs': items_df[items_df['category'].str.contains(
-                'grain|rice|pasta|bread|potato|starch|cereal',
-                case=False, na=False
-            )],
-            'vegetables': items_df[items_df['category'].str.contains(
-                'vegetable|veggie|salad|greens',
-                case=False, na=False
-            )],
-            'other': items_df  # All items as fallback
+            group: items_df[items_df[f'is_{group}']]
+            for group in FOOD_GROUPS
         }
-
-        # Also categorize by name if category is missing
-        for idx, row in items_df.iterrows():
-            name_lower = str(row['name']).lower()
-
-            if any(word in name_lower for word in ['chicken', 'beef', 'pork', 'fish', 'salmon',
-                                                     'turkey', 'egg', 'tofu', 'bean', 'lentil']):
-                if idx not in categories['protein'].index:
-                    categories['protein'] = pd.concat([categories['protein'], items_df.loc[[idx]]])
-
-            if any(word in name_lower for word in ['rice', 'pasta', 'bread', 'potato', 'noodle',
-                                                     'tortilla', 'quinoa', 'oat']):
-                if idx not in categories['carbs'].index:
-                    categories['carbs'] = pd.concat([categories['carbs'], items_df.loc[[idx]]])
-
-            if any(word in name_lower for word in ['broccoli', 'carrot', 'spinach', 'lettuce',
-                                                     'tomato', 'pepper', 'green', 'salad', 'veggie']):
-                if idx not in categories['vegetables'].index:
-                    categories['vegetables'] = pd.concat([categories['vegetables'], items_df.loc[[idx]]])
+        categories['other'] = items_df  # All items as fallback
 
         return categories
 
@@ -130,7 +656,8 @@ class MealPlanner:
         protein = float(item['protein'])
         fat = float(item['total_fat'])
         carbs = float(item['total_carbohydrate'])
-        fiber = float(item['dietary_fiber']) if pd.notna(item['dietary_fiber']) else 0
+        fiber = item['dietary_fiber']
+        fiber = float(fiber) if fiber is not None and fiber == fiber else 0
 
         if calories <= 0: return 0
 
@@ -167,165 +694,230 @@ class MealPlanner:
 
         return score
 
-    def generate_random_meal(self, categories, target_calories, goal_config, max_items=5):
+    def score_items(self, nutrients, goal_config):
+        """
+        score_item for every row of an ItemPool.nutrients array at once
+
+        Returns:
+            float array with one score per item
+        """
+        calories = nutrients[:, CAL]
+        safe_cals = np.where(calories > 0, calories, 1)
+        p_density = (nutrients[:, PROTEIN] * 4) / safe_cals
+        f_density = (nutrients[:, FAT] * 9) / safe_cals
+        c_density = (nutrients[:, CARBS] * 4) / safe_cals
+
+        score = np.where(p_density >= goal_config['p'], 30.0,
+                         np.where(p_density >= goal_config['p'] * 0.5, 15.0, 0.0))
+
+        if goal_config['f'] > 0.5: # Keto
+            score += np.where(f_density >= 0.5, 20, 0)
+        else:
+            score += np.where(f_density <= 0.35, 20, 0)
+
+        if goal_config['c'] < 0.1: # Keto/Low Carb
+            score += np.where(c_density < 0.1, 30, np.where(c_density > 0.3, -20, 0))
+        else:
+            score += np.where((c_density >= 0.3) & (c_density <= 0.6), 10, 0)
+
+        score += np.minimum(nutrients[:, FIBER] * 3, 15)
+
+        return np.where(calories > 0, score, 0.0)
+
+    def add_goal(self, name, p, f, c, desc=None):
+        """
+        Register a custom goal (protein/fat/carb energy split) alongside the
+        built-in GOALS; pools are rebuilt so their score matrix includes it
+        """
+        self.GOALS[name] = {'p': p, 'f': f, 'c': c, 'desc': desc or f'{name} ({p:.0%}/{f:.0%}/{c:.0%})'}
+        self.pool_cache.clear()
+
+    def sampling_weights(self, pool, goal_config, temperature=None):
+        """
+        Importance-sampling weights: softmax of the items' score_items values
+        for the goal (from the pool's precomputed matrix when the goal is in GOALS)
+
+        Args:
+            temperature: Softmax temperature (default SAMPLING_TEMPERATURE)
+        """
+        temperature = temperature or SAMPLING_TEMPERATURE
+        column = pool.score_columns.get((goal_config['p'], goal_config['f'], goal_config['c']))
+        if column is not None:
+            scores = pool.item_scores[:, column]
+        else:
+            scores = self.score_items(pool.nutrients, goal_config)
+        return np.exp((scores - scores.max()) / temperature)
+
+    def build_item_pool(self, items_df):
+        """Convert filtered items into an array-backed ItemPool for the search"""
+        if any(flag not in items_df.columns for flag in ITEM_FLAGS):
+            with self.phase('categorize'):
+                items_df = self.add_item_flags(items_df.copy())
+
+        # Index labels are catalog positions only for slices of self.data
+        rows = items_df.index.to_numpy() if self.data is not None else None
+        pool = ItemPool.from_frame(items_df, FOOD_GROUPS, rows=rows)
+        return self.add_item_scores(pool)
+
+    def build_item_pool_from_rows(self, rows):
+        """build_item_pool for query_rows results, without building a DataFrame"""
+        names = [row[4] for row in rows]
+        categories = [row[3] if isinstance(row[3], str) else None for row in rows]
+        nutrients = np.nan_to_num(np.array([row[5:] for row in rows], dtype=np.float64))
+
+        with self.phase('categorize'):
+            flags = self.item_flags(names, categories)
+
+        pool = ItemPool(
+            names=names,
+            categories=categories,
+            nutrients=nutrients,
+            groups={group: flags[f'is_{group}'] for group in FOOD_GROUPS},
+            discrete=flags['is_discrete'],
+        )
+        return self.add_item_scores(pool)
+
+    def add_item_scores(self, pool):
+        """Per-item scores for every goal, used for weighted sampling"""
+        pool.item_scores = np.column_stack(
+            [self.score_items(pool.nutrients, config) for config in self.GOALS.values()]
+        )
+        pool.score_columns = {
+            (config['p'], config['f'], config['c']): i for i, config in enumerate(self.GOALS.values())
+        }
+        return pool
+
+    def generate_random_meal(self, pool, target_calories, goal_config, max_items=5):
         """
         Generate a single valid random meal combination
+
+        Returns:
+            List of row indices into pool
         """
-        selected_items = []
+        rng = self.rng
+        groups = pool.group_index
+        cals = pool.nutrients[:, CAL]
+        selected = []
         current_cals = 0
         
         # Ensure we get a main protein
-        if not categories['protein'].empty:
-            main = categories['protein'].sample(n=1).iloc[0]
-            selected_items.append(main)
-            current_cals += main['calories']
+        if len(groups['protein']):
+            main = groups['protein'][rng.integers(len(groups['protein']))]
+            selected.append(main)
+            current_cals += cals[main]
             
         # Ensure we get a vegetable
-        if not categories['vegetables'].empty:
-            veg = categories['vegetables'].sample(n=1).iloc[0]
+        if len(groups['vegetables']):
+            veg = groups['vegetables'][rng.integers(len(groups['vegetables']))]
             # Avoid duplicates
-            if veg['name'] != selected_items[0]['name']:
-                selected_items.append(veg)
-                current_cals += veg['calories']
+            if not selected or pool.name_codes[veg] != pool.name_codes[selected[0]]:
+                selected.append(veg)
+                current_cals += cals[veg]
                 
         # Fill rest with random items from any category until close to target
         attempts = 0
-        while len(selected_items) < max_items and attempts < 10:
+        while len(selected) < max_items and attempts < 10:
             attempts += 1
             
             # Pick a random category based on what we might need
             # Simple logic: just pick random for now
-            cat_name = random.choice(['protein', 'carbs', 'vegetables', 'other'])
-            if categories[cat_name].empty: continue
+            cat_rows = groups[('protein', 'carbs', 'vegetables', 'other')[rng.integers(4)]]
+            if not len(cat_rows): continue
             
-            item = categories[cat_name].sample(n=1).iloc[0]
+            item = cat_rows[rng.integers(len(cat_rows))]
             
             # Skip duplicates
-            if any(s['name'] == item['name'] for s in selected_items):
+            if any(pool.name_codes[s] == pool.name_codes[item] for s in selected):
                 continue
                 
             # Check if it fits
-            if current_cals + item['calories'] > target_calories * 1.2:
+            if current_cals + cals[item] > target_calories * 1.2:
                 continue
                 
-            selected_items.append(item)
-            current_cals += item['calories']
+            selected.append(item)
+            current_cals += cals[item]
             
             if current_cals >= target_calories * 0.9:
                 break
                 
-        return selected_items
+        return selected
 
     def is_discrete_item(self, name):
         """Check if item should be counted in discrete units (0.5, 1.0, etc.)"""
         name_lower = str(name).lower()
-        discrete_keywords = [
-            'bun', 'bread', 'roll', 'slice', 'cookie', 'egg', 'patty', 
-            'burger', 'sandwich', 'apple', 'banana', 'orange', 'pear',
-            'muffin', 'bagel', 'toast', 'wrap', 'taco', 'burrito', 'pizza',
-            'donut', 'pancake', 'waffle', 'sausage'
-        ]
-        return any(keyword in name_lower for keyword in discrete_keywords)
+        return any(keyword in name_lower for keyword in DISCRETE_KEYWORDS)
 
     def optimize_servings(self, items, target_calories):
         """
         Adjust servings to hit calorie target exactly, respecting discrete items
+
+        Uses an item's is_discrete flag when it has one (rows of a frame from
+        load_data do) and falls back to is_discrete_item by name
         """
         if not items: return items
-        
-        total_cals_initial = sum(item['calories'] for item in items)
-        if total_cals_initial == 0: return items
-        
-        # Initial global scale
-        global_scale = target_calories / total_cals_initial
-        global_scale = max(0.5, min(global_scale, 2.0))
-        
-        discrete_items = []
-        continuous_items = []
-        
-        current_cals = 0
-        
-        # Step 1: Process discrete items first
-        for item in items:
-            if self.is_discrete_item(item['name']):
-                # Scale and round to nearest 0.5
-                ideal_servings = item['servings'] * global_scale
-                rounded_servings = round(ideal_servings * 2) / 2
-                rounded_servings = max(0.5, rounded_servings) # Min 0.5
-                
-                new_item = item.copy()
-                new_item['servings'] = rounded_servings
-                new_item['calories'] = round(item['calories'] / item['servings'] * rounded_servings, 1)
-                new_item['protein'] = round(item['protein'] / item['servings'] * rounded_servings, 1)
-                new_item['total_fat'] = round(item['total_fat'] / item['servings'] * rounded_servings, 1)
-                new_item['total_carbohydrate'] = round(item['total_carbohydrate'] / item['servings'] * rounded_servings, 1)
-                
-                # Handle fiber safely
-                fiber_val = item.get('dietary_fiber', 0)
-                if pd.isna(fiber_val): fiber_val = 0
-                new_item['dietary_fiber'] = round(float(fiber_val) / item['servings'] * rounded_servings, 1)
-                
-                discrete_items.append(new_item)
-                current_cals += new_item['calories']
-            else:
-                continuous_items.append(item)
 
-        # Step 2: Adjust continuous items to fill the gap
-        remaining_cals = target_calories - current_cals
-        continuous_initial_cals = sum(i['calories'] for i in continuous_items)
-        
-        final_items = discrete_items.copy()
-        
-        if continuous_items:
-            # If we have continuous items, scale them to fit remaining calories
-            # But don't let them go negative or too crazy
-            if continuous_initial_cals > 0 and remaining_cals > 0:
-                cont_scale = remaining_cals / continuous_initial_cals
-                # Clamp scale to avoid huge portions just to fill calories
-                cont_scale = max(0.2, min(cont_scale, 3.0))
-            else:
-                cont_scale = global_scale # Fallback if math gets weird
-                
-            for item in continuous_items:
-                new_item = item.copy()
-                new_item['servings'] = round(item['servings'] * cont_scale, 2)
-                new_item['calories'] = round(item['calories'] * cont_scale, 1)
-                new_item['protein'] = round(item['protein'] * cont_scale, 1)
-                new_item['total_fat'] = round(item['total_fat'] * cont_scale, 1)
-                new_item['total_carbohydrate'] = round(item['total_carbohydrate'] * cont_scale, 1)
-                
-                fiber_val = item.get('dietary_fiber', 0)
-                if pd.isna(fiber_val): fiber_val = 0
-                new_item['dietary_fiber'] = round(float(fiber_val) * cont_scale, 1)
-                
-                final_items.append(new_item)
-        else:
-            # If no continuous items, we just have to live with the discrete rounding
-            # Maybe add the original continuous items back scaled globally if logic failed?
-            # But here continuous_items is empty, so we are done.
-            pass
-            
+        base = np.array([
+            [item.get(nutrient, 0) for nutrient in NUTRIENTS] for item in items
+        ], dtype=np.float64)
+        base = np.nan_to_num(base)
+        if base[:, CAL].sum() == 0: return items
+
+        servings = np.array([item['servings'] for item in items], dtype=np.float64)
+        discrete = np.array([
+            item['is_discrete'] if 'is_discrete' in item else self.is_discrete_item(item['name'])
+            for item in items
+        ], dtype=bool)
+
+        new_servings, scaled = scale_nutrients(
+            base[None], servings[None], discrete[None], np.ones((1, len(items)), dtype=bool),
+            target_calories
+        )
+
+        # Discrete items first, then the continuous ones
+        final_items = []
+        for i in np.concatenate([np.flatnonzero(discrete), np.flatnonzero(~discrete)]):
+            new_item = items[i].copy()
+            new_item['servings'] = float(new_servings[0, i])
+            for j, nutrient in enumerate(NUTRIENTS):
+                new_item[nutrient] = float(scaled[0, i, j])
+            final_items.append(new_item)
+
         return final_items
 
-    def evaluate_meal(self, items, target_calories, goal_config):
+    def scale_servings(self, pool, indices, target_calories):
         """
-        Calculate a total score for a complete meal
+        Array version of optimize_servings for a meal given as pool row indices
+        (every item starts at 1 serving)
+
+        Returns:
+            (servings, scaled) where scaled holds the per-item nutrients
+            after scaling, rounded the same way optimize_servings does
         """
-        total_cals = sum(item['calories'] for item in items)
-        total_p = sum(item['protein'] for item in items)
-        total_f = sum(item['total_fat'] for item in items)
-        total_c = sum(item['total_carbohydrate'] for item in items)
-        
-        if total_cals == 0: return -1000
-        
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return np.ones(0), pool.nutrients[indices]
+
+        servings, scaled = scale_nutrients(
+            pool.nutrients[indices][None], np.ones((1, len(indices))), pool.discrete[indices][None],
+            np.ones((1, len(indices)), dtype=bool), target_calories
+        )
+        return servings[0], scaled[0]
+
+    def score_totals(self, total_cals, total_p, total_f, total_c, n_categories, target_calories, goal_config):
+        """
+        Score a meal from its totals (scalars or equal-length arrays)
+        """
+        total_cals = np.asarray(total_cals, dtype=np.float64)
+        safe_cals = np.where(total_cals == 0, 1, total_cals)
+
         # 1. Calorie Score (how close to target)
-        cal_diff_percent = abs(total_cals - target_calories) / target_calories
-        cal_score = max(0, 100 - (cal_diff_percent * 200)) # 100 pts if exact, 0 if >50% off
+        cal_diff_percent = np.abs(total_cals - target_calories) / target_calories
+        cal_score = np.maximum(0, 100 - (cal_diff_percent * 200)) # 100 pts if exact, 0 if >50% off
         
         # 2. Macro Balance Score
-        p_ratio = (total_p * 4) / total_cals
-        f_ratio = (total_f * 9) / total_cals
-        c_ratio = (total_c * 4) / total_cals
+        p_ratio = (total_p * 4) / safe_cals
+        f_ratio = (total_f * 9) / safe_cals
+        c_ratio = (total_c * 4) / safe_cals
         
         # Euclidean distance from goal vector
         dist = np.sqrt(
@@ -333,61 +925,174 @@ class MealPlanner:
             (f_ratio - goal_config['f'])**2 +
             (c_ratio - goal_config['c'])**2
         )
-        macro_score = max(0, 100 - (dist * 200))
+        macro_score = np.maximum(0, 100 - (dist * 200))
         
         # 3. Diversity Score (bonus for using multiple categories)
-        cats = set()
-        for item in items:
-            # We need to re-infer category or pass it through. 
-            # For simplicity, we assume the item dict has 'category'
-            cats.add(str(item['category']))
-        div_score = len(cats) * 10
+        div_score = np.asarray(n_categories) * 10
         
-        return (cal_score * 0.4) + (macro_score * 0.5) + (div_score * 0.1)
+        score = (cal_score * 0.4) + (macro_score * 0.5) + (div_score * 0.1)
+        score = np.where(total_cals == 0, -1000, score)
+        return score.item() if score.ndim == 0 else score
 
-    def create_meal_plan(self, target_calories, dining_hall, meal_type=None, goal='balanced'):
+    def evaluate_meal(self, items, target_calories, goal_config):
         """
-        Create an optimized meal plan using Randomized Search
+        Calculate a total score for a complete meal
         """
-        if meal_type is None:
-            meal_type = self.get_current_meal_type()
-            
-        goal_config = self.GOALS.get(goal, self.GOALS['balanced'])
-        
-        # Get available items
-        available_items = self.filter_available_items(dining_hall, meal_type)
+        total_cals = sum(item['calories'] for item in items)
+        total_p = sum(item['protein'] for item in items)
+        total_f = sum(item['total_fat'] for item in items)
+        total_c = sum(item['total_carbohydrate'] for item in items)
         
-        if len(available_items) == 0:
-            return {'error': f'No items found for {dining_hall} - {meal_type}'}
+        if total_cals == 0: return -1000
 
-        # Categorize
-        categories = self.categorize_items(available_items)
-        
+        # We assume the item dict has 'category'
+        cats = set(str(item['category']) for item in items)
+
+        return self.score_totals(total_cals, total_p, total_f, total_c, len(cats),
+                                 target_calories, goal_config)
+
+    def evaluate_pool_meal(self, pool, indices, scaled, target_calories, goal_config):
+        """Score a meal given as pool row indices plus its scaled nutrients"""
+        totals = scaled.sum(axis=0)
+        n_categories = len(set(pool.category_codes[indices]))
+        return self.score_totals(totals[CAL], totals[PROTEIN], totals[FAT], totals[CARBS],
+                                 n_categories, target_calories, goal_config)
+
+    def random_search(self, pool, target_calories, goal_config, iterations=50, deadline=None,
+                      target_score=None, cal_tolerance=None, macro_tolerance=None):
+        """
+        Original randomized search: build, scale and score one meal at a time
+
+        Returns:
+            ((indices, servings, scaled), score, stats) for the best meal
+        """
+        started = time.perf_counter()
         best_meal = None
         best_score = -float('inf')
+        evaluated = 0
+        stop_reason = 'candidates'
         
         # Randomized Search (Monte Carlo)
-        # Generate 50 random valid meals, score them, pick best
-        for _ in range(50):
-            # 1. Generate random items
-            items_df = self.generate_random_meal(categories, target_calories, goal_config)
+        # Generate random valid meals, score them, pick best
+        for _ in range(iterations):
+            # 1. Generate random items (as pool row indices)
+            indices = self.generate_random_meal(pool, target_calories, goal_config)
             
-            # 2. Convert to list of dicts for processing
-            items_list = []
-            for row in items_df:
-                item_dict = row.to_dict()
-                item_dict['servings'] = 1.0 # Initialize servings
-                items_list.append(item_dict)
+            # 2. Optimize servings to hit calorie target
+            servings, scaled = self.scale_servings(pool, indices, target_calories)
             
-            # 3. Optimize servings to hit calorie target
-            optimized_items = self.optimize_servings(items_list, target_calories)
-            
-            # 4. Score
-            score = self.evaluate_meal(optimized_items, target_calories, goal_config)
+            # 3. Score
+            score = self.evaluate_pool_meal(pool, indices, scaled, target_calories, goal_config)
+            evaluated += 1
             
             if score > best_score:
                 best_score = score
-                best_meal = optimized_items
+                best_meal = (indices, servings, scaled)
+
+                if target_score is not None and best_score >= target_score:
+                    stop_reason = 'target_score'
+                    break
+                if within_tolerance(scaled.sum(axis=0), target_calories, goal_config,
+                                    cal_tolerance, macro_tolerance):
+                    stop_reason = 'tolerance'
+                    break
+
+            if deadline is not None and time.perf_counter() >= deadline:
+                stop_reason = 'budget'
+                break
+
+        stats = {
+            'engine': 'random',
+            'candidates_evaluated': evaluated,
+            'stop_reason': stop_reason,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        return best_meal, best_score, stats
+
+    def search_pool(self, pool, target_calories, goal_config, engine='batch', candidates=None,
+                    time_limit=1.0, deadline=None, target_score=None, cal_tolerance=None,
+                    macro_tolerance=None, sampling='weighted', temperature=None, refine=None,
+                    refine_iterations=2000, top_plans=None):
+        """
+        Run one of the search engines over a prepared pool (see create_meal_plan),
+        then optionally improve its best meal with a local-search strategy
+
+        Args:
+            top_plans: Optional DiversePlans to collect alternatives in (batch engine only)
+
+        Returns:
+            ((indices, servings, scaled), score, stats) for the best meal
+        """
+        stop_early = dict(target_score=target_score, cal_tolerance=cal_tolerance,
+                          macro_tolerance=macro_tolerance)
+
+        if sampling == 'weighted':
+            with self.phase('weights'):
+                weights = self.sampling_weights(pool, goal_config, temperature)
+        elif sampling == 'uniform':
+            weights = None
+        else:
+            raise ValueError(f'Unknown sampling: {sampling}')
+
+        if top_plans is not None and engine != 'batch':
+            raise ValueError('Alternatives need the batch engine')
+        if top_plans is not None:
+            stop_early['top_plans'] = top_plans
+
+        # Leave part of a time budget for the refinement stage
+        refine_deadline = deadline
+        if refine and deadline is not None:
+            deadline = time.perf_counter() + (deadline - time.perf_counter()) * 0.7
+        
+        if engine == 'batch':
+            if candidates is None:
+                candidates = None if deadline is not None else 10000
+            else:
+                candidates = max(1, candidates)
+            parallel = self.get_parallel() if pool.rows is not None else None
+            with self.phase('search'):
+                if parallel is not None:
+                    result = parallel.batch_search(
+                        pool, target_calories, goal_config, self.rng, n_candidates=candidates,
+                        deadline=deadline, weights=weights, **stop_early
+                    )
+                else:
+                    result = batch_search(
+                        self, pool, target_calories, goal_config, n_candidates=candidates,
+                        deadline=deadline, weights=weights, **stop_early
+                    )
+            indices, servings, scaled, best_score, search_stats = result
+            best_meal = (indices, servings, scaled)
+        elif engine == 'random':
+            with self.phase('search'):
+                best_meal, best_score, search_stats = self.random_search(
+                    pool, target_calories, goal_config, deadline=deadline, **stop_early
+                )
+        elif engine == 'exact':
+            if deadline is not None:
+                time_limit = max(0.0, deadline - time.perf_counter())
+            with self.phase('search'):
+                indices, servings, scaled, best_score, search_stats = exact_search(
+                    self, pool, target_calories, goal_config, time_limit=time_limit,
+                    target_score=target_score, weights=weights
+                )
+            best_meal = (indices, servings, scaled)
+        else:
+            raise ValueError(f'Unknown search engine: {engine}')
+
+        if refine:
+            with self.phase('refine'):
+                best_meal, best_score, search_stats['refine'] = refine_meal(
+                    self, pool, best_meal, target_calories, goal_config, strategy=refine,
+                    iterations=refine_iterations, deadline=refine_deadline, weights=weights
+                )
+
+        return best_meal, best_score, search_stats
+
+    def format_plan(self, pool, best_meal, dining_hall, meal_type, target_calories, goal_config):
+        """Turn the winning (indices, servings, scaled) into the JSON plan format"""
+        # Only the winner gets turned into dicts
+        best_meal = pool.to_items(*best_meal)
 
         # Final formatting
         total_calories = sum(i['calories'] for i in best_meal)
@@ -433,10 +1138,539 @@ class MealPlanner:
             'meets_target': abs(total_calories - target_calories) < (target_calories * 0.1)
         }
 
+    def create_meal_plan(self, target_calories, dining_hall, meal_type=None, goal='balanced',
+                         date=None, engine='batch', candidates=None, time_limit=1.0, budget_ms=None,
+                         target_score=None, cal_tolerance=None, macro_tolerance=None, seed=None,
+                         sampling='weighted', temperature=None, refine=None, refine_iterations=2000,
+                         alternatives=0, min_distance=0.5, profile=False, profile_file=None):
+        """
+        Create an optimized meal plan using Randomized Search
+
+        Args:
+            date: Only use items served on this date (matched like filter_available_items)
+            engine: 'batch' scores random meals in vectorized passes,
+                    'random' is the original 50-iteration loop,
+                    'exact' runs branch-and-bound over half-serving portions,
+                    starting from the batch engine's best plan
+            candidates: Number of candidates for the batch engine (default 10000,
+                        or no limit when budget_ms is set)
+            time_limit: Seconds the exact engine may run before returning its best plan
+            budget_ms: Total time budget for the request; the search keeps
+                       improving the plan until it runs out
+            target_score: Stop early once a plan scores at least this much
+            cal_tolerance: Stop early once a plan is within this fraction of the calorie target...
+            macro_tolerance: ...and within this distance of the goal macro ratios
+            seed: RNG seed for this request (defaults to the planner's seed).
+                  Seeded plans are memoized until the current meal period ends.
+            sampling: 'weighted' draws the batch engine's items in proportion to
+                      their goal-aware scores (softmax at `temperature`), which
+                      reaches a given plan quality with far fewer candidates;
+                      'uniform' draws every item in a food group equally often
+            refine: Local-search strategy run on the best meal afterwards
+                    ('hill_climb' or 'anneal', see refine.STRATEGIES); with
+                    budget_ms it gets the last 30% of the budget
+            refine_iterations: Most moves the refinement may try
+            alternatives: Number of runner-up plans to return under 'alternatives',
+                          collected from the candidates the batch engine already scored
+            min_distance: Smallest Jaccard distance between the item sets of any
+                          two returned plans (1 = no items in common)
+            profile: Attach a timing breakdown, pool size and cache hits under
+                     'profile' (see run_profiled)
+            profile_file: Also dump cProfile stats for the request to this path
+        """
+        if (profile or profile_file) and self.profile is None:
+            options = {key: value for key, value in locals().items()
+                       if key not in ('self', 'profile', 'profile_file')}
+            return self.run_profiled(lambda: self.create_meal_plan(**options), profile_file)
+
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000 if budget_ms is not None else None
+
+        if meal_type is None:
+            meal_type = self.get_current_meal_type()
+            
+        goal_config = self.GOALS.get(goal, self.GOALS['balanced'])
+
+        # Seeded requests are reproducible, so identical ones can share a result
+        if seed is None:
+            seed = self.seed
+        plan_key = None
+        if seed is not None:
+            self.refresh_data()
+            plan_key = (
+                target_calories, dining_hall.lower(), meal_type, date, goal, seed, self.loaded_version,
+                engine, candidates, time_limit, budget_ms, target_score, cal_tolerance, macro_tolerance,
+                sampling, temperature, refine, refine_iterations, alternatives, min_distance
+            )
+            cached = self.plan_cache.get(plan_key)
+            if cached is not None:
+                plan = copy.deepcopy(cached)
+                plan['search']['cache'] = 'hit'
+                return plan
+            self.rng = np.random.default_rng(seed)
+        
+        # Get the prepared pool of available items (cached per hall/meal/date)
+        pool = self.get_item_pool(dining_hall, meal_type, date)
+        
+        if pool is None:
+            return {'error': f'No items found for {dining_hall} - {meal_type}'}
+
+        if self.profile is not None:
+            self.profile['pool'] = {
+                'items': len(pool),
+                'groups': {group: len(members) for group, members in pool.group_index.items()},
+            }
+
+        try:
+            # One extra slot since the best plan is collected too
+            top_plans = DiversePlans(alternatives + 1, min_distance) if alternatives else None
+            best_meal, best_score, search_stats = self.search_pool(
+                pool, target_calories, goal_config, engine=engine, candidates=candidates,
+                time_limit=time_limit, deadline=deadline, target_score=target_score,
+                cal_tolerance=cal_tolerance, macro_tolerance=macro_tolerance,
+                sampling=sampling, temperature=temperature, refine=refine,
+                refine_iterations=refine_iterations, top_plans=top_plans
+            )
+        except ValueError as e:
+            return {'error': str(e)}
+
+        with self.phase('format'):
+            plan = self.format_plan(pool, best_meal, dining_hall, meal_type, target_calories, goal_config)
+
+        if top_plans is not None:
+            # Measured against the final best plan, which refinement may have changed
+            best_names = frozenset(pool.name_codes[best_meal[0]].tolist())
+            plan['alternatives'] = []
+            for *meal, score in top_plans.plans():
+                names = frozenset(pool.name_codes[meal[0]].tolist())
+                if jaccard_distance(names, best_names) < min_distance:
+                    continue
+                alternative = self.format_plan(pool, meal, dining_hall, meal_type,
+                                               target_calories, goal_config)
+                alternative['score'] = round(float(score), 2)
+                plan['alternatives'].append(alternative)
+                if len(plan['alternatives']) == alternatives:
+                    break
+
+        # How much searching was done and why it stopped
+        search_stats['best_score'] = round(float(best_score), 2)
+        search_stats['seed'] = seed
+        plan['search'] = search_stats
+
+        if plan_key is not None:
+            search_stats['cache'] = 'miss'
+            expires_at = self.get_meal_period_end().timestamp()
+            self.plan_cache.put(plan_key, copy.deepcopy(plan), expires_at=expires_at)
+
+        return plan
+
+    def create_meal_plans(self, requests, candidates=None):
+        """
+        Create many meal plans in one call (e.g. suggestions for every active user)
+
+        Requests for the same hall/meal/date share one prepared pool. Plain batch
+        requests (no seed, budget, early stop or sampling/temperature/time_limit
+        setting, which the shared sample would ignore) whose targets fall in the same
+        BULK_BUCKET_KCAL bucket also share one sampled candidate matrix: it is
+        scaled once per distinct target and scored once per distinct goal
+        (it is drawn uniformly, since it serves several goals).
+        Any other request is handled by create_meal_plan on its own.
+
+        Args:
+            requests: List of dicts of create_meal_plan arguments
+                      (target_calories, dining_hall, meal_type, goal, date, ...)
+            candidates: Candidates sampled per shared bucket (default 10000)
+
+        With parallel workers, each bucket is one task on the process pool
+        and elapsed_ms covers the whole batch.
+
+        Returns:
+            List of plans (or error dicts) in the same order as requests
+        """
+        results = [None] * len(requests)
+        groups = defaultdict(list)
+
+        for i, request in enumerate(requests):
+            request = dict(request)
+            if request.get('meal_type') is None:
+                request['meal_type'] = self.get_current_meal_type()
+
+            shared = (
+                request.get('engine', 'batch') == 'batch' and
+                request.get('seed', self.seed) is None and
+                all(request.get(key) is None for key in
+                    ('budget_ms', 'time_limit', 'target_score', 'cal_tolerance', 'macro_tolerance',
+                     'sampling', 'temperature', 'refine', 'alternatives', 'profile', 'profile_file'))
+            )
+            if not shared:
+                results[i] = self.create_meal_plan(**request)
+                continue
+
+            key = (request['dining_hall'].lower(), request['meal_type'], request.get('date'))
+            bucket = int(request['target_calories'] // BULK_BUCKET_KCAL)
+            groups[key + (bucket, request.get('candidates', candidates))].append((i, request))
+
+        # Gather one shared-sample task per bucket
+        tasks = []
+        for (_, meal_type, date, _, n_candidates), members in groups.items():
+            dining_hall = members[0][1]['dining_hall']
+            pool = self.get_item_pool(dining_hall, meal_type, date)
+            if pool is None:
+                for i, _ in members:
+                    results[i] = {'error': f'No items found for {dining_hall} - {meal_type}'}
+                continue
+
+            goals = [(request['target_calories'],
+                      self.GOALS.get(request.get('goal', 'balanced'), self.GOALS['balanced']))
+                     for _, request in members]
+            tasks.append((pool, goals, n_candidates or 10000, members))
+
+        started = time.perf_counter()
+        parallel = self.get_parallel() if all(task[0].rows is not None for task in tasks) else None
+        if parallel is not None:
+            answers = parallel.shared_sample_searches([task[:3] for task in tasks], self.rng)
+        else:
+            answers = [shared_sample_search(self, *task[:3]) for task in tasks]
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        for (pool, goals, n_candidates, members), answer in zip(tasks, answers):
+            for (i, request), (target_calories, goal_config), best in zip(members, goals, answer):
+                plan = self.format_plan(pool, best[:3], request['dining_hall'], request['meal_type'],
+                                        target_calories, goal_config)
+                plan['search'] = {
+                    'engine': 'batch',
+                    'candidates_evaluated': n_candidates,
+                    'stop_reason': 'candidates',
+                    'elapsed_ms': elapsed_ms,
+                    'shared_requests': len(members),
+                    'best_score': round(best[3], 2),
+                    'seed': None,
+                }
+                results[i] = plan
+
+        return results
+
+    def remaining_goal(self, goal_config, daily_calories, eaten):
+        """
+        Macro ratios the rest of the day should aim for so the whole day
+        lands on goal_config, given what earlier meals already provided
+
+        Args:
+            eaten: Totals so far as (calories, protein, fat, carbs)
+        """
+        remaining_cals = daily_calories - eaten[0]
+        if remaining_cals <= 0:
+            return goal_config
+
+        return {
+            'p': max(0.0, goal_config['p'] * daily_calories - eaten[1] * 4) / remaining_cals,
+            'f': max(0.0, goal_config['f'] * daily_calories - eaten[2] * 9) / remaining_cals,
+            'c': max(0.0, goal_config['c'] * daily_calories - eaten[3] * 4) / remaining_cals,
+            'desc': goal_config['desc'],
+        }
+
+    def plan_day(self, daily_calories, dining_halls, goal='balanced', date=None, seed=None,
+                 **search_options):
+        """
+        Plan Breakfast, Lunch and Dinner together for one day
+
+        Args:
+            daily_calories: Calorie target for the whole day (split by MEAL_SPLIT)
+            dining_halls: Hall name or list of halls; each meal uses whichever
+                          hall gives the best plan
+            seed: RNG seed (defaults to the planner's seed)
+            search_options: Passed on to search_pool (engine, candidates, ...)
+        """
+        if seed is None:
+            seed = self.seed
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        return self._plan_day(daily_calories, dining_halls, goal, date, set(), search_options)
+
+    def plan_week(self, daily_calories, dining_halls, goal='balanced', dates=None, days=7,
+                  seed=None, **search_options):
+        """
+        Plan several days at once without repeating items
+
+        Args:
+            dates: Dates to plan (as stored in the data); if omitted, plans
+                   `days` days from the whole menu
+            Other arguments as in plan_day
+        """
+        if seed is None:
+            seed = self.seed
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        dates = list(dates) if dates else [None] * days
+        used = set()
+        day_plans = [
+            self._plan_day(daily_calories, dining_halls, goal, date, used, search_options)
+            for date in dates
+        ]
+
+        planned = [d['totals']['calories'] for d in day_plans if 'totals' in d]
+        return {
+            'daily_calories': daily_calories,
+            'goal': self.GOALS.get(goal, self.GOALS['balanced'])['desc'],
+            'days': day_plans,
+            'unique_items': len(used),
+            'average_calories': round(sum(planned) / len(planned), 1) if planned else 0,
+        }
+
+    def _plan_day(self, daily_calories, dining_halls, goal, date, used, search_options):
+        """plan_day body; adds the names of the items it picks to `used`"""
+        halls = [dining_halls] if isinstance(dining_halls, str) else list(dining_halls)
+        goal_config = self.GOALS.get(goal, self.GOALS['balanced'])
+
+        meals = []
+        eaten = np.zeros(4)  # calories, protein, fat, carbs so far
+        remaining_share = sum(MEAL_SPLIT.values())
+
+        for meal_type, share in MEAL_SPLIT.items():
+            # Aim each meal at what the earlier meals left of the daily targets
+            target = max(daily_calories - eaten[0], 0) * share / remaining_share
+            target = max(target, daily_calories * share * 0.5)
+            remaining_share -= share
+            meal_goal = self.remaining_goal(goal_config, daily_calories, eaten)
+
+            best = None
+            for hall in halls:
+                pool = self.get_item_pool(hall, meal_type, date)
+                if pool is None:
+                    continue
+
+                # Don't repeat items from earlier meals, unless nothing else is left
+                fresh = pool.without_names(used) or pool
+                best_meal, score, stats = self.search_pool(fresh, target, meal_goal, **search_options)
+                if best is None or score > best[3]:
+                    best = (hall, fresh, best_meal, score, stats)
+
+            if best is None:
+                meals.append({'meal_type': meal_type, 'error': f'No items found for {", ".join(halls)} - {meal_type}'})
+                continue
+
+            hall, pool, best_meal, score, stats = best
+            plan = self.format_plan(pool, best_meal, hall, meal_type, round(target), goal_config)
+            stats['best_score'] = round(float(score), 2)
+            plan['search'] = stats
+            meals.append(plan)
+
+            used.update(item['name'] for item in plan['items'])
+            totals = plan['totals']
+            eaten += [totals['calories'], totals['protein'], totals['fat'], totals['carbs']]
+
+        total_calories, total_protein, total_fat, total_carbs = (float(x) for x in eaten)
+        return {
+            'date': date,
+            'daily_calories': daily_calories,
+            'goal': goal_config['desc'],
+            'meals': meals,
+            'totals': {
+                'calories': round(total_calories, 1),
+                'protein': round(total_protein, 1),
+                'fat': round(total_fat, 1),
+                'carbs': round(total_carbs, 1),
+                'fat_percent': round(total_fat * 9 / total_calories * 100, 1) if total_calories > 0 else 0,
+                'protein_percent': round(total_protein * 4 / total_calories * 100, 1) if total_calories > 0 else 0,
+                'carb_percent': round(total_carbs * 4 / total_calories * 100, 1) if total_calories > 0 else 0,
+            },
+            'meets_target': bool(abs(total_calories - daily_calories) < (daily_calories * 0.1))
+        }
+
+# Optional create_meal_plan arguments a worker request may pass, and their types
+# (plan_day/plan_week accept the same ones except budget_ms)
+PLAN_OPTIONS = {
+    'engine': str,
+    'candidates': int,
+    'time_limit': float,
+    'budget_ms': float,
+    'target_score': float,
+    'cal_tolerance': float,
+    'macro_tolerance': float,
+    'seed': int,
+    'sampling': str,
+    'temperature': float,
+    'refine': str,
+    'refine_iterations': int,
+    'alternatives': int,
+    'min_distance': float,
+    'profile': bool,
+    'profile_file': str,
+}
+
+
+def plan_options(params):
+    """Pick the PLAN_OPTIONS that are set in a request's params"""
+    return {
+        key: cast(params[key])
+        for key, cast in PLAN_OPTIONS.items()
+        if params.get(key) is not None
+    }
+
+
+def meal_plan_args(params):
+    """Turn a meal_plan request's params into create_meal_plan keyword arguments"""
+    return dict(
+        target_calories=int(params.get('calories', 600)),
+        dining_hall=params.get('hall', 'ISR'),
+        meal_type=params.get('meal'),
+        goal=params.get('goal', 'balanced'),
+        date=params.get('date'),
+        **plan_options(params)
+    )
+
+
+def handle_request(planner, request):
+    """
+    Run a single worker request against a warm planner
+
+    Args:
+        planner: MealPlanner with its catalog already loaded
+        request: Dict with an optional 'method' (default 'meal_plan') and 'params'
+    """
+    method = request.get('method', 'meal_plan')
+    params = request.get('params') or {}
+
+    if method == 'ping':
+        return {'status': 'ok'}
+
+    if method == 'reload':
+        if planner.needs_catalog():
+            planner.load_data()
+            return {'status': 'reloaded', 'rows': len(planner.data)}
+        planner.loaded_version = None
+        planner.refresh_data()
+        return {'status': 'reloaded', 'rows': None}
+
+    if method in ('plan_day', 'plan_week'):
+        options = plan_options(params)
+        for key in ('budget_ms', 'alternatives', 'min_distance', 'profile', 'profile_file'):
+            options.pop(key, None)
+        halls = params.get('halls', 'ISR')
+        if isinstance(halls, str):
+            halls = [h.strip() for h in halls.split(',') if h.strip()]
+
+        if method == 'plan_day':
+            return planner.plan_day(
+                daily_calories=int(params.get('calories', 2000)),
+                dining_halls=halls,
+                goal=params.get('goal', 'balanced'),
+                date=params.get('date'),
+                **options
+            )
+        return planner.plan_week(
+            daily_calories=int(params.get('calories', 2000)),
+            dining_halls=halls,
+            goal=params.get('goal', 'balanced'),
+            dates=params.get('dates'),
+            days=int(params.get('days', 7)),
+            **options
+        )
+
+    if method == 'meal_plan':
+        return planner.create_meal_plan(**meal_plan_args(params))
+
+    if method == 'meal_plans':
+        return planner.create_meal_plans([meal_plan_args(p) for p in params.get('requests', [])])
+
+    raise ValueError(f'Unknown method: {method}')
+
+
+def json_safe(value):
+    """value with NaN/Infinity floats (not valid JSON) replaced by None, recursively"""
+    if isinstance(value, float):
+        return value if np.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+def response_line(response):
+    """
+    Encode a worker response as one line of strict JSON; if the result can't
+    be encoded, an error reply for the same id instead, so the caller is
+    never left waiting on a line it can't parse
+    """
+    try:
+        return json.dumps(json_safe(response), allow_nan=False) + '\n'
+    except (TypeError, ValueError) as e:
+        return json.dumps({'id': response.get('id'), 'error': f'Could not encode the result: {e}'}) + '\n'
+
+
+def serve(planner, stdin, stdout):
+    """
+    Long-lived worker loop speaking line-delimited JSON
+
+    Each input line is a request like
+        {"id": 7, "method": "meal_plan", "params": {"calories": 600, "hall": "ISR"}}
+    (methods: meal_plan, meal_plans, plan_day, plan_week, reload, ping)
+    and each output line echoes the id with either a 'result' or an 'error'
+    (always strict JSON, see response_line). Requests are answered in the
+    order they arrive, so a caller can pipeline several of them and match
+    the responses up by id.
+    """
+    # Load the catalog (if one is kept in memory) up front so the first request is already warm
+    planner.refresh_data()
+
+    stdout.write(json.dumps({'id': None, 'result': {'status': 'ready'}}) + '\n')
+    stdout.flush()
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            response = {'id': request_id, 'result': handle_request(planner, request)}
+        except Exception as e:
+            response = {'id': request_id, 'error': str(e)}
+
+        stdout.write(response_line(response))
+        stdout.flush()
+
+
+def run_bulk(planner, infile, outfile):
+    """
+    Plan a JSONL file of meal_plan requests in one create_meal_plans call
+
+    Each input line holds meal_plan params plus an optional id, e.g.
+        {"id": "netid1", "calories": 700, "hall": "ISR", "meal": "Lunch", "goal": "keto"}
+    and each output line is {"id": ..., "result": plan} or {"id": ..., "error": ...},
+    in input order.
+    """
+    entries = []
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            params = json.loads(line)
+            entries.append((params.get('id'), meal_plan_args(params), None))
+        except Exception as e:
+            entries.append((None, None, str(e)))
+
+    valid = [args for _, args, error in entries if error is None]
+    plans = iter(planner.create_meal_plans(valid))
+
+    for request_id, _, error in entries:
+        if error is None:
+            response = {'id': request_id, 'result': next(plans)}
+        else:
+            response = {'id': request_id, 'error': error}
+        outfile.write(response_line(response))
+    outfile.flush()
+
+
 if __name__ == "__main__":
     import argparse
     import json
-    import os
     import sys
 
     # Default paths
@@ -452,17 +1686,109 @@ if __name__ == "__main__":
     parser.add_argument('--hall', type=str, default='ISR')
     parser.add_argument('--meal', type=str)
     parser.add_argument('--goal', type=str, default='balanced', choices=['balanced', 'weight_loss', 'bulking', 'keto'])
+    parser.add_argument('--date', type=str)
     parser.add_argument('--db', type=str, default=default_db)
+    parser.add_argument('--file', type=str,
+                        help='Plan from an Excel/Parquet/Arrow export instead of --db')
+    parser.add_argument('--engine', type=str, default='batch', choices=['batch', 'random', 'exact'])
+    parser.add_argument('--candidates', type=int)
+    parser.add_argument('--time-limit', type=float, default=1.0,
+                        help='Seconds the exact engine may search')
+    parser.add_argument('--budget-ms', type=float,
+                        help='Time budget; keep improving the plan until it runs out')
+    parser.add_argument('--target-score', type=float)
+    parser.add_argument('--cal-tolerance', type=float,
+                        help='Stop once within this fraction of the calorie target (e.g. 0.02)')
+    parser.add_argument('--macro-tolerance', type=float,
+                        help='Stop once within this distance of the goal macro ratios (e.g. 0.05)')
+    parser.add_argument('--seed', type=int,
+                        help='RNG seed for reproducible (and memoized) plans')
+    parser.add_argument('--sampling', type=str, default='weighted', choices=['uniform', 'weighted'],
+                        help='weighted: draw items in proportion to their goal-aware scores')
+    parser.add_argument('--temperature', type=float,
+                        help=f'Softmax temperature for --sampling weighted (default {SAMPLING_TEMPERATURE})')
+    parser.add_argument('--refine', type=str, choices=['hill_climb', 'anneal'],
+                        help='Improve the best meal with local search afterwards')
+    parser.add_argument('--refine-iterations', type=int, default=2000)
+    parser.add_argument('--alternatives', type=int, default=0,
+                        help='Also return this many distinct runner-up plans (batch engine)')
+    parser.add_argument('--min-distance', type=float, default=0.5,
+                        help='Smallest Jaccard distance between the item sets of returned plans')
+    parser.add_argument('--snapshot', type=str,
+                        help='Compiled catalog snapshot to serve from once it exists (default: <db>.snapshot)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Attach a per-phase timing breakdown and cache info to the result')
+    parser.add_argument('--profile-file', type=str,
+                        help='Also dump cProfile stats for the request to this file')
+    parser.add_argument('--plan', type=str, default='meal', choices=['meal', 'day', 'week'],
+                        help='day/week: --calories is the daily target and --hall may list several halls')
+    parser.add_argument('--days', type=int, default=7)
     parser.add_argument('--json', action='store_true')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a long-lived worker reading JSON requests from stdin')
+    parser.add_argument('--workers', type=int,
+                        help='Spread batch searches over this many processes')
+    parser.add_argument('--bulk', type=str,
+                        help="JSONL file of meal_plan requests to plan in one batch ('-' for stdin)")
+    parser.add_argument('--output', type=str, default='-',
+                        help="Where --bulk writes its JSONL results ('-' for stdout)")
     
     args = parser.parse_args()
 
-    planner = MealPlanner(db_file=args.db)
+    # Passed even while missing: a long-lived --serve worker picks the
+    # snapshot up as soon as a load compiles it
+    planner = MealPlanner(db_file=args.db, excel_file=args.file, seed=args.seed, workers=args.workers,
+                          snapshot_file=args.snapshot or args.db + '.snapshot')
+
+    if args.serve:
+        serve(planner, sys.stdin, sys.stdout)
+        sys.exit(0)
+
+    if args.bulk:
+        infile = sys.stdin if args.bulk == '-' else open(args.bulk)
+        outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+        with infile, outfile:
+            run_bulk(planner, infile, outfile)
+        sys.exit(0)
+
+    if args.plan != 'meal':
+        request = {
+            'method': 'plan_day' if args.plan == 'day' else 'plan_week',
+            'params': {
+                'calories': args.calories, 'halls': args.hall, 'goal': args.goal,
+                'date': args.date, 'days': args.days, 'engine': args.engine,
+                'candidates': args.candidates, 'time_limit': args.time_limit,
+                'target_score': args.target_score, 'cal_tolerance': args.cal_tolerance,
+                'macro_tolerance': args.macro_tolerance,
+                'sampling': args.sampling, 'temperature': args.temperature,
+                'refine': args.refine, 'refine_iterations': args.refine_iterations,
+            }
+        }
+        result = handle_request(planner, request)
+        print(json.dumps(result) if args.json else json.dumps(result, indent=2))
+        sys.exit(0)
+
     meal_plan = planner.create_meal_plan(
         target_calories=args.calories,
         dining_hall=args.hall,
         meal_type=args.meal,
-        goal=args.goal
+        goal=args.goal,
+        date=args.date,
+        engine=args.engine,
+        candidates=args.candidates,
+        time_limit=args.time_limit,
+        budget_ms=args.budget_ms,
+        target_score=args.target_score,
+        cal_tolerance=args.cal_tolerance,
+        macro_tolerance=args.macro_tolerance,
+        sampling=args.sampling,
+        temperature=args.temperature,
+        refine=args.refine,
+        refine_iterations=args.refine_iterations,
+        alternatives=args.alternatives,
+        min_distance=args.min_distance,
+        profile=args.profile,
+        profile_file=args.profile_file
     )
 
     if args.json:
@@ -0,0 +1,183 @@
+"""
+Multi-core meal search
+Publishes the catalog's item arrays once in shared memory and spreads
+candidate sampling and scoring over a process pool. Each task gets its own
+RNG stream and the parent keeps the best result.
+"""
+import atexit
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from item_pool import ItemPool
+from search import DiversePlans, batch_search, shared_sample_search
+
+
+# Set in each worker process by _attach
+_catalog = None
+_planner = None
+
+
+def _attach(spec):
+    """Worker initializer: map the shared catalog arrays (no copy)"""
+    global _catalog, _planner
+    from meal_planner import MealPlanner
+
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    _catalog = {'shm': shm}
+    for key, (offset, shape, dtype) in spec['arrays'].items():
+        _catalog[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+
+    # Only used for its rng and score_totals, never loads any data
+    _planner = MealPlanner(db_file=None)
+
+
+def _pool_view(rows):
+    """ItemPool over the given catalog rows, in the same order as the parent's pool"""
+    return ItemPool.from_arrays(
+        nutrients=_catalog['nutrients'][rows],
+        discrete=_catalog['discrete'][rows],
+        name_codes=_catalog['name_codes'][rows],
+        category_codes=_catalog['category_codes'][rows],
+        groups={
+            key[len('group_'):]: mask[rows]
+            for key, mask in _catalog.items() if key.startswith('group_')
+        },
+    )
+
+
+def _batch_task(rows, target_calories, goal_config, n_candidates, rng, budget, options):
+    """batch_search result plus the worker's DiversePlans (None if not collecting)"""
+    _planner.rng = rng
+    deadline = time.perf_counter() + budget if budget is not None else None
+    result = batch_search(_planner, _pool_view(rows), target_calories, goal_config,
+                          n_candidates=n_candidates, deadline=deadline, **options)
+    return result, options.get('top_plans')
+
+
+def _shared_sample_task(rows, requests, n_candidates, rng):
+    _planner.rng = rng
+    return shared_sample_search(_planner, _pool_view(rows), requests, n_candidates)
+
+
+class ParallelSearch:
+    def __init__(self, workers):
+        """
+        Args:
+            workers: Number of worker processes
+        """
+        self.workers = workers
+        self.version = None
+        self.shm = None
+        self.executor = None
+        atexit.register(self.close)
+
+    def publish(self, catalog, version):
+        """
+        Copy the catalog arrays into one shared memory block and (re)start the
+        workers attached to it
+
+        Args:
+            catalog: ItemPool over the whole loaded catalog (rows in catalog order)
+            version: Data version the catalog was built from
+        """
+        self.close()
+
+        arrays = {
+            'nutrients': catalog.nutrients,
+            'discrete': catalog.discrete,
+            'name_codes': catalog.name_codes,
+            'category_codes': catalog.category_codes,
+        }
+        for group, mask in catalog.group_masks().items():
+            arrays[f'group_{group}'] = mask
+
+        # Lay the arrays out back to back, 8-byte aligned
+        layout, size = {}, 0
+        for key, array in arrays.items():
+            layout[key] = (size, array.shape, array.dtype.str)
+            size += (array.nbytes + 7) // 8 * 8
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for key, array in arrays.items():
+            offset, shape, dtype = layout[key]
+            np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)[...] = array
+
+        spec = {'name': self.shm.name, 'arrays': layout}
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_attach, initargs=(spec,))
+        self.version = version
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+        self.version = None
+
+    def batch_search(self, pool, target_calories, goal_config, rng, n_candidates=10000,
+                     deadline=None, **options):
+        """
+        batch_search split across the workers (same arguments and return value)
+
+        Each worker samples its share of the candidates from its own stream
+        spawned off rng; the best plan over all workers wins. A top_plans
+        collector gets every worker's kept plans merged into it.
+        """
+        started = time.perf_counter()
+        if n_candidates is None:
+            shares = [None] * self.workers
+        else:
+            shares = [int(n) for n in np.diff(np.linspace(0, n_candidates, self.workers + 1).astype(int))]
+            shares = [n for n in shares if n > 0]
+
+        budget = max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+
+        # Each worker fills an empty collector of its own
+        top_plans = options.pop('top_plans', None)
+        if top_plans is not None:
+            options['top_plans'] = DiversePlans(top_plans.k, top_plans.min_distance)
+
+        futures = [
+            self.executor.submit(_batch_task, pool.rows, target_calories, goal_config, n,
+                                 stream, budget, options)
+            for n, stream in zip(shares, rng.spawn(len(shares)))
+        ]
+        results = []
+        for future in futures:
+            result, worker_plans = future.result()
+            results.append(result)
+            if top_plans is not None:
+                top_plans.merge(worker_plans)
+
+        # Reduce: keep the best plan, add up the work done
+        best = max(results, key=lambda result: result[3])
+        reasons = {result[4]['stop_reason'] for result in results}
+        stats = {
+            'engine': 'batch',
+            'candidates_evaluated': sum(result[4]['candidates_evaluated'] for result in results),
+            'stop_reason': best[4]['stop_reason'] if best[4]['stop_reason'] in ('target_score', 'tolerance')
+                           else 'budget' if 'budget' in reasons else 'candidates',
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'workers': len(results),
+        }
+        return best[:4] + (stats,)
+
+    def shared_sample_searches(self, tasks, rng):
+        """
+        Run shared_sample_search for many (pool, requests, n_candidates) tasks,
+        one task per worker call
+
+        Returns:
+            List of shared_sample_search results, one per task
+        """
+        futures = [
+            self.executor.submit(_shared_sample_task, pool.rows, requests, n_candidates, stream)
+            for (pool, requests, n_candidates), stream in zip(tasks, rng.spawn(len(tasks)))
+        ]
+        return [future.result() for future in futures]
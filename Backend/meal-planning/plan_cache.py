@@ -0,0 +1,79 @@
+"""
+Small in-process caches for a long-lived MealPlanner
+"""
+import time
+from collections import OrderedDict
+
+
+# Default for LRUCache.get that can't be confused with a cached None
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, max_size=32):
+        """
+        Args:
+            max_size: Most entries to keep; the least recently used is evicted first
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.expires = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used) or default"""
+        if key in self.entries and self._expired(key):
+            self._remove(key)
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value, expires_at=None):
+        """
+        Args:
+            expires_at: Optional time.time() after which the entry is treated as missing
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if expires_at is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = expires_at
+
+        while len(self.entries) > self.max_size:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.expires.clear()
+
+    def _expired(self, key):
+        return key in self.expires and time.time() >= self.expires[key]
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        self.expires.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.entries and not self._expired(key)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
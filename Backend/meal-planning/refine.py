@@ -0,0 +1,306 @@
+"""
+Local-search refinement of a finished meal
+Starts from the search's best meal and tries small moves (swap, add, remove
+an item, adjust a serving or shift calories between two items). Running
+totals are kept so each move is re-scored in constant time instead of
+re-summing the meal.
+"""
+import math
+import time
+
+import numpy as np
+
+from item_pool import CAL, PROTEIN, FAT, CARBS
+
+
+# Serving sizes a move may set: (step, smallest, largest), matching the
+# ranges scale_servings uses
+DISCRETE_SERVINGS = (0.5, 0.5, 2.0)
+CONTINUOUS_SERVINGS = (0.05, 0.2, 3.0)
+
+# Relative odds of each kind of move
+MOVES = ('swap', 'adjust', 'shift', 'add', 'remove')
+MOVE_ODDS = np.cumsum([0.3, 0.2, 0.3, 0.1, 0.1])
+
+
+class MealState:
+    def __init__(self, planner, pool, indices, servings, target_calories, goal_config,
+                 max_items=5, weights=None, scaled=None):
+        """
+        Args:
+            planner: MealPlanner (provides score_totals)
+            pool: ItemPool the meal was drawn from
+            indices, servings: Starting meal
+            scaled: The starting meal's scaled nutrients, if known (servings
+                    may be rounded, so these give the exact starting score)
+            weights: Optional per-item weights for picking items to swap/add in
+                     (see MealPlanner.sampling_weights); uniform otherwise
+        """
+        self.planner = planner
+        self.pool = pool
+        self.target = float(target_calories)
+        self.goal_config = goal_config
+        self.max_items = max_items
+
+        # Cumulative distribution for O(log n) weighted picks
+        weights = np.ones(len(pool)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.cdf = np.cumsum(weights) / weights.sum()
+
+        self.items = []
+        self.servings = []
+        self.parts = []
+        self.totals = np.zeros(pool.nutrients.shape[1])
+        self.category_counts = {}
+        self.names = set()
+        for i, (idx, serving) in enumerate(zip(indices, servings)):
+            self._insert(len(self.items), int(idx), float(serving),
+                         None if scaled is None else np.asarray(scaled[i], dtype=np.float64))
+        self.score = self._score()
+
+    def _part(self, idx, serving):
+        """Nutrients an item adds at a serving size (rounded like scale_servings)"""
+        return np.round(self.pool.nutrients[idx] * serving, 1)
+
+    def _insert(self, pos, idx, serving, part=None):
+        if part is None:
+            part = self._part(idx, serving)
+        self.items.insert(pos, idx)
+        self.servings.insert(pos, serving)
+        self.parts.insert(pos, part)
+        self.totals += part
+        category = self.pool.category_codes[idx]
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        self.names.add(self.pool.name_codes[idx])
+
+    def _remove(self, pos):
+        idx, serving, part = self.items.pop(pos), self.servings.pop(pos), self.parts.pop(pos)
+        self.totals -= part
+        category = self.pool.category_codes[idx]
+        self.category_counts[category] -= 1
+        if not self.category_counts[category]:
+            del self.category_counts[category]
+        self.names.discard(self.pool.name_codes[idx])
+        return idx, serving, part
+
+    def _score(self):
+        t = self.totals
+        return self.planner.score_totals(
+            t[CAL], t[PROTEIN], t[FAT], t[CARBS], len(self.category_counts),
+            self.target, self.goal_config
+        )
+
+    def serving_range(self, idx):
+        return DISCRETE_SERVINGS if self.pool.discrete[idx] else CONTINUOUS_SERVINGS
+
+    def fit_serving(self, idx, calories):
+        """Serving of idx closest to the given calories, on its serving grid"""
+        step, low, high = self.serving_range(idx)
+        item_cals = self.pool.nutrients[idx, CAL]
+        if item_cals <= 0:
+            return 1.0
+        return float(np.clip(round(calories / item_cals / step) * step, low, high))
+
+    def random_item(self, rng):
+        """Weighted pick of a pool item not already in the meal (None if we hit one)"""
+        idx = int(np.searchsorted(self.cdf, rng.random() * self.cdf[-1], side='right'))
+        idx = min(idx, len(self.cdf) - 1)
+        return None if self.pool.name_codes[idx] in self.names else idx
+
+    def propose(self, rng):
+        """
+        A random move as a list of (op, pos, idx, serving) steps, or None if
+        the drawn move isn't possible. op is 'set', 'insert', 'remove' or
+        'fit' (re-size the item at pos so the meal is back on the calorie
+        target), so a move that changes calories can be paired with a fit.
+        """
+        kind = MOVES[int(np.searchsorted(MOVE_ODDS, rng.random() * MOVE_ODDS[-1], side='right'))]
+        n = len(self.items)
+
+        def other(pos, size):
+            # Random position other than pos among `size` items (None if there is none)
+            if size < 2:
+                return None
+            k = int(rng.integers(size - 1))
+            return k + (k >= pos)
+
+        def nudge(pos):
+            idx = self.items[pos]
+            step, low, high = self.serving_range(idx)
+            serving = self.servings[pos] + step * int(rng.integers(1, 5)) * (1 if rng.random() < 0.5 else -1)
+            return ('set', pos, idx, serving) if low <= serving <= high else None
+
+        if kind in ('adjust', 'shift') and n:
+            pos = int(rng.integers(n))
+            step = nudge(pos)
+            if step is None:
+                return None
+            partner = other(pos, n) if kind == 'shift' else None
+            return [step] if partner is None else [step, ('fit', partner, None, None)]
+
+        if kind == 'swap' and n:
+            pos = int(rng.integers(n))
+            idx = self.random_item(rng)
+            if idx is not None:
+                # Keep roughly the calories of the item being replaced
+                return [('set', pos, idx, self.fit_serving(idx, self.parts[pos][CAL]))]
+
+        elif kind == 'add' and n < self.max_items:
+            idx = self.random_item(rng)
+            if idx is not None:
+                move = [('insert', n, idx, self.serving_range(idx)[1])]
+                partner = other(n, n + 1)
+                return move + [('fit', partner, None, None)] if partner is not None else move
+
+        elif kind == 'remove' and n > 1:
+            pos = int(rng.integers(n))
+            return [('remove', pos, None, None), ('fit', int(rng.integers(n - 1)), None, None)]
+
+        return None
+
+    def apply(self, move):
+        """
+        Apply a move, updating totals and score in O(1)
+
+        Returns:
+            The move that undoes it (restoring the exact nutrients removed)
+        """
+        undo = []
+        for op, pos, idx, serving, *part in move:
+            part = part[0] if part else None
+            if op == 'fit':
+                op, idx = 'set', self.items[pos]
+                rest = self.totals[CAL] - self.parts[pos][CAL]
+                serving = self.fit_serving(idx, self.target - rest)
+
+            if op == 'set':
+                old = self._remove(pos)
+                self._insert(pos, idx, serving, part)
+                undo.append(('set', pos) + old)
+            elif op == 'insert':
+                self._insert(pos, idx, serving, part)
+                undo.append(('remove', pos, None, None))
+            else:
+                old = self._remove(pos)
+                undo.append(('insert', pos) + old)
+
+        self.score = self._score()
+        return undo[::-1]
+
+    def snapshot(self):
+        """(items, servings, parts, score) of the current meal"""
+        return list(self.items), list(self.servings), list(self.parts), self.score
+
+    @staticmethod
+    def result(snapshot):
+        """(indices, servings, scaled) like the search engines return"""
+        items, servings, parts, _ = snapshot
+        return list(items), np.array(servings, dtype=np.float64), np.array(parts)
+
+
+def hill_climb(state, rng, iterations, deadline=None, patience=500):
+    """
+    Accept a move only if it doesn't lower the score; stop after `patience`
+    moves in a row without improvement
+
+    Returns:
+        (snapshot of the best meal, number of moves tried)
+    """
+    best_score = state.score
+    since_improved = 0
+    moves = 0
+
+    for moves in range(1, iterations + 1):
+        move = state.propose(rng)
+        if move is None:
+            continue
+
+        undo = state.apply(move)
+        if state.score < best_score:
+            state.apply(undo)
+            since_improved += 1
+        else:
+            since_improved = 0 if state.score > best_score else since_improved + 1
+            best_score = state.score
+
+        if since_improved >= patience:
+            break
+        if deadline is not None and moves % 64 == 0 and time.perf_counter() >= deadline:
+            break
+
+    return state.snapshot(), moves
+
+
+def anneal(state, rng, iterations, deadline=None, start_temperature=2.0, end_temperature=0.02):
+    """
+    Simulated annealing: accept worse moves with probability exp(delta / T),
+    cooling T geometrically over the iterations; keeps the best meal seen
+
+    Returns:
+        (snapshot of the best meal, number of moves tried)
+    """
+    best = state.snapshot()
+    cooling = (end_temperature / start_temperature) ** (1 / max(iterations, 1))
+    temperature = start_temperature
+    moves = 0
+
+    for moves in range(1, iterations + 1):
+        temperature *= cooling
+        move = state.propose(rng)
+        if move is None:
+            continue
+
+        previous = state.score
+        undo = state.apply(move)
+        delta = state.score - previous
+        if delta < 0 and rng.random() >= math.exp(delta / temperature):
+            state.apply(undo)
+        elif state.score > best[-1]:
+            best = state.snapshot()
+
+        if deadline is not None and moves % 64 == 0 and time.perf_counter() >= deadline:
+            break
+
+    return best, moves
+
+
+# Refinement strategies by name: fn(state, rng, iterations, deadline) -> (snapshot, moves)
+# (add an entry here to make a new strategy available to search_pool/--refine)
+STRATEGIES = {
+    'hill_climb': hill_climb,
+    'anneal': anneal,
+}
+
+
+def refine_meal(planner, pool, best_meal, target_calories, goal_config, strategy='hill_climb',
+                iterations=2000, deadline=None, weights=None):
+    """
+    Improve a search result with one of the STRATEGIES
+
+    Args:
+        best_meal: (indices, servings, scaled) from the search
+        iterations: Most moves to try
+        deadline: time.perf_counter() value to stop at
+
+    Returns:
+        ((indices, servings, scaled), score, stats)
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown refine strategy: {strategy}')
+
+    started = time.perf_counter()
+    indices, servings, scaled = best_meal
+    state = MealState(planner, pool, indices, servings, target_calories, goal_config,
+                      weights=weights, scaled=scaled)
+    start_score = state.score
+
+    best, moves = STRATEGIES[strategy](state, planner.rng, iterations, deadline)
+    score = best[-1]
+
+    stats = {
+        'strategy': strategy,
+        'moves': moves,
+        'start_score': round(float(start_score), 2),
+        'gain': round(float(score - start_score), 2),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    return MealState.result(best), score, stats
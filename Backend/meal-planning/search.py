@@ -0,0 +1,408 @@
+"""
+Batched meal search
+Generates and scores many candidate meals at once with NumPy instead of
+building and scoring them one at a time in Python
+"""
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from item_pool import CAL, PROTEIN, FAT, CARBS
+
+
+# Sampling order used by generate_random_meal: a protein, a vegetable,
+# then up to FILL_ATTEMPTS random picks from any group
+FILL_GROUPS = ('protein', 'carbs', 'vegetables', 'other')
+FILL_ATTEMPTS = 10
+
+# Most candidates per pass that DiversePlans compares against the plans it holds
+MAX_OFFERS = 2000
+
+
+def sample_candidates(pool, target_calories, n_candidates, max_items, rng, weights=None):
+    """
+    Draw a batch of random meals following the same rules as
+    MealPlanner.generate_random_meal
+
+    Args:
+        weights: Optional per-item sampling weights (see MealPlanner.sampling_weights);
+                 items are then drawn from each group in proportion to them
+                 instead of uniformly
+
+    Returns:
+        int array (n_candidates x max_items) of pool rows, -1 for empty slots
+    """
+    n = n_candidates
+    groups = pool.group_index
+    cals = pool.nutrients[:, CAL]
+    rows = np.arange(n)
+
+    # Per-group probabilities for weighted draws
+    probs = None
+    if weights is not None:
+        probs = {
+            group: weights[members] / weights[members].sum()
+            for group, members in groups.items() if len(members)
+        }
+
+    def pick(group, size):
+        members = groups[group]
+        if probs is None:
+            return members[rng.integers(len(members), size=size)]
+        return rng.choice(members, size=size, p=probs[group])
+
+    meals = np.full((n, max_items), -1, dtype=np.int64)
+    names = np.full((n, max_items), -1, dtype=np.int64)
+    count = np.zeros(n, dtype=np.int64)
+    current_cals = np.zeros(n)
+
+    def place(mask, items):
+        meals[rows[mask], count[mask]] = items[mask]
+        names[rows[mask], count[mask]] = pool.name_codes[items[mask]]
+        current_cals[mask] += cals[items[mask]]
+        count[mask] += 1
+
+    def draw(group):
+        return pick(group, n)
+
+    # Ensure we get a main protein
+    if len(groups['protein']) and max_items > 0:
+        place(np.ones(n, dtype=bool), draw('protein'))
+
+    # Ensure we get a vegetable (skipping duplicates of the protein)
+    if len(groups['vegetables']) and max_items > 1:
+        veg = draw('vegetables')
+        place((names != pool.name_codes[veg][:, None]).all(axis=1), veg)
+
+    # Fill with random picks until close to target
+    done = np.zeros(n, dtype=bool)
+    for _ in range(FILL_ATTEMPTS):
+        open_rows = ~done & (count < max_items)
+        if not open_rows.any():
+            break
+
+        choice = rng.integers(len(FILL_GROUPS), size=n)
+        items = np.full(n, -1, dtype=np.int64)
+        for g, group in enumerate(FILL_GROUPS):
+            members = groups[group]
+            picked = choice == g
+            if len(members) and picked.any():
+                items[picked] = pick(group, picked.sum())
+
+        has_item = items >= 0
+        safe_items = np.where(has_item, items, 0)
+        unique = (names != pool.name_codes[safe_items][:, None]).all(axis=1)
+        fits = current_cals + cals[safe_items] <= target_calories * 1.2
+
+        ok = open_rows & has_item & unique & fits
+        place(ok, safe_items)
+        done |= ok & (current_cals >= target_calories * 0.9)
+
+    return meals
+
+
+def scale_nutrients(base, servings, discrete, valid, target_calories):
+    """
+    The serving rules of MealPlanner.optimize_servings applied to whole
+    arrays of meals at once
+
+    Args:
+        base: (n x k x nutrients) nutrients of each item at its current servings
+        servings: (n x k) current servings
+        discrete: (n x k) bool, item is served in half units
+        valid: (n x k) bool, slot holds an item
+
+    Returns:
+        (servings, scaled) after scaling; meals with no calories are left as they were
+    """
+    base = base * valid[..., None]
+    base_cals = base[..., CAL]
+    discrete = discrete & valid
+
+    total_cals = base_cals.sum(axis=1)
+    has_cals = total_cals > 0
+    global_scale = np.clip(target_calories / np.where(has_cals, total_cals, 1), 0.5, 2.0)
+
+    # Discrete items: scaled and rounded to the nearest 0.5 (min 0.5)
+    safe_servings = np.where(servings > 0, servings, 1)
+    discrete_servings = np.maximum(0.5, np.round(servings * global_scale[:, None] * 2) / 2)
+    discrete_factor = discrete_servings / safe_servings
+    discrete_cals = (np.round(base_cals * discrete_factor, 1) * discrete).sum(axis=1)
+
+    # Continuous items fill the remaining calories
+    remaining_cals = target_calories - discrete_cals
+    continuous_cals = (base_cals * (valid & ~discrete)).sum(axis=1)
+    can_fill = (continuous_cals > 0) & (remaining_cals > 0)
+    cont_scale = np.where(
+        can_fill,
+        np.clip(remaining_cals / np.where(can_fill, continuous_cals, 1), 0.2, 3.0),
+        global_scale
+    )
+
+    factors = np.where(discrete, discrete_factor, cont_scale[:, None])
+    new_servings = np.where(discrete, discrete_servings, np.round(servings * cont_scale[:, None], 2))
+
+    # Meals with no calories are left unscaled (they score -1000 anyway)
+    factors[~has_cals] = 1.0
+    new_servings[~has_cals] = servings[~has_cals]
+
+    return new_servings, np.round(base * factors[..., None], 1)
+
+
+def scale_servings_batch(pool, meals, target_calories):
+    """
+    Vectorized MealPlanner.scale_servings over a whole candidate matrix
+
+    Returns:
+        (servings, scaled) with shapes (n x max_items) and (n x max_items x nutrients);
+        empty slots have zero nutrients
+    """
+    valid = meals >= 0
+    rows = np.where(valid, meals, 0)
+    return scale_nutrients(pool.nutrients[rows], np.ones(meals.shape), pool.discrete[rows],
+                           valid, target_calories)
+
+
+def count_categories(pool, meals):
+    """Number of distinct menu categories in each candidate"""
+    codes = np.where(meals >= 0, pool.category_codes[np.where(meals >= 0, meals, 0)], -1)
+    codes = np.sort(codes, axis=1)
+    first = np.ones_like(codes, dtype=bool)
+    first[:, 1:] = codes[:, 1:] != codes[:, :-1]
+    return (first & (codes >= 0)).sum(axis=1)
+
+
+def within_tolerance(totals, target_calories, goal_config, cal_tolerance=None, macro_tolerance=None):
+    """
+    True if a meal's totals (calories, protein, fat, carbs) are close enough
+    to the target that searching further isn't worth it
+
+    Args:
+        cal_tolerance: Allowed calorie error as a fraction of the target
+        macro_tolerance: Allowed Euclidean distance from the goal macro ratios
+    """
+    if cal_tolerance is None and macro_tolerance is None:
+        return False
+
+    cals = totals[CAL]
+    if cals <= 0:
+        return False
+
+    if cal_tolerance is not None and abs(cals - target_calories) > target_calories * cal_tolerance:
+        return False
+
+    if macro_tolerance is not None:
+        dist = np.sqrt(
+            (totals[PROTEIN] * 4 / cals - goal_config['p'])**2 +
+            (totals[FAT] * 9 / cals - goal_config['f'])**2 +
+            (totals[CARBS] * 4 / cals - goal_config['c'])**2
+        )
+        if dist > macro_tolerance:
+            return False
+
+    return True
+
+
+def jaccard_distance(a, b):
+    """1 - |a & b| / |a | b| for two sets of item names"""
+    union = len(a | b)
+    return 1.0 - len(a & b) / union if union else 0.0
+
+
+class DiversePlans:
+    def __init__(self, k, min_distance=0.5):
+        """
+        Bounded collection of the k best meals seen during a search whose
+        item sets are all at least min_distance apart (Jaccard distance on
+        item names), so alternatives aren't near-copies of each other
+
+        Args:
+            k: Most plans to keep
+            min_distance: Smallest allowed distance between two kept plans (0-1]
+        """
+        if not 0 < min_distance <= 1:
+            raise ValueError('min_distance must be in (0, 1]')
+        self.k = k
+        self.min_distance = min_distance
+        self.heap = []  # (score, order, names, plan), worst plan first
+        self.order = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def floor(self):
+        """Score a new plan must beat to get in (-inf while there is room)"""
+        return self.heap[0][0] if len(self.heap) >= self.k else -float('inf')
+
+    def offer(self, names, plan, score):
+        """
+        Consider one plan; it replaces every kept plan it is too close to
+        if it scores higher than all of them
+
+        Args:
+            names: frozenset of the plan's item names (or name codes)
+            plan: (indices, servings, scaled)
+
+        Returns:
+            True if the plan was kept
+        """
+        if score <= self.floor():
+            return False
+
+        close = [entry for entry in self.heap if jaccard_distance(names, entry[2]) < self.min_distance]
+        if any(entry[0] >= score for entry in close):
+            return False
+
+        if close:
+            replaced = {entry[1] for entry in close}
+            self.heap = [entry for entry in self.heap if entry[1] not in replaced]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, (score, next(self.order), names, plan))
+        if len(self.heap) > self.k:
+            heapq.heappop(self.heap)
+        return True
+
+    def offer_batch(self, pool, meals, servings, scaled, scores):
+        """Offer the best of a scored candidate batch (best first, at most MAX_OFFERS)"""
+        above = np.flatnonzero(scores > self.floor())
+        if not len(above):
+            return
+        if len(above) > MAX_OFFERS:
+            above = above[np.argpartition(scores[above], -MAX_OFFERS)[-MAX_OFFERS:]]
+
+        for i in above[np.argsort(-scores[above], kind='stable')]:
+            score = float(scores[i])
+            if score <= self.floor():
+                break
+            keep = meals[i] >= 0
+            names = frozenset(pool.name_codes[meals[i][keep]].tolist())
+            self.offer(names, (meals[i][keep].tolist(), servings[i][keep], scaled[i][keep]), score)
+
+    def merge(self, other):
+        """Offer every plan another collector kept (e.g. from a worker process)"""
+        for score, _, names, plan in other.heap:
+            self.offer(names, plan, score)
+
+    def plans(self):
+        """Kept plans as (indices, servings, scaled, score), best first"""
+        return [plan + (score,) for score, _, _, plan in sorted(self.heap, key=lambda e: (-e[0], e[1]))]
+
+
+def batch_search(planner, pool, target_calories, goal_config, n_candidates=10000,
+                 max_items=5, chunk_size=20000, deadline=None, target_score=None,
+                 cal_tolerance=None, macro_tolerance=None, weights=None, top_plans=None):
+    """
+    Batched Monte Carlo search: sample, scale and score candidates in bulk
+
+    Args:
+        planner: MealPlanner (provides rng and score_totals)
+        pool: ItemPool for the meal
+        n_candidates: Most random meals to score (None = no limit, needs a deadline)
+        chunk_size: Candidates per vectorized pass (bounds memory use)
+        deadline: time.perf_counter() value to stop at; keeps improving until then
+        target_score: Stop once the best plan scores at least this much
+        cal_tolerance, macro_tolerance: Stop once the best plan is within
+            these tolerances (see within_tolerance)
+        weights: Optional per-item sampling weights (see sample_candidates)
+        top_plans: Optional DiversePlans that collects the best distinct
+                   candidates as they are scored
+
+    Returns:
+        (indices, servings, scaled, score, stats) for the best candidate, where
+        stats has the number of candidates evaluated and why the search stopped
+    """
+    started = time.perf_counter()
+    if n_candidates is None and deadline is None:
+        raise ValueError('batch_search needs n_candidates or a deadline')
+
+    # Smaller passes when there is a deadline so we check the clock often
+    if deadline is not None:
+        chunk_size = min(chunk_size, 2000)
+
+    best = None
+    best_score = -float('inf')
+    evaluated = 0
+    stop_reason = 'candidates'
+
+    while n_candidates is None or evaluated < n_candidates:
+        n = chunk_size if n_candidates is None else min(chunk_size, n_candidates - evaluated)
+
+        meals = sample_candidates(pool, target_calories, n, max_items, planner.rng, weights)
+        servings, scaled = scale_servings_batch(pool, meals, target_calories)
+        totals = scaled.sum(axis=1)
+        scores = planner.score_totals(
+            totals[:, CAL], totals[:, PROTEIN], totals[:, FAT], totals[:, CARBS],
+            count_categories(pool, meals), target_calories, goal_config
+        )
+        evaluated += n
+
+        if top_plans is not None:
+            top_plans.offer_batch(pool, meals, servings, scaled, scores)
+
+        i = int(np.argmax(scores))
+        if scores[i] > best_score:
+            keep = meals[i] >= 0
+            best_score = float(scores[i])
+            best = (meals[i][keep].tolist(), servings[i][keep], scaled[i][keep], best_score)
+
+            if target_score is not None and best_score >= target_score:
+                stop_reason = 'target_score'
+                break
+            if within_tolerance(totals[i], target_calories, goal_config, cal_tolerance, macro_tolerance):
+                stop_reason = 'tolerance'
+                break
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            stop_reason = 'budget'
+            break
+
+    stats = {
+        'engine': 'batch',
+        'candidates_evaluated': evaluated,
+        'stop_reason': stop_reason,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    return best + (stats,)
+
+
+def shared_sample_search(planner, pool, requests, n_candidates=10000, max_items=5):
+    """
+    Answer several requests for the same pool from one candidate sample
+    (drawn around their mean target), scaling once per distinct target and
+    scoring once per distinct goal
+
+    Args:
+        requests: List of (target_calories, goal_config)
+
+    Returns:
+        List of (indices, servings, scaled, score), one per request
+    """
+    mean_target = np.mean([target for target, _ in requests])
+    meals = sample_candidates(pool, mean_target, n_candidates, max_items, planner.rng)
+    n_categories = count_categories(pool, meals)
+
+    results = [None] * len(requests)
+    by_target = {}
+    for i, (target, goal_config) in enumerate(requests):
+        goal_key = (goal_config['p'], goal_config['f'], goal_config['c'])
+        by_target.setdefault(target, {}).setdefault(goal_key, []).append(i)
+
+    for target, by_goal in by_target.items():
+        servings, scaled = scale_servings_batch(pool, meals, target)
+        totals = scaled.sum(axis=1)
+
+        for indices in by_goal.values():
+            scores = planner.score_totals(
+                totals[:, CAL], totals[:, PROTEIN], totals[:, FAT], totals[:, CARBS],
+                n_categories, target, requests[indices[0]][1]
+            )
+            best = int(np.argmax(scores))
+            keep = meals[best] >= 0
+            result = (meals[best][keep].tolist(), servings[best][keep], scaled[best][keep],
+                      float(scores[best]))
+            for i in indices:
+                results[i] = result
+
+    return results
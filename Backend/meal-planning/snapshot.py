@@ -0,0 +1,283 @@
+"""
+Compiled, memory-mapped catalog snapshot
+A binary columnar copy of the planner's view of nutrition_data (nutrient
+arrays, food group/discrete flags, string tables for names and categories)
+sorted by (hall, meal, date), with the row range of every menu in the
+header. Opening it is an mmap plus a small JSON header, so a planner starts
+serving in milliseconds, and every process that maps the file shares the
+same pages through the OS page cache.
+
+Layout: MAGIC, header length (uint64, little-endian), JSON header, then the
+arrays back to back (8-byte aligned) at the offsets the header lists.
+
+Usage (normally run by load_to_db.py after a load):
+    python3 snapshot.py --db ../data/nutrition_data.db
+"""
+import argparse
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import time
+
+import numpy as np
+
+from item_pool import ItemPool, NUTRIENTS
+
+
+MAGIC = b'MPSNAP1\0'
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+def snapshot_path(db_file):
+    """Default snapshot location for a database"""
+    return db_file + SNAPSHOT_SUFFIX
+
+
+def source_fingerprint(db_file):
+    """(size, mtime_ns) of the database the snapshot was compiled from"""
+    st = os.stat(db_file)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def string_table(values):
+    """
+    Encode strings (None allowed) as one UTF-8 blob plus offsets
+
+    Returns:
+        (codes, blob, offsets, nulls): per-value int64 codes into the table,
+        the table's bytes and offsets (len + 1), and which entries are None
+    """
+    lookup = {}
+    codes = np.array([lookup.setdefault(v, len(lookup)) for v in values], dtype=np.int64)
+    entries = list(lookup)
+    encoded = [(entry or '').encode('utf-8') for entry in entries]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    nulls = np.array([entry is None for entry in entries], dtype=bool)
+    return codes, blob, offsets, nulls
+
+
+def compile_snapshot(db_file, snapshot_file=None):
+    """
+    Write the snapshot for db_file (atomically replacing any older one)
+
+    Needs the dimension tables from load_to_db.build_dimensions; rows with no
+    hall_id are left out.
+
+    Returns:
+        Summary dict (path, rows, menus, bytes, seconds)
+    """
+    from meal_planner import MealPlanner, PLANNER_COLUMNS, AVAILABLE_SQL, FOOD_GROUPS, item_rules_digest
+
+    started = time.perf_counter()
+    snapshot_file = snapshot_file or snapshot_path(db_file)
+    fingerprint = source_fingerprint(db_file)
+
+    conn = sqlite3.connect(db_file)
+    try:
+        rows = conn.execute(f'''
+            SELECT {', '.join(PLANNER_COLUMNS)}, hall_id, date_key FROM nutrition_data
+            WHERE hall_id IS NOT NULL AND {AVAILABLE_SQL}
+            ORDER BY hall_id, meal_type, date_key, id
+        ''').fetchall()
+        halls = dict(conn.execute("SELECT alias, hall_id FROM dining_hall_aliases"))
+        dates = {label.lower(): date_key for label, date_key in
+                 conn.execute("SELECT label, date_key FROM menu_dates") if date_key}
+
+        # Data version recorded by load_to_db.py (None for databases from older loaders)
+        try:
+            data_load = conn.execute("SELECT MAX(version) FROM data_loads").fetchone()[0]
+        except sqlite3.OperationalError:
+            data_load = None
+    except sqlite3.OperationalError as e:
+        raise ValueError(f'{db_file} has no dimension tables (run load_to_db.py): {e}')
+    finally:
+        conn.close()
+
+    n_columns = len(PLANNER_COLUMNS)
+    names = [row[4] for row in rows]
+    categories = [row[3] if isinstance(row[3], str) else None for row in rows]
+    nutrients = np.nan_to_num(np.array([row[5:n_columns] for row in rows], dtype=np.float64)
+                              .reshape(len(rows), len(NUTRIENTS)))
+    flags = MealPlanner(db_file=None).item_flags(names, categories)
+
+    name_codes, name_blob, name_offsets, _ = string_table(names)
+    category_codes, category_blob, category_offsets, category_nulls = string_table(categories)
+
+    arrays = {
+        'nutrients': nutrients,
+        'discrete': flags['is_discrete'],
+        'name_codes': name_codes,
+        'category_codes': category_codes,
+        'name_blob': name_blob,
+        'name_offsets': name_offsets,
+        'category_blob': category_blob,
+        'category_offsets': category_offsets,
+        'category_nulls': category_nulls,
+    }
+    for group in FOOD_GROUPS:
+        arrays[f'group_{group}'] = flags[f'is_{group}']
+
+    # Row range of every (hall_id, meal_type, date_key) menu
+    menus = []
+    for i, row in enumerate(rows):
+        key = [row[n_columns], row[2], row[n_columns + 1]]
+        if menus and menus[-1][:3] == key:
+            menus[-1][4] = i + 1
+        else:
+            menus.append(key + [i, i + 1])
+
+    layout, size = {}, 0
+    for key, array in arrays.items():
+        layout[key] = [size, list(array.shape), array.dtype.str]
+        size += (array.nbytes + 7) // 8 * 8
+
+    header = json.dumps({
+        'created_at': time.time(),
+        'source': fingerprint,
+        'rules': item_rules_digest(),
+        'data_load': data_load,
+        'rows': len(rows),
+        'arrays': layout,
+        'menus': menus,
+        'halls': halls,
+        'dates': dates,
+    }).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    tmp_file = snapshot_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for key, array in arrays.items():
+            data = np.ascontiguousarray(array).tobytes()
+            f.write(data)
+            f.write(b'\0' * (-len(data) % 8))
+    os.replace(tmp_file, snapshot_file)
+
+    return {
+        'path': snapshot_file,
+        'rows': len(rows),
+        'menus': len(menus),
+        'bytes': os.path.getsize(snapshot_file),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+class Snapshot:
+    def __init__(self, path):
+        """
+        Map a compiled snapshot read-only (arrays are views into the mapping)
+
+        Raises:
+            ValueError: Not a snapshot file
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.mm[:len(MAGIC)] != MAGIC:
+            self.mm.close()
+            raise ValueError(f'Not a planner snapshot: {path}')
+        (header_len,) = struct.unpack_from('<Q', self.mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self.mm[start:start + header_len])
+        data_start = start + header_len
+
+        self.arrays = {}
+        for key, (offset, shape, dtype) in self.header['arrays'].items():
+            count = int(np.prod(shape)) if shape else 1
+            self.arrays[key] = np.frombuffer(self.mm, dtype=dtype, count=count,
+                                             offset=data_start + offset).reshape(shape)
+
+        # (hall_id, meal_type) -> list of (date_key, start, end)
+        self.menus = {}
+        for hall_id, meal_type, date_key, first, last in self.header['menus']:
+            self.menus.setdefault((hall_id, meal_type), []).append((date_key, first, last))
+
+        self.lookups = {
+            'halls': self.header['halls'],
+            'dates': self.header['dates'],
+            'date_keys': set(self.header['dates'].values()),
+        }
+        self._names = {}
+        self._categories = {}
+
+    def close(self):
+        self.arrays = {}
+        try:
+            self.mm.close()
+        except BufferError:
+            # Pools still hold views into the mapping; it is unmapped once they are gone
+            pass
+
+    def is_current(self, db_file, rules):
+        """True if compiled from db_file as it is now, with the same item rules"""
+        try:
+            fingerprint = source_fingerprint(db_file)
+        except OSError:
+            return False
+        return self.header['source'] == fingerprint and self.header['rules'] == rules
+
+    def _string(self, table, cache, code):
+        if code not in cache:
+            offsets = self.arrays[f'{table}_offsets']
+            value = bytes(self.arrays[f'{table}_blob'][offsets[code]:offsets[code + 1]]).decode('utf-8')
+            if table == 'category' and self.arrays['category_nulls'][code]:
+                value = None
+            cache[code] = value
+        return cache[code]
+
+    def menu_range(self, hall_id, meal_type, date_key=None):
+        """(start, end) rows of a hall/meal (on one date, or every date), or None"""
+        menus = self.menus.get((hall_id, meal_type))
+        if not menus:
+            return None
+        if date_key is None:
+            return menus[0][1], menus[-1][2]
+        for menu_date, first, last in menus:
+            if menu_date == date_key:
+                return first, last
+        return None
+
+    def pool(self, hall_id, meal_type, date_key=None):
+        """ItemPool over one menu (zero-copy slices of the mapping), or None if it is empty"""
+        span = self.menu_range(hall_id, meal_type, date_key)
+        if span is None:
+            return None
+        rows = slice(*span)
+
+        name_codes = self.arrays['name_codes'][rows]
+        category_codes = self.arrays['category_codes'][rows]
+        pool = ItemPool.from_arrays(
+            nutrients=self.arrays['nutrients'][rows],
+            discrete=self.arrays['discrete'][rows],
+            name_codes=name_codes,
+            category_codes=category_codes,
+            groups={
+                key[len('group_'):]: mask[rows]
+                for key, mask in self.arrays.items() if key.startswith('group_')
+            },
+        )
+        pool.names = [self._string('name', self._names, code) for code in name_codes.tolist()]
+        pool.categories = [self._string('category', self._categories, code)
+                           for code in category_codes.tolist()]
+        return pool
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_db = os.path.join(os.path.dirname(current_dir), 'data', 'nutrition_data.db')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', type=str, default=default_db)
+    parser.add_argument('--output', type=str, help='Snapshot path (default: <db>.snapshot)')
+    args = parser.parse_args()
+
+    summary = compile_snapshot(args.db, args.output)
+    print(f"✓ Wrote {summary['path']}: {summary['rows']} rows, {summary['menus']} menus, "
+          f"{summary['bytes'] / 1e6:.1f} MB in {summary['seconds']}s")
@@ -0,0 +1,113 @@
+"""
+Tests for the exact (branch-and-bound) engine
+
+Run from this directory: python3 -m pytest test_exact.py
+"""
+import json
+import time
+
+import numpy as np
+import pytest
+
+from exact import exact_search
+from item_pool import ItemPool
+from meal_planner import MealPlanner
+from search import batch_search
+
+
+def fixture_pool(n_items=60, seed=0):
+    """A random menu with protein/carb/vegetable items across a few categories"""
+    rng = np.random.default_rng(seed)
+    protein = rng.uniform(0, 40, n_items)
+    fat = rng.uniform(0, 25, n_items)
+    carbs = rng.uniform(0, 60, n_items)
+    cals = protein * 4 + fat * 9 + carbs * 4
+    nutrients = np.stack([cals, protein, fat, carbs, rng.uniform(0, 5, n_items)], axis=1)
+
+    groups = {
+        'protein': protein * 4 > cals * 0.3,
+        'carbs': carbs * 4 > cals * 0.5,
+        'vegetables': cals < 120,
+    }
+    categories = [f'Station {i % 6}' for i in range(n_items)]
+    return ItemPool([f'Item {i}' for i in range(n_items)], categories, nutrients, groups,
+                    discrete=rng.random(n_items) < 0.5)
+
+
+@pytest.fixture
+def planner():
+    return MealPlanner(db_file=None)
+
+
+@pytest.mark.parametrize('goal', ['balanced', 'weight_loss', 'bulking', 'keto'])
+def test_exact_scores_at_least_batch(planner, goal):
+    pool = fixture_pool()
+    goal_config = planner.GOALS[goal]
+
+    planner.rng = np.random.default_rng(1)
+    # The batch engine as it runs with a deadline (the starting plan has one)
+    batch_score = batch_search(planner, pool, 600, goal_config, deadline=time.perf_counter() + 60)[3]
+
+    planner.rng = np.random.default_rng(1)
+    indices, servings, scaled, score, stats = exact_search(planner, pool, 600, goal_config, time_limit=0.5)
+
+    assert score >= batch_score
+    assert stats['seed_score'] == round(batch_score, 2)
+    assert stats['upper_bound'] >= score - 1e-6
+    assert score == pytest.approx(planner.evaluate_pool_meal(pool, indices, scaled, 600, goal_config))
+
+
+def test_exact_proves_small_pool_optimal(planner):
+    pool = fixture_pool(n_items=12)
+    goal_config = planner.GOALS['balanced']
+
+    planner.rng = np.random.default_rng(1)
+    *_, score, stats = exact_search(planner, pool, 600, goal_config, time_limit=30)
+
+    assert stats['optimal']
+    assert stats['stop_reason'] == 'optimal'
+    assert stats['gap'] == 0
+
+
+@pytest.mark.parametrize('options', [{'target_score': 50}, {'time_limit': 0}])
+def test_exact_stopped_before_branching_reports_finite_bound(planner, options):
+    pool = fixture_pool()
+
+    planner.rng = np.random.default_rng(1)
+    *_, score, stats = exact_search(planner, pool, 600, planner.GOALS['balanced'], **options)
+
+    assert stats['nodes'] <= 1
+    assert np.isfinite(stats['upper_bound']) and np.isfinite(stats['gap'])
+    assert stats['upper_bound'] >= score - 1e-6
+    json.dumps(stats, allow_nan=False)
+
+
+@pytest.mark.parametrize('budget_ms', [10, 100])
+def test_exact_keeps_to_the_time_budget(planner, budget_ms):
+    pool = fixture_pool(n_items=400)
+
+    planner.rng = np.random.default_rng(1)
+    deadline = time.perf_counter() + budget_ms / 1000
+    *_, stats = planner.search_pool(pool, 600, planner.GOALS['balanced'], engine='exact',
+                                    deadline=deadline, sampling='uniform')
+
+    assert stats['elapsed_ms'] <= budget_ms * 1.2 + 5
+
+
+def test_exact_without_seed_still_returns_a_plan(planner):
+    pool = fixture_pool()
+
+    *_, score, stats = exact_search(planner, pool, 600, planner.GOALS['balanced'],
+                                    time_limit=0, seed_candidates=0)
+
+    assert stats['nodes'] == 1
+    assert stats['seed_score'] is None
+    assert np.isfinite(stats['upper_bound'])
+
+
+def test_exact_without_usable_items(planner):
+    pool = fixture_pool(n_items=10)
+    pool.nutrients[:] = 0
+
+    with pytest.raises(ValueError):
+        exact_search(planner, pool, 600, planner.GOALS['balanced'])
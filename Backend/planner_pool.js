@@ -0,0 +1,186 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+
+// Path to Python script
+const SCRIPT_PATH = path.join(__dirname, 'meal-planning', 'meal_planner.py');
+
+// Number of warm planner processes to keep around
+const POOL_SIZE = parseInt(process.env.PLANNER_WORKERS || '2');
+
+// How long a single request may take before we give up on it
+const REQUEST_TIMEOUT_MS = parseInt(process.env.PLANNER_TIMEOUT_MS || '30000');
+
+// Optional database override (defaults to the planner's own data/nutrition_data.db)
+const DB_PATH = process.env.PLANNER_DB;
+
+// Optional default RNG seed so identical requests get identical (memoized) plans
+const SEED = process.env.PLANNER_SEED;
+
+// Wait before replacing a worker that exited
+const RESPAWN_DELAY_MS = 1000;
+
+const workers = [];
+let nextRequestId = 1;
+
+// Start one worker process and wire up its line-delimited JSON protocol
+function startWorker(slot) {
+    // Note: Using 'python3' - make sure it's in the path
+    const args = [SCRIPT_PATH, '--serve'];
+    if (DB_PATH) {
+        args.push('--db', DB_PATH);
+    }
+    if (SEED) {
+        args.push('--seed', SEED);
+    }
+    const proc = spawn('python3', args);
+
+    const worker = {
+        slot,
+        proc,
+        pending: new Map(),
+        // Requests written before the Python process has finished starting
+        // wait here and are flushed when its ready banner arrives
+        queued: [],
+        ready: false,
+        alive: true
+    };
+
+    // Writes to a dead worker surface on 'close' below; don't crash the server
+    proc.stdin.on('error', (err) => {
+        console.error(`Planner worker ${slot} stdin error:`, err.message);
+    });
+
+    const lines = readline.createInterface({ input: proc.stdout });
+    lines.on('line', (line) => {
+        let response;
+        try {
+            response = JSON.parse(line);
+        } catch (e) {
+            console.error(`Planner worker ${slot} wrote invalid JSON:`, line);
+            return;
+        }
+
+        // The startup banner has no id
+        if (response.id === null || response.id === undefined) {
+            worker.ready = true;
+            worker.queued.forEach(({ id, message }) => {
+                // Skip requests that timed out while waiting
+                if (worker.pending.has(id)) {
+                    worker.proc.stdin.write(message);
+                }
+            });
+            worker.queued = [];
+            return;
+        }
+
+        const entry = worker.pending.get(response.id);
+        if (!entry) return;
+
+        worker.pending.delete(response.id);
+        clearTimeout(entry.timer);
+
+        if (response.error) {
+            entry.callback({ error: 'Failed to generate meal plan', details: response.error }, null);
+        } else {
+            entry.callback(null, response.result);
+        }
+    });
+
+    proc.stderr.on('data', (data) => {
+        console.error(`Planner worker ${slot}: ${data.toString()}`);
+    });
+
+    proc.on('close', (code) => {
+        console.error(`Planner worker ${slot} exited with code ${code}`);
+        worker.alive = false;
+
+        // Fail everything that was still waiting on this worker
+        worker.pending.forEach((entry) => {
+            clearTimeout(entry.timer);
+            entry.callback({ error: 'Meal planner worker exited', details: `exit code ${code}` }, null);
+        });
+        worker.pending.clear();
+        worker.queued = [];
+
+        // Replace the dead worker so the pool stays at full size
+        // (with a short delay so a broken python3 doesn't spin in a respawn loop)
+        setTimeout(() => {
+            if (workers[slot] === worker) {
+                workers[slot] = startWorker(slot);
+            }
+        }, RESPAWN_DELAY_MS);
+    });
+
+    return worker;
+}
+
+// Spawn the pool (safe to call more than once)
+function startPool() {
+    for (let i = 0; i < POOL_SIZE; i++) {
+        if (!workers[i]) {
+            workers[i] = startWorker(i);
+        }
+    }
+}
+
+// Pick the live worker with the fewest requests in flight, preferring ones
+// that have finished starting
+function pickWorker() {
+    startPool();
+    const live = workers.filter(w => w && w.alive);
+    if (live.length === 0) return null;
+    const ready = live.filter(w => w.ready);
+    const candidates = ready.length > 0 ? ready : live;
+    return candidates.reduce((best, w) => (w.pending.size < best.pending.size ? w : best));
+}
+
+// Send a request to the pool; callback(err, result)
+function request(method, params, callback) {
+    const worker = pickWorker();
+    if (!worker) {
+        return callback({ error: 'Meal planner unavailable', details: 'no live planner workers' }, null);
+    }
+    const id = nextRequestId++;
+
+    const timer = setTimeout(() => {
+        if (worker.pending.delete(id)) {
+            callback({ error: 'Meal planner timed out', details: `no response after ${REQUEST_TIMEOUT_MS}ms` }, null);
+        }
+    }, REQUEST_TIMEOUT_MS);
+
+    worker.pending.set(id, { callback, timer });
+    const message = JSON.stringify({ id, method, params }) + '\n';
+    if (worker.ready) {
+        worker.proc.stdin.write(message);
+    } else {
+        worker.queued.push({ id, message });
+    }
+}
+
+// Generate a meal plan using a warm worker
+function createMealPlan(params, callback) {
+    request('meal_plan', params, callback);
+}
+
+// Plan many meals in one call; params.requests is a list of meal_plan params
+function createMealPlans(params, callback) {
+    request('meal_plans', params, callback);
+}
+
+// Stop all workers (used on shutdown)
+function stopPool() {
+    workers.forEach((w, i) => {
+        workers[i] = null;
+        if (w) w.proc.stdin.end();
+    });
+    workers.length = 0;
+}
+
+module.exports = {
+    startPool,
+    request,
+    createMealPlan,
+    createMealPlans,
+    stopPool
+};
@@ -1,14 +1,95 @@
 """
-Load scraped nutrition data from Excel into SQLite database
+Load scraped nutrition data (Excel, Parquet or Arrow export) into SQLite database
 """
 import sqlite3
 import pandas as pd
 import os
+import re
+import sys
+import time
 from datetime import datetime
 
 
-def create_nutrition_table(conn):
-    """Create the nutrition table if it doesn't exist"""
+# Date formats seen in the scraped data, tried in order when building date_key
+DATE_FORMATS = ['%A, %B %d, %Y', '%B %d, %Y', '%Y-%m-%d', '%m/%d/%Y']
+
+# Columns filled from the scraped data, in INSERT order
+TEXT_COLUMNS = ['dining_hall', 'service', 'date', 'meal_type', 'category', 'name', 'serving_size']
+NUMERIC_COLUMNS = [
+    'calories', 'total_fat', 'saturated_fat', 'trans_fat', 'cholesterol', 'sodium',
+    'potassium', 'total_carbohydrate', 'dietary_fiber', 'sugars', 'protein'
+]
+REQUIRED_COLUMNS = ['dining_hall', 'service', 'date', 'meal_type', 'name']
+
+# Natural key of a menu item: one row per item on a hall's service/date/meal menu
+MENU_ITEM_KEY = ['dining_hall', 'service', 'date', 'meal_type', 'name']
+
+INSERT_SQL = f'''
+    INSERT INTO nutrition_data ({', '.join(TEXT_COLUMNS + NUMERIC_COLUMNS)})
+    VALUES ({', '.join('?' * len(TEXT_COLUMNS + NUMERIC_COLUMNS))})
+'''
+
+# Incremental loads: new items are inserted, known items only rewritten when a
+# value actually changed (IS NOT also compares NULLs), so unchanged rows keep
+# their id, scraped_at and pages untouched
+UPSERT_SQL = INSERT_SQL + f'''
+    ON CONFLICT ({', '.join(MENU_ITEM_KEY)}) DO UPDATE SET
+        {', '.join(f'{c} = excluded.{c}' for c in TEXT_COLUMNS + NUMERIC_COLUMNS if c not in MENU_ITEM_KEY)},
+        scraped_at = CURRENT_TIMESTAMP
+    WHERE {' OR '.join(f'nutrition_data.{c} IS NOT excluded.{c}'
+                       for c in TEXT_COLUMNS + NUMERIC_COLUMNS if c not in MENU_ITEM_KEY)}
+'''
+
+# Index name -> columns, created once the data is in
+NUTRITION_INDEXES = {
+    'idx_menu_item': ', '.join(MENU_ITEM_KEY),  # UNIQUE, the upsert conflict target
+    'idx_dining_hall': 'dining_hall',
+    'idx_date_meal': 'date, meal_type',
+    'idx_name': 'name',
+    # Equality lookups on the resolved hall/date (see build_dimensions)
+    'idx_hall_meal_date': 'hall_id, meal_type, date_key',
+}
+
+# Rows per executemany call during a load
+INSERT_CHUNK_ROWS = 10000
+
+# Settings for the connection that builds the shadow database. Nobody reads
+# the shadow and a failed load just deletes it, so it is built without syncs
+# and with the rollback journal in memory; it is fsynced once before the swap
+LOAD_PRAGMAS = [
+    'PRAGMA journal_mode = MEMORY',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA temp_store = MEMORY',
+]
+
+# Settings for an incremental load, which writes to the live database: its
+# journal and syncs stay as they are; the large cache keeps the changed pages
+# in memory so readers aren't locked out until the commit
+LIVE_LOAD_PRAGMAS = [
+    'PRAGMA cache_size = -65536',
+    'PRAGMA temp_store = MEMORY',
+]
+
+# The shadow database a load is built in, next to the live one
+SHADOW_SUFFIX = '.loading'
+
+# Checks a shadow database must pass before it replaces the live one:
+# largest share of NULLs per column, largest share of rows the planner can't
+# use (no calories), and smallest size relative to the live table for a full
+# reload (a half-empty export is more likely a broken scrape than a menu change)
+MAX_NULL_RATES = {'hall_id': 0.0, 'date_key': 0.05, 'category': 0.5}
+MAX_UNUSABLE_SHARE = 0.5
+MIN_ROWS_RATIO = 0.5
+
+
+def create_nutrition_table(conn, indexes=True):
+    """
+    Create the nutrition table if it doesn't exist
+
+    Args:
+        indexes: Also create its indexes (bulk loads add them after the data)
+    """
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -32,113 +113,529 @@ def create_nutrition_table(conn):
             dietary_fiber REAL,
             sugars REAL,
             protein REAL,
-            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            hall_id INTEGER,
+            date_key TEXT
         )
     ''')
 
-    # Create indexes for faster queries
+    # Older databases were created before hall_id/date_key existed
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(nutrition_data)")}
+    for column, column_type in (('hall_id', 'INTEGER'), ('date_key', 'TEXT')):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE nutrition_data ADD COLUMN {column} {column_type}")
+
+    if indexes:
+        create_nutrition_indexes(conn)
+
+    print("✓ Table 'nutrition_data' created/verified")
+
+
+def create_nutrition_indexes(conn):
+    """Create the nutrition_data indexes that don't exist yet"""
+    unique_sql = f"CREATE UNIQUE INDEX IF NOT EXISTS idx_menu_item ON nutrition_data({NUTRITION_INDEXES['idx_menu_item']})"
+    try:
+        conn.execute(unique_sql)
+    except sqlite3.IntegrityError:
+        # Databases from before the natural key may repeat an item; keep its latest row
+        removed = conn.execute(f'''
+            DELETE FROM nutrition_data WHERE id NOT IN (
+                SELECT MAX(id) FROM nutrition_data GROUP BY {', '.join(MENU_ITEM_KEY)}
+            )
+        ''').rowcount
+        print(f"✓ Removed {removed} duplicate menu items")
+        conn.execute(unique_sql)
+
+    for name, columns in NUTRITION_INDEXES.items():
+        if name != 'idx_menu_item':
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON nutrition_data({columns})")
+
+
+def drop_nutrition_indexes(conn):
+    """Drop the nutrition_data indexes so a bulk insert doesn't maintain them row by row"""
+    for name in NUTRITION_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def insert_rows(df):
+    """
+    Scraped rows as INSERT tuples (TEXT_COLUMNS + NUMERIC_COLUMNS order),
+    converted a column at a time: missing nutrient values become 0.0, missing
+    text columns '' and empty categories/serving sizes NULL
+
+    Returns:
+        (rows, skipped): the tuples, and how many rows were left out for a
+        missing required field or a nutrient value that isn't a number
+    """
+    n_rows = len(df)
+    keep = pd.Series(True, index=df.index)
+    columns = []
+
+    for column in TEXT_COLUMNS:
+        if column not in df.columns:
+            columns.append([''] * n_rows)
+            continue
+        values = df[column].astype(object)
+        present = values.notna()
+        if column in REQUIRED_COLUMNS:
+            keep &= present
+        columns.append(values.where(present, None).tolist())
+
+    for column in NUMERIC_COLUMNS:
+        if column not in df.columns:
+            columns.append([0.0] * n_rows)
+            continue
+        values = pd.to_numeric(df[column], errors='coerce')
+        keep &= values.notna() | df[column].isna()
+        columns.append(values.fillna(0.0).astype(float).tolist())
+
+    rows = zip(*columns)
+    if keep.all():
+        return list(rows), 0
+    return [row for row, ok in zip(rows, keep.tolist()) if ok], int((~keep).sum())
+
+
+def unique_items(rows):
+    """
+    Insert tuples with one row per MENU_ITEM_KEY (a repeated item keeps its
+    last values, as an upsert would)
+
+    Returns:
+        (rows, duplicates)
+    """
+    key = [(TEXT_COLUMNS + NUMERIC_COLUMNS).index(column) for column in MENU_ITEM_KEY]
+    items = {tuple(row[i] for i in key): row for row in rows}
+    return list(items.values()), len(rows) - len(items)
+
+
+def replace_rows(conn, rows):
+    """
+    Replace all of nutrition_data with rows (indexes are dropped; the
+    caller rebuilds them once dimensions are set and then commits)
+
+    Returns:
+        Counts dict (inserted)
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM nutrition_data")
+    drop_nutrition_indexes(conn)
+    print("✓ Cleared existing data")
+
+    for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+        cursor.executemany(INSERT_SQL, rows[i:i + INSERT_CHUNK_ROWS])
+
+    return {'inserted': len(rows)}
+
+
+def upsert_rows(conn, rows):
+    """
+    Insert new menu items and update changed ones, leaving everything else
+    in nutrition_data alone (the caller commits)
+
+    Returns:
+        Counts dict (inserted, updated, unchanged)
+    """
+    cursor = conn.cursor()
+    before = cursor.execute("SELECT COUNT(*) FROM nutrition_data").fetchone()[0]
+
+    # rowcount counts inserted plus actually updated rows
+    changed = 0
+    for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+        cursor.executemany(UPSERT_SQL, rows[i:i + INSERT_CHUNK_ROWS])
+        changed += cursor.rowcount
+    inserted = cursor.execute("SELECT COUNT(*) FROM nutrition_data").fetchone()[0] - before
+
+    return {'inserted': inserted, 'updated': changed - inserted, 'unchanged': len(rows) - changed}
+
+
+def create_dimension_tables(conn):
+    """Create the dining hall and date lookup tables if they don't exist"""
+    cursor = conn.cursor()
+
+    # One row per dining hall; ids stay the same across reloads
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_dining_hall
-        ON nutrition_data(dining_hall)
+        CREATE TABLE IF NOT EXISTS dining_halls (
+            hall_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            code TEXT
+        )
     ''')
 
+    # Lowercase names users may type for a hall: full name, short code, name without the code
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_date_meal
-        ON nutrition_data(date, meal_type)
+        CREATE TABLE IF NOT EXISTS dining_hall_aliases (
+            alias TEXT PRIMARY KEY,
+            hall_id INTEGER NOT NULL REFERENCES dining_halls(hall_id)
+        )
     ''')
 
+    # Date labels as scraped ("Monday, November 17, 2025") -> ISO date_key
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_name
-        ON nutrition_data(name)
+        CREATE TABLE IF NOT EXISTS menu_dates (
+            label TEXT PRIMARY KEY,
+            date_key TEXT
+        )
     ''')
 
-    conn.commit()
-    print("✓ Table 'nutrition_data' created/verified")
 
+def hall_aliases(name):
+    """
+    Lowercase aliases for a dining hall name, e.g.
+    "Ikenberry Dining Center (Ike)" -> full name, "ike", "ikenberry dining center"
 
-def load_excel_to_database(excel_file, db_file='../data/nutrition_data.db'):
+    Returns:
+        (code, aliases) where code is the short code in parentheses (or None)
     """
-    Load nutrition data from Excel file into SQLite database
+    name = name.strip()
+    aliases = [name.lower()]
+    code = None
+
+    match = re.match(r'^(.*?)\s*\(([^)]+)\)$', name)
+    if match:
+        code = match.group(2).strip()
+        aliases += [code.lower(), match.group(1).strip().lower()]
+
+    return code, aliases
+
+
+def parse_date_key(label):
+    """ISO date (YYYY-MM-DD) for a scraped date label, or None if it can't be parsed"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(label).strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def build_dimensions(conn):
+    """
+    Fill dining_halls, dining_hall_aliases and menu_dates from nutrition_data
+    and set every row's hall_id and date_key (the caller commits)
+    """
+    create_dimension_tables(conn)
+    cursor = conn.cursor()
+
+    # Sorted so new halls get the same ids whether or not idx_dining_hall exists yet
+    halls = [row[0] for row in cursor.execute("SELECT DISTINCT dining_hall FROM nutrition_data ORDER BY dining_hall")]
+    for name in halls:
+        code, aliases = hall_aliases(name)
+        cursor.execute("INSERT OR IGNORE INTO dining_halls (name, code) VALUES (?, ?)", (name, code))
+        hall_id = cursor.execute("SELECT hall_id FROM dining_halls WHERE name = ?", (name,)).fetchone()[0]
+
+        # First hall to claim an alias keeps it
+        cursor.executemany(
+            "INSERT OR IGNORE INTO dining_hall_aliases (alias, hall_id) VALUES (?, ?)",
+            [(alias, hall_id) for alias in aliases]
+        )
+
+    # Keys never change for a row (hall ids are stable, labels parse the same
+    # way), so only rows added since the last build need them
+    cursor.execute('''
+        UPDATE nutrition_data
+        SET hall_id = (SELECT hall_id FROM dining_halls WHERE dining_halls.name = nutrition_data.dining_hall)
+        WHERE hall_id IS NULL
+    ''')
+
+    dates = [(label, parse_date_key(label))
+             for (label,) in cursor.execute("SELECT DISTINCT date FROM nutrition_data")]
+    cursor.executemany("INSERT OR REPLACE INTO menu_dates (label, date_key) VALUES (?, ?)", dates)
+    cursor.execute('''
+        UPDATE nutrition_data
+        SET date_key = (SELECT date_key FROM menu_dates WHERE menu_dates.label = nutrition_data.date)
+        WHERE date_key IS NULL
+    ''')
+
+    unparsed = [label for label, date_key in dates if date_key is None]
+    print(f"✓ Indexed {len(halls)} dining halls and {len(dates)} dates")
+    if unparsed:
+        print(f"✗ Could not parse {len(unparsed)} dates (e.g. {unparsed[0]!r})")
+
+
+def add_planner_path():
+    """Make the meal-planning modules (snapshot.py, columnar.py) importable"""
+    planner_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'meal-planning')
+    if planner_dir not in sys.path:
+        sys.path.insert(0, planner_dir)
+
+
+def compile_planner_snapshot(db_file, live_db=None):
+    """
+    Rebuild the meal planner's memory-mapped snapshot of the database
+    (meal-planning/snapshot.py) so planners serve the new data without
+    querying SQLite
 
     Args:
-        excel_file: Path to the Excel file with nutrition data
+        live_db: Database the snapshot is for, when db_file is a shadow
+                 that is about to replace it (default: db_file)
+    """
+    add_planner_path()
+
+    try:
+        from snapshot import compile_snapshot, snapshot_path
+        summary = compile_snapshot(db_file, snapshot_path(live_db or db_file))
+    except Exception as e:
+        print(f"✗ Could not compile planner snapshot: {e}")
+        return None
+
+    print(f"✓ Compiled planner snapshot: {summary['path']} "
+          f"({summary['rows']} rows, {summary['menus']} menus, {summary['seconds']}s)")
+    return summary
+
+
+def count_live_rows(db_file):
+    """Rows in the live nutrition_data (0 if there is no database or table yet)"""
+    if not os.path.exists(db_file):
+        return 0
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM nutrition_data").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+
+
+def create_shadow_database(db_file):
+    """
+    Start a full reload: a consistent copy of the live database (hall ids and
+    load history carry over) to build the new data in, or an empty file if
+    there is no live database yet. The copy is page for page (about 0.1s for
+    100k rows / 40 MB from a warm page cache); incremental loads don't make one.
+
+    Returns:
+        (shadow_file, live_rows): the shadow's path and how many rows the
+        live nutrition_data has (0 if none)
+    """
+    shadow_file = db_file + SHADOW_SUFFIX
+    if os.path.exists(shadow_file):
+        os.remove(shadow_file)  # left over from a load that died
+
+    live_rows = 0
+    if os.path.exists(db_file):
+        live = sqlite3.connect(db_file)
+        shadow = sqlite3.connect(shadow_file)
+        try:
+            # Online backup: a consistent copy even while readers are using it
+            live.backup(shadow)
+            live_rows = shadow.execute("SELECT COUNT(*) FROM nutrition_data").fetchone()[0]
+        except sqlite3.OperationalError:
+            live_rows = 0  # no nutrition_data table yet
+        finally:
+            shadow.close()
+            live.close()
+
+    return shadow_file, live_rows
+
+
+def record_data_load(conn, source_file, mode, counts):
+    """
+    Add this load to the data_loads history; its version is what the data
+    is identified by once the load is committed/published
+
+    Returns:
+        The new data version
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_loads (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            source_file TEXT,
+            mode TEXT,
+            total_rows INTEGER,
+            inserted INTEGER,
+            updated INTEGER,
+            unchanged INTEGER
+        )
+    ''')
+    total = conn.execute("SELECT COUNT(*) FROM nutrition_data").fetchone()[0]
+    version = conn.execute(
+        "INSERT INTO data_loads (source_file, mode, total_rows, inserted, updated, unchanged) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (os.path.basename(source_file), mode, total,
+         counts.get('inserted'), counts.get('updated'), counts.get('unchanged'))
+    ).lastrowid
+    return version
+
+
+def validate_database(conn, live_rows, incremental=False, force=False):
+    """
+    Check a freshly loaded database (the shadow, or the live database's
+    uncommitted incremental load) before it goes live
+
+    Args:
+        force: Accept a full reload that shrinks the table past MIN_ROWS_RATIO
+
+    Returns:
+        List of problems (empty if it can be published)
+    """
+    problems = []
+
+    integrity = conn.execute("PRAGMA quick_check").fetchone()[0]
+    if integrity != 'ok':
+        problems.append(f"integrity check failed: {integrity}")
+
+    total = conn.execute("SELECT COUNT(*) FROM nutrition_data").fetchone()[0]
+    if total == 0:
+        return problems + ["nutrition_data is empty"]
+    if not (incremental or force) and total < live_rows * MIN_ROWS_RATIO:
+        problems.append(f"only {total} rows, down from {live_rows} (minimum {MIN_ROWS_RATIO:.0%})")
+
+    for column, limit in MAX_NULL_RATES.items():
+        rate = conn.execute(f"SELECT AVG({column} IS NULL) FROM nutrition_data").fetchone()[0]
+        if rate > limit:
+            problems.append(f"{rate:.1%} of rows have no {column} (limit {limit:.0%})")
+
+    unusable = conn.execute("SELECT AVG(NOT (calories > 0)) FROM nutrition_data").fetchone()[0]
+    if unusable > MAX_UNUSABLE_SHARE:
+        problems.append(f"{unusable:.1%} of rows have no calories (limit {MAX_UNUSABLE_SHARE:.0%})")
+
+    return problems
+
+
+def publish_database(shadow_file, db_file):
+    """
+    Swap a validated shadow database in for the live one in a single rename:
+    a reader opens either the old file or the new one, never a partial load.
+    Connections already open keep reading the old data until they reopen.
+    """
+    # Make the data durable first so a crash can't leave a renamed but empty file
+    with open(shadow_file, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(shadow_file, db_file)
+
+    # And the rename itself
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(db_file)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def load_excel_to_database(excel_file, db_file='../data/nutrition_data.db', incremental=False, force=False):
+    """
+    Load nutrition data from an Excel, Parquet or Arrow file into SQLite database
+
+    Args:
+        excel_file: Path to the scraper export (.xlsx, .parquet, .arrow/.feather)
         db_file: Path to SQLite database file (will be created if doesn't exist)
+        incremental: Upsert on (dining_hall, service, date, meal_type, name)
+                     instead of replacing the table: new items are inserted,
+                     changed ones updated in place (same id), nothing is deleted
+        force: Publish a full reload even if it has far fewer rows than the
+               live table (see validate_database)
+
+    A full reload is built in a shadow copy (<db>.loading), validated, and
+    only then renamed over db_file. An incremental load upserts into the live
+    database in a single transaction that is validated before it commits.
+    Either way readers never see a half-loaded table, and a load that fails
+    validation leaves the live database untouched.
     """
 
-    # Check if Excel file exists
+    # Check if data file exists
     if not os.path.exists(excel_file):
-        print(f"Error: Excel file not found: {excel_file}")
+        print(f"Error: Data file not found: {excel_file}")
         return False
 
     print(f"\nLoading data from: {excel_file}")
     print(f"Database: {db_file}\n")
 
-    # Read Excel file
+    # Read data file
+    add_planner_path()
+    from columnar import read_nutrition_file, file_format
+
     try:
-        df = pd.read_excel(excel_file)
-        print(f"✓ Read {len(df)} rows from Excel")
+        df = read_nutrition_file(excel_file)
+        print(f"✓ Read {len(df)} rows from {file_format(excel_file).capitalize()}")
     except Exception as e:
-        print(f"Error reading Excel file: {e}")
+        print(f"Error reading data file: {e}")
         return False
 
-    # Connect to database
-    conn = sqlite3.connect(db_file)
-
-    # Create table
-    create_nutrition_table(conn)
-
-    # Prepare data for insertion
-    cursor = conn.cursor()
-
-    # Clear existing data (optional - comment out if you want to append)
-    cursor.execute("DELETE FROM nutrition_data")
-    print("✓ Cleared existing data")
-
-    # Insert data
-    inserted = 0
-    failed = 0
-
-    for idx, row in df.iterrows():
-        try:
-            cursor.execute('''
-                INSERT INTO nutrition_data (
-                    dining_hall, service, date, meal_type, category, name,
-                    serving_size, calories, total_fat, saturated_fat, trans_fat,
-                    cholesterol, sodium, potassium, total_carbohydrate,
-                    dietary_fiber, sugars, protein
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                row.get('dining_hall', ''),
-                row.get('service', ''),
-                row.get('date', ''),
-                row.get('meal_type', ''),
-                row.get('category', ''),
-                row.get('name', ''),
-                row.get('serving_size', ''),
-                float(row.get('calories', 0)) if pd.notna(row.get('calories')) else 0.0,
-                float(row.get('total_fat', 0)) if pd.notna(row.get('total_fat')) else 0.0,
-                float(row.get('saturated_fat', 0)) if pd.notna(row.get('saturated_fat')) else 0.0,
-                float(row.get('trans_fat', 0)) if pd.notna(row.get('trans_fat')) else 0.0,
-                float(row.get('cholesterol', 0)) if pd.notna(row.get('cholesterol')) else 0.0,
-                float(row.get('sodium', 0)) if pd.notna(row.get('sodium')) else 0.0,
-                float(row.get('potassium', 0)) if pd.notna(row.get('potassium')) else 0.0,
-                float(row.get('total_carbohydrate', 0)) if pd.notna(row.get('total_carbohydrate')) else 0.0,
-                float(row.get('dietary_fiber', 0)) if pd.notna(row.get('dietary_fiber')) else 0.0,
-                float(row.get('sugars', 0)) if pd.notna(row.get('sugars')) else 0.0,
-                float(row.get('protein', 0)) if pd.notna(row.get('protein')) else 0.0
-            ))
-            inserted += 1
-        except Exception as e:
-            print(f"Error inserting row {idx}: {e}")
-            failed += 1
+    started = time.perf_counter()
+    rows, skipped = insert_rows(df)
+    rows, duplicates = unique_items(rows)
+
+    # Incremental loads change a small part of the table, so they go straight
+    # into the live database; full reloads are built in a shadow copy
+    live_rows = count_live_rows(db_file) if incremental else 0
+    if live_rows:
+        shadow_file = None
+        conn = sqlite3.connect(db_file, isolation_level=None)
+        pragmas = LIVE_LOAD_PRAGMAS
+    else:
+        shadow_file, live_rows = create_shadow_database(db_file)
+        conn = sqlite3.connect(shadow_file, isolation_level=None)
+        pragmas = LOAD_PRAGMAS
+    for pragma in pragmas:
+        conn.execute(pragma)
+
+    def discard():
+        conn.rollback()
+        conn.close()
+        if shadow_file:
+            os.remove(shadow_file)
+
+    # Everything below is one transaction, committed only once it validates
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Create table (an incremental load needs the natural key index up front)
+        create_nutrition_table(conn, indexes=incremental)
+
+        insert_started = time.perf_counter()
+        if incremental:
+            counts = upsert_rows(conn, rows)
+        else:
+            counts = replace_rows(conn, rows)
+        insert_seconds = time.perf_counter() - insert_started
+
+        if incremental:
+            print(f"\n✓ Upserted {len(rows)} rows: {counts['inserted']} inserted, "
+                  f"{counts['updated']} updated, {counts['unchanged']} unchanged")
+        else:
+            print(f"\n✓ Inserted {counts['inserted']} rows")
+        if skipped > 0:
+            print(f"✗ Skipped {skipped} rows (missing dining hall/service/date/meal/name or a non-numeric nutrient)")
+        if duplicates > 0:
+            print(f"✗ Merged {duplicates} repeated menu items (same hall, service, date, meal and name)")
+
+        # Resolve hall names and dates to ids/keys for indexed lookups
+        build_dimensions(conn)
+
+        create_nutrition_indexes(conn)
+
+        version = record_data_load(conn, excel_file, 'incremental' if incremental else 'replace', counts)
+        problems = validate_database(conn, live_rows, incremental, force)
+    except Exception:
+        # Nothing was committed; the live database is as it was
+        discard()
+        raise
+
+    if incremental and counts['inserted'] == counts['updated'] == 0 and live_rows:
+        # Committing only a data_loads row would invalidate every reader's caches
+        discard()
+        print(f"\n✓ No menu changes; {db_file} left as is")
+        return True
+
+    if problems:
+        discard()
+        print("\n✗ Not publishing this load, the live database is unchanged:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return False
 
     conn.commit()
 
-    print(f"\n✓ Inserted {inserted} rows")
-    if failed > 0:
-        print(f"✗ Failed to insert {failed} rows")
+    total_seconds = time.perf_counter() - started
+    print(f"✓ Loaded in {total_seconds:.2f}s: insert {len(rows) / max(insert_seconds, 1e-9):,.0f} rows/s, "
+          f"overall {len(rows) / max(total_seconds, 1e-9):,.0f} rows/s")
 
     # Display summary statistics
+    cursor = conn.cursor()
     print("\n" + "="*60)
     print("DATABASE SUMMARY")
     print("="*60)
@@ -174,7 +671,16 @@ def load_excel_to_database(excel_file, db_file='../data/nutrition_data.db'):
         print(f"{row[0]} | {row[1]} | {row[2]} | {row[3]} | {row[4]} cal")
 
     conn.close()
-    print(f"\n✓ Database saved to: {db_file}")
+
+    if shadow_file is None:
+        # Committed in place; planners use SQLite until the snapshot catches up
+        compile_planner_snapshot(db_file)
+    else:
+        # Snapshot first: it matches the shadow file, so planners start using it
+        # the moment the rename below makes that file the live database
+        compile_planner_snapshot(shadow_file, live_db=db_file)
+        publish_database(shadow_file, db_file)
+    print(f"\n✓ Database saved to: {db_file} (data version {version})")
 
     return True
 
@@ -231,31 +737,44 @@ def query_database(db_file='nutrition_data.db'):
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('excel_file', nargs='?',
+                        help='Scraper export to load (default: the newest one in the current directory)')
+    parser.add_argument('--db', type=str, default='../data/nutrition_data.db')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Upsert changed/new menu items instead of replacing the whole table')
+    parser.add_argument('--force', action='store_true',
+                        help='Publish a full reload even if it is much smaller than the current data')
+    args = parser.parse_args()
 
     # Check for command line argument
-    if len(sys.argv) > 1:
-        excel_file = sys.argv[1]
+    if args.excel_file:
+        excel_file = args.excel_file
     else:
-        # Default: look for the most recent Excel file in current directory
-        excel_files = [f for f in os.listdir('.') if f.endswith('.xlsx') and not f.startswith('~')]
+        add_planner_path()
+        from columnar import DATA_FILE_SUFFIXES
+
+        # Default: look for the most recent export (Excel, Parquet or Arrow) in current directory
+        excel_files = [f for f in os.listdir('.') if f.lower().endswith(DATA_FILE_SUFFIXES) and not f.startswith('~')]
 
         if not excel_files:
-            print("No Excel files found in current directory")
-            print("\nUsage: python load_to_database.py [excel_file.xlsx]")
+            print("No Excel/Parquet/Arrow files found in current directory")
+            print("\nUsage: python load_to_database.py [excel_file.xlsx | data.parquet | data.arrow] [--incremental]")
             sys.exit(1)
 
-        # Use most recently modified Excel file
+        # Use most recently modified export
         excel_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
         excel_file = excel_files[0]
-        print(f"Using most recent Excel file: {excel_file}")
+        print(f"Using most recent data file: {excel_file}")
 
     # Load data
-    success = load_excel_to_database(excel_file)
+    success = load_excel_to_database(excel_file, args.db, incremental=args.incremental, force=args.force)
 
     if success:
         # Show example queries
-        query_database()
+        query_database(args.db)
 
         print("\n" + "="*60)
         print("Next steps:")
@@ -9,6 +9,8 @@ import pandas as pd
 from datetime import datetime, timedelta
 import json
 import re
+import os
+import sys
 
 class NutritionScraperComplete:
     def __init__(self, testing_mode=False):
@@ -805,6 +807,63 @@ class NutritionScraperComplete:
 
         return all_results
     
+    def results_frame(self, all_results):
+        """Scraped rows as a DataFrame in export order (sorted, export columns only)"""
+        # Create DataFrame
+        df = pd.DataFrame(all_results)
+
+        # Sort by dining_hall, service, date, meal_type, name
+        df = df.sort_values(['dining_hall', 'service', 'date', 'meal_type', 'name'],
+                            ascending=[True, True, True, True, True])
+
+        # Reorder columns to include date and meal_type
+        column_order = [
+            'dining_hall', 'service', 'date', 'meal_type', 'category', 'name', 'serving_size',
+            'calories', 'total_fat', 'saturated_fat', 'trans_fat', 'cholesterol',
+            'sodium', 'potassium', 'total_carbohydrate', 'dietary_fiber', 'sugars', 'protein'
+        ]
+        # Only keep columns that actually exist in df to avoid KeyError
+        column_order = [c for c in column_order if c in df.columns]
+        return df[column_order]
+
+    def export_to_columnar(self, all_results, filename=None):
+        """
+        Export results to Parquet (or Arrow IPC for a .arrow/.feather filename)
+        with typed nutrient columns and dictionary-encoded hall/meal/category
+        strings; load_to_db.py and the meal planner read it directly
+
+        Needs pyarrow; returns None (after printing why) if it is missing.
+        """
+        if not all_results:
+            print("No data to export")
+            return None
+
+        planner_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'meal-planning')
+        if planner_dir not in sys.path:
+            sys.path.insert(0, planner_dir)
+
+        try:
+            from columnar import write_nutrition_file
+
+            if not filename:
+                filename = f"complete_dining_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+
+            df = self.results_frame(all_results)
+            write_nutrition_file(df, filename)
+
+            print(f"Exported to {filename}")
+            print(f"Total rows: {len(df)}")
+            return filename
+
+        except ImportError as e:
+            print(f"Skipping columnar export (pip install pyarrow): {str(e)}")
+            return None
+        except Exception as e:
+            print(f"Error exporting to {filename}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
     def export_to_excel(self, all_results, filename=None):
         """Export results to Excel with complete data"""
         if not all_results:
@@ -815,22 +874,7 @@ class NutritionScraperComplete:
             if not filename:
                 filename = f"complete_dining_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             
-            # Create DataFrame
-            df = pd.DataFrame(all_results)
-
-            # Sort by dining_hall, service, date, meal_type, name
-            df = df.sort_values(['dining_hall', 'service', 'date', 'meal_type', 'name'],
-                                ascending=[True, True, True, True, True])
-
-            # Reorder columns to include date and meal_type
-            column_order = [
-                'dining_hall', 'service', 'date', 'meal_type', 'category', 'name', 'serving_size',
-                'calories', 'total_fat', 'saturated_fat', 'trans_fat', 'cholesterol',
-                'sodium', 'potassium', 'total_carbohydrate', 'dietary_fiber', 'sugars', 'protein'
-            ]
-            # Only keep columns that actually exist in df to avoid KeyError
-            column_order = [c for c in column_order if c in df.columns]
-            df = df[column_order]
+            df = self.results_frame(all_results)
             
             # Write to Excel
             with pd.ExcelWriter(filename, engine='openpyxl') as writer:
@@ -939,6 +983,11 @@ if __name__ == "__main__":
             if excel_file:
                 print(f"\n✓ Success! Excel file: {excel_file}")
 
+                # Same data as Parquet, which loads much faster than the workbook
+                parquet_file = scraper.export_to_columnar(all_results, os.path.splitext(excel_file)[0] + '.parquet')
+                if parquet_file:
+                    print(f"✓ Parquet file: {parquet_file}")
+
             # Sample output
             print(f"\nSample items:")
             for r in all_results[:5]:
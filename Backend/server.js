@@ -1,17 +1,50 @@
 const express = require('express');
 const cors = require('cors');
-const { spawn } = require('child_process');
 const path = require('path');
 const auth = require('./auth');
+const plannerPool = require('./planner_pool');
 const sqlite3 = require('sqlite3').verbose();
 const fs = require('fs');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
 
+// When set, meal plans slower than this (planner time) are logged with their
+// profile breakdown; unset, requests are only profiled when they ask for it
+const SLOW_PLAN_MS = process.env.SLOW_PLAN_MS ? parseInt(process.env.SLOW_PLAN_MS) : null;
+
+// When set, every meal plan request also dumps cProfile stats into this directory
+const PROFILE_DIR = process.env.PLANNER_PROFILE_DIR;
+let profileCount = 0;
+
 // Database connection
 const dbPath = path.join(__dirname, 'data', 'nutrition_data.db');
-const db = new sqlite3.Database(dbPath);
+let db = null;
+let dbInode = null;
+
+// The loader publishes a full reload by renaming a fully built database over
+// dbPath, so reopen when the file's inode changes (incremental loads commit
+// in place and the open handle sees them). Queries already queued on
+// the old handle still finish on the old data before it closes.
+function getDb() {
+    let inode = null;
+    try {
+        inode = fs.statSync(dbPath).ino;
+    } catch (err) {
+        // Missing file: keep whatever handle we have
+    }
+
+    if (db === null || (inode !== null && inode !== dbInode)) {
+        if (db !== null) {
+            db.close((err) => {
+                if (err) console.error('Failed to close replaced database:', err.message);
+            });
+        }
+        db = new sqlite3.Database(dbPath);
+        dbInode = inode;
+    }
+    return db;
+}
 
 // Middleware
 app.use(cors());
@@ -28,82 +61,144 @@ app.get('/api/meal-plan', (req, res) => {
         });
     }
 
-    // Path to Python script
-    const scriptPath = path.join(__dirname, 'meal-planning', 'meal_planner.py');
-
-    // Build arguments
-    const args = [
-        scriptPath,
-        '--calories', calories,
-        '--hall', dining_hall,
-        '--json' // Force JSON output
-    ];
+    const params = {
+        calories: parseInt(calories),
+        hall: dining_hall
+    };
 
     if (meal_type) {
-        args.push('--meal', meal_type);
+        params.meal = meal_type;
     }
 
     if (req.query.goal) {
-        args.push('--goal', req.query.goal);
+        params.goal = req.query.goal;
     }
 
-    // Spawn Python process
-    // Note: Using 'python3' - make sure it's in the path
-    const pythonProcess = spawn('python3', args);
+    if (req.query.date) {
+        params.date = req.query.date;
+    }
 
-    let dataString = '';
-    let errorString = '';
+    // Seeded requests are reproducible and served from the planner's cache when repeated
+    if (req.query.seed) {
+        params.seed = parseInt(req.query.seed);
+    }
 
-    // Collect data from stdout
-    pythonProcess.stdout.on('data', (data) => {
-        dataString += data.toString();
+    // Optional search engine: batch (default), random or exact
+    if (req.query.engine) {
+        params.engine = req.query.engine;
+    }
+
+    // Optional latency budget: the planner returns its best plan when it runs out
+    if (req.query.budget_ms) {
+        params.budget_ms = parseFloat(req.query.budget_ms);
+    }
+
+    // Optional runner-up plans (returned under "alternatives") so a rejected
+    // plan doesn't need another request
+    if (req.query.alternatives) {
+        params.alternatives = parseInt(req.query.alternatives);
+    }
+
+    if (req.query.min_distance) {
+        params.min_distance = parseFloat(req.query.min_distance);
+    }
+
+    // Profiling is opt-in: the timing breakdown is collected for clients that
+    // pass ?profile=1 (and returned to them) or when slow-plan logging is on
+    const returnProfile = req.query.profile === '1' || req.query.profile === 'true';
+    if (returnProfile || SLOW_PLAN_MS !== null) {
+        params.profile = true;
+    }
+    if (PROFILE_DIR) {
+        params.profile_file = path.join(PROFILE_DIR, `meal-plan-${process.pid}-${++profileCount}.prof`);
+    }
+
+    // Hand the request to a warm planner worker instead of spawning python3 per call
+    plannerPool.createMealPlan(params, (err, mealPlan) => {
+        if (err) {
+            console.error(`Meal planner error: ${err.details}`);
+            return res.status(500).json(err);
+        }
+        logSlowPlan(params, mealPlan.profile);
+        if (!returnProfile) {
+            delete mealPlan.profile;
+        }
+        res.json(mealPlan);
     });
+});
+
+// Log where the time went for a slow planner request
+function logSlowPlan(params, profile) {
+    if (SLOW_PLAN_MS === null || !profile || profile.total_ms < SLOW_PLAN_MS) {
+        return;
+    }
+    console.warn(`Slow meal plan (${profile.total_ms} ms): ${JSON.stringify(params)} ` +
+        `phases=${JSON.stringify(profile.phases_ms)} pool=${JSON.stringify(profile.pool)} ` +
+        `pool_cache=${profile.pool_cache} plan_cache=${profile.plan_cache} ` +
+        `reloaded=${profile.data_reloaded}` + (profile.cprofile ? ` cprofile=${profile.cprofile}` : ''));
+}
+
+// Whole-day / whole-week plans (one worker request instead of a call per meal)
+function handlePlanRequest(method, req, res) {
+    const { calories, dining_hall } = req.query;
+
+    if (!calories || !dining_hall) {
+        return res.status(400).json({
+            error: 'Missing required parameters: calories (daily) and dining_hall are required'
+        });
+    }
 
-    // Collect errors from stderr
-    pythonProcess.stderr.on('data', (data) => {
-        errorString += data.toString();
+    const params = {
+        calories: parseInt(calories),
+        halls: dining_hall // comma-separated list is allowed
+    };
+
+    ['goal', 'date', 'engine'].forEach((key) => {
+        if (req.query[key]) {
+            params[key] = req.query[key];
+        }
     });
 
-    // Handle process close
-    pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-            console.error(`Python script exited with code ${code}`);
-            console.error(`Error: ${errorString}`);
-            return res.status(500).json({
-                error: 'Failed to generate meal plan',
-                details: errorString
-            });
+    if (req.query.seed) {
+        params.seed = parseInt(req.query.seed);
+    }
+
+    if (req.query.days) {
+        params.days = parseInt(req.query.days);
+    }
+
+    plannerPool.request(method, params, (err, plan) => {
+        if (err) {
+            console.error(`Meal planner error: ${err.details}`);
+            return res.status(500).json(err);
         }
+        res.json(plan);
+    });
+}
 
-        try {
-            // Parse JSON output from Python script
-            // The script might print other things (like warnings) to stdout if not careful
-            // But our modified script should only print JSON when --json is used
-            // We'll try to find the JSON object in the output if there's extra noise
-
-            // Simple attempt: parse the whole string
-            const mealPlan = JSON.parse(dataString);
-            res.json(mealPlan);
-        } catch (e) {
-            console.error('Failed to parse JSON output:', e);
-            console.error('Raw output:', dataString);
-
-            // Fallback: try to find the last JSON object in the output
-            try {
-                const lines = dataString.trim().split('\n');
-                const lastLine = lines[lines.length - 1];
-                const mealPlan = JSON.parse(lastLine);
-                res.json(mealPlan);
-            } catch (e2) {
-                res.status(500).json({
-                    error: 'Invalid response from meal planner',
-                    raw_output: dataString
-                });
-            }
+// Bulk meal plans: body is { requests: [{ calories, hall, meal, goal, ... }, ...] }
+// Results come back in the same order as the requests
+app.post('/api/meal-plans', (req, res) => {
+    const { requests } = req.body;
+
+    if (!Array.isArray(requests) || requests.length === 0) {
+        return res.status(400).json({
+            error: 'Missing required parameter: requests must be a non-empty array'
+        });
+    }
+
+    plannerPool.createMealPlans({ requests }, (err, plans) => {
+        if (err) {
+            console.error(`Meal planner error: ${err.details}`);
+            return res.status(500).json(err);
         }
+        res.json({ plans });
     });
 });
 
+app.get('/api/day-plan', (req, res) => handlePlanRequest('plan_day', req, res));
+app.get('/api/week-plan', (req, res) => handlePlanRequest('plan_week', req, res));
+
 // Authentication endpoints
 app.post('/api/auth/register', (req, res) => {
     const { email, password } = req.body;
@@ -219,11 +314,24 @@ app.delete('/api/user/:userId/favorites/:index', (req, res) => {
 
 // ============ NUTRITION DATA ENDPOINTS ============
 
+// Helper function to turn a hall name or alias (e.g. "ISR") into a WHERE clause.
+// Uses the loader's dining_hall_aliases table for an indexed hall_id lookup;
+// databases without it (or unknown names) fall back to a LIKE match.
+function hallFilter(hall, callback) {
+    const alias = hall.trim().toLowerCase();
+    getDb().get('SELECT hall_id FROM dining_hall_aliases WHERE alias = ?', [alias], (err, row) => {
+        if (err || !row) {
+            return callback({ clause: 'dining_hall LIKE ?', params: [`%${hall}%`], resolved: false });
+        }
+        callback({ clause: 'hall_id = ?', params: [row.hall_id], resolved: true });
+    });
+}
+
 // Get all available dining halls
 app.get('/api/dining-halls', (req, res) => {
     const query = `SELECT DISTINCT dining_hall FROM nutrition_data ORDER BY dining_hall`;
 
-    db.all(query, [], (err, rows) => {
+    getDb().all(query, [], (err, rows) => {
         if (err) {
             return res.status(500).json({ error: 'Database error', details: err.message });
         }
@@ -237,31 +345,38 @@ app.get('/api/dining-halls/:hall/foods', (req, res) => {
     const { hall } = req.params;
     const { meal_type, date } = req.query;
 
-    let query = `
-        SELECT DISTINCT name, category, serving_size, calories, protein,
-               total_fat, total_carbohydrate, dietary_fiber, sugars, sodium
-        FROM nutrition_data
-        WHERE dining_hall LIKE ?
-    `;
-    const params = [`%${hall}%`];
+    hallFilter(hall, (filter) => {
+        let query = `
+            SELECT DISTINCT name, category, serving_size, calories, protein,
+                   total_fat, total_carbohydrate, dietary_fiber, sugars, sodium
+            FROM nutrition_data
+            WHERE ${filter.clause}
+        `;
+        const params = [...filter.params];
 
-    if (meal_type) {
-        query += ` AND meal_type = ?`;
-        params.push(meal_type);
-    }
+        if (meal_type) {
+            query += ` AND meal_type = ?`;
+            params.push(meal_type);
+        }
 
-    if (date) {
-        query += ` AND date = ?`;
-        params.push(date);
-    }
+        if (date) {
+            // ISO dates use the parsed date_key (only present alongside the hall lookup tables)
+            if (filter.resolved && /^\d{4}-\d{2}-\d{2}$/.test(date)) {
+                query += ` AND date_key = ?`;
+            } else {
+                query += ` AND date = ?`;
+            }
+            params.push(date);
+        }
 
-    query += ` GROUP BY name ORDER BY category, name`;
+        query += ` GROUP BY name ORDER BY category, name`;
 
-    db.all(query, params, (err, rows) => {
-        if (err) {
-            return res.status(500).json({ error: 'Database error', details: err.message });
-        }
-        res.json({ foods: rows, count: rows.length });
+        getDb().all(query, params, (err, rows) => {
+            if (err) {
+                return res.status(500).json({ error: 'Database error', details: err.message });
+            }
+            res.json({ foods: rows, count: rows.length });
+        });
     });
 });
 
@@ -282,43 +397,45 @@ app.get('/api/recommendations/:userId', (req, res) => {
 
         const targetCaloriesPerMeal = Math.floor((user.calories || 2000) / 3);
 
-        // Get foods from the dining hall
-        let query = `
-            SELECT DISTINCT name, category, serving_size, calories, protein,
-                   total_fat, total_carbohydrate, dietary_fiber, sugars, sodium,
-                   (protein * 4.0 / NULLIF(calories, 0)) as protein_ratio,
-                   (total_fat * 9.0 / NULLIF(calories, 0)) as fat_ratio
-            FROM nutrition_data
-            WHERE dining_hall LIKE ?
-            AND calories > 0
-        `;
-        const params = [`%${dining_hall}%`];
-
-        if (meal_type) {
-            query += ` AND meal_type = ?`;
-            params.push(meal_type);
-        }
-
-        // Score foods based on nutrition
-        query += `
-            GROUP BY name
-            ORDER BY
-                (protein * 4.0 / NULLIF(calories, 0)) DESC,
-                (total_fat * 9.0 / NULLIF(calories, 0)) ASC,
-                dietary_fiber DESC
-            LIMIT 20
-        `;
-
-        db.all(query, params, (err, foods) => {
-            if (err) {
-                return res.status(500).json({ error: 'Database error', details: err.message });
+        hallFilter(dining_hall, (filter) => {
+            // Get foods from the dining hall
+            let query = `
+                SELECT DISTINCT name, category, serving_size, calories, protein,
+                       total_fat, total_carbohydrate, dietary_fiber, sugars, sodium,
+                       (protein * 4.0 / NULLIF(calories, 0)) as protein_ratio,
+                       (total_fat * 9.0 / NULLIF(calories, 0)) as fat_ratio
+                FROM nutrition_data
+                WHERE ${filter.clause}
+                AND calories > 0
+            `;
+            const params = [...filter.params];
+
+            if (meal_type) {
+                query += ` AND meal_type = ?`;
+                params.push(meal_type);
             }
 
-            res.json({
-                recommendations: foods,
-                user_target_calories: targetCaloriesPerMeal,
-                goal: user.goal,
-                count: foods.length
+            // Score foods based on nutrition
+            query += `
+                GROUP BY name
+                ORDER BY
+                    (protein * 4.0 / NULLIF(calories, 0)) DESC,
+                    (total_fat * 9.0 / NULLIF(calories, 0)) ASC,
+                    dietary_fiber DESC
+                LIMIT 20
+            `;
+
+            getDb().all(query, params, (err, foods) => {
+                if (err) {
+                    return res.status(500).json({ error: 'Database error', details: err.message });
+                }
+
+                res.json({
+                    recommendations: foods,
+                    user_target_calories: targetCaloriesPerMeal,
+                    goal: user.goal,
+                    count: foods.length
+                });
             });
         });
     });
@@ -474,6 +591,7 @@ app.get('/health', (req, res) => {
 });
 
 // Start server
+plannerPool.startPool();
 app.listen(PORT, () => {
     console.log(`Server running on http://localhost:${PORT}`);
     console.log(`Authentication endpoints available at:`);